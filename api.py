@@ -1,13 +1,16 @@
 """
 FastAPI application for class recording processing
 """
+import json
 import uuid
 import shutil
+import asyncio
 from pathlib import Path
 from typing import Optional, Annotated
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, WebSocket
 from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from models import (
     JobResponse,
@@ -20,9 +23,27 @@ from database import (
     insert_recording,
     get_recording_by_job_id,
     get_all_recordings,
-    get_recording_by_id
+    get_recording_by_id,
+    get_final_state,
+    claim_for_regeneration,
+    append_transcript,
+    update_status,
+    update_transcript
 )
-from worker import start_job, get_job_status
+from worker import (
+    start_job,
+    start_live_job,
+    start_transcript_job,
+    start_regenerate_job,
+    fail_live_job,
+    update_live_progress,
+    get_job_status
+)
+from audio_to_transcribe_whisper import InvalidMediaError, probe_media
+from class_test_graph import SECTIONS, estimate_pipeline, parse_sections, regeneration_plan
+from token_budget import JOB_TOKEN_BUDGET
+from live_transcription import get_live_session
+from utterance_index import UtteranceIndex, index_path_for
 
 
 # Initialize FastAPI app
@@ -45,6 +66,9 @@ app.add_middleware(
 UPLOADS_DIR = Path(__file__).parent / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
+# A live transcript is appended to the recording at most this often
+LIVE_TRANSCRIPT_FLUSH_SECONDS = 5.0
+
 
 @app.get("/")
 def root():
@@ -54,6 +78,8 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "POST /process": "Upload and process audio file",
+            "POST /regenerate/{job_id}": "Regenerate sections of a completed recording",
+            "WS /live": "Stream live classroom audio for incremental transcription",
             "GET /status/{job_id}": "Check job status",
             "GET /result/{job_id}": "Get processing result",
             "GET /recordings": "List all recordings"
@@ -66,7 +92,15 @@ async def process_audio(
     audio_file: UploadFile = File(..., description="Audio file to process"),
     subject: str = Form(..., description="Subject name"),
     section: Optional[str] = Form(None, description="Section (optional)"),
-    class_name: str = Form(..., description="Class/Grade (e.g., 10th, 12th)")
+    class_name: str = Form(..., description="Class/Grade (e.g., 10th, 12th)"),
+    processing_class: str = Form(
+        "interactive",
+        description="'interactive' (results in minutes) or 'deferred' (Batch API: half price, results within 24h)"
+    ),
+    sections: Optional[str] = Form(
+        None,
+        description=f"Comma-separated output sections to generate ({', '.join(SECTIONS)}); default: all"
+    )
 ):
     """
     Upload and process an audio file.
@@ -83,7 +117,22 @@ async def process_audio(
     - Misconceptions detection
     - Practice questions creation
     - Resource recommendations
+    
+    `sections` limits the study materials to the listed sections (plus the
+    ones they are built from); the others are not generated.
     """
+    if processing_class not in ("interactive", "deferred"):
+        raise HTTPException(status_code=400, detail="processing_class must be 'interactive' or 'deferred'")
+    deferred = processing_class == "deferred"
+    try:
+        selected = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # The upload is deleted on every path that does not hand it to a job
+    audio_path: Optional[Path] = None
+    record_id: Optional[int] = None
+    queued = False
     try:
         # Generate unique job ID
         job_id = str(uuid.uuid4())
@@ -97,29 +146,268 @@ async def process_audio(
         with audio_path.open("wb") as buffer:
             shutil.copyfileobj(audio_file.file, buffer)
         
+        # Probe before enqueueing: reject corrupt, empty or non-audio uploads now
+        try:
+            media_info = await run_in_threadpool(probe_media, audio_path)
+        except InvalidMediaError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid media file: {e}")
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=503,
+                detail="Cannot read uploads: ffprobe is not installed on the server (install ffmpeg)"
+            )
+        
+        # Reject uploads whose estimate cannot fit the job token budget before anything is queued
+        estimate = estimate_pipeline(duration_seconds=media_info.duration, deferred=deferred, sections=selected)
+        if JOB_TOKEN_BUDGET and estimate["llm_tokens"] > JOB_TOKEN_BUDGET:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Recording too long: about {estimate['llm_tokens']} LLM tokens estimated, "
+                       f"JOB_TOKEN_BUDGET is {JOB_TOKEN_BUDGET}"
+            )
+        
         # Insert record into database
         record_id = insert_recording(
             class_name=class_name,
             subject=subject,
             audio_filename=audio_filename,
             job_id=job_id,
-            section=section
+            section=section,
+            duration_seconds=media_info.duration
         )
         
         # Start background processing job
         start_job(
             job_id=job_id,
-            audio_path=str(audio_path)
+            audio_path=str(audio_path),
+            media_info=media_info,
+            deferred=deferred,
+            sections=selected
         )
+        queued = True
         
         return JobResponse(
             job_id=job_id,
             status="pending",
-            message=f"Job created successfully. Record ID: {record_id}"
+            message=f"Job created successfully. Record ID: {record_id}",
+            estimate=estimate
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    finally:
+        if not queued:
+            if audio_path is not None:
+                audio_path.unlink(missing_ok=True)
+            if record_id is not None:
+                update_status(job_id, "failed")
+
+
+@app.post("/regenerate/{job_id}", response_model=JobResponse)
+def regenerate(
+    job_id: str,
+    sections: str = Form(..., description=f"Comma-separated sections to regenerate ({', '.join(SECTIONS)})")
+):
+    """
+    Regenerate sections of a completed recording without re-uploading it.
+    
+    The stored transcript and node outputs are reused: only the listed
+    sections and the sections built on them are generated again (e.g.
+    "misconceptions" also redoes practice). The job then runs like any
+    other: poll /status/{job_id}, the new result replaces the old one.
+    """
+    try:
+        selected = parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not get_recording_by_job_id(job_id):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    
+    job_status = get_job_status(job_id)
+    if job_status["status"] in ("live", "pending", "processing", "deferred"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is still running. Current status: {job_status['status']}"
+        )
+    
+    state = get_final_state(job_id)
+    if state is None:
+        raise HTTPException(
+            status_code=409,
+            detail="No stored node outputs for this recording (processed before they were kept); upload it again"
+        )
+    
+    node_sections = {node: name for name, node in SECTIONS.items()}
+    plan = [node_sections[node] for node in regeneration_plan(state, selected)]
+    # The check above is not atomic: two requests could both pass it
+    if not claim_for_regeneration(job_id):
+        raise HTTPException(status_code=409, detail="Job is already being regenerated")
+    start_regenerate_job(job_id, state, list(selected or SECTIONS))
+    
+    return JobResponse(
+        job_id=job_id,
+        status="pending",
+        message=f"Regenerating: {', '.join(plan)}"
+    )
+
+
+@app.websocket("/live")
+async def live_ingest(
+    websocket: WebSocket,
+    subject: str,
+    class_name: str,
+    section: Optional[str] = None,
+    encoding: str = "linear16",
+    sample_rate: int = 16000
+):
+    """
+    Ingest live classroom audio over a WebSocket.
+    
+    Protocol:
+    1. Connect to /live?subject=...&class_name=...[&section=...]
+       [&encoding=linear16|opus][&sample_rate=16000]
+    2. Server replies {"type": "started", "job_id": ...}
+    3. Client sends binary audio frames (16-bit mono PCM or Ogg/WebM Opus)
+    4. Server pushes {"type": "utterance", "start", "end", "transcript"}
+       for every final utterance; the transcript is stored as it grows
+    5. Client sends {"type": "stop"} (or disconnects); the server flushes
+       the stream, starts the tutor pipeline on the complete transcript and
+       replies {"type": "completed", "job_id": ...}
+    
+    A text frame that is not a JSON object gets {"type": "error", "detail"}
+    back; the stream continues. If the stream breaks (transcription backend
+    error, socket closed mid-lecture), the tutor pipeline runs on the
+    transcript so far; with nothing transcribed the job fails instead.
+    
+    Track the job afterwards with /status/{job_id} and /result/{job_id}.
+    """
+    await websocket.accept()
+    
+    try:
+        session = get_live_session(encoding=encoding, sample_rate=sample_rate)
+        await session.start()
+    except Exception as e:
+        await websocket.close(code=1011, reason=f"Could not start transcription: {e}"[:120])
+        return
+    
+    job_id = str(uuid.uuid4())
+    audio_filename = f"{job_id}.live.{'pcm' if encoding == 'linear16' else 'opus'}"
+    audio_path = UPLOADS_DIR / audio_filename
+    
+    record_id = await run_in_threadpool(
+        insert_recording,
+        class_name=class_name,
+        subject=subject,
+        audio_filename=audio_filename,
+        job_id=job_id,
+        section=section
+    )
+    start_live_job(job_id)
+    await websocket.send_json({"type": "started", "job_id": job_id, "record_id": record_id})
+    
+    utterances = []
+    client = {"connected": True}
+    stream_error: Optional[Exception] = None
+    
+    async def collect():
+        # New text is appended to the stored transcript in batches, not rewritten per utterance
+        pending, last_flush = [], asyncio.get_running_loop().time()
+        try:
+            async for utt in session.results():
+                utterances.append(utt)
+                pending.append(utt["transcript"])
+                now = asyncio.get_running_loop().time()
+                if now - last_flush >= LIVE_TRANSCRIPT_FLUSH_SECONDS:
+                    await run_in_threadpool(append_transcript, job_id, " ".join(pending))
+                    pending, last_flush = [], now
+                update_live_progress(job_id, f"Receiving live audio... {len(utterances)} utterance(s) transcribed")
+                if client["connected"]:
+                    try:
+                        await websocket.send_json({"type": "utterance", **utt})
+                    except Exception:
+                        client["connected"] = False
+        finally:
+            if pending:
+                await run_in_threadpool(append_transcript, job_id, " ".join(pending))
+    
+    collector = asyncio.create_task(collect())
+    
+    try:
+        # Keep a copy of the raw audio, like uploaded recordings
+        with audio_path.open("wb") as audio_out:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    client["connected"] = False
+                    break
+                if message.get("bytes"):
+                    audio_out.write(message["bytes"])
+                    await session.send(message["bytes"])
+                elif message.get("text"):
+                    # A malformed control frame must not end the recording
+                    try:
+                        control = json.loads(message["text"]).get("type")
+                    except (ValueError, AttributeError):
+                        await websocket.send_json({
+                            "type": "error",
+                            "detail": 'Text frames must be JSON objects such as {"type": "stop"}'
+                        })
+                        continue
+                    if control == "stop":
+                        break
+    except Exception as e:
+        stream_error = e
+        print(f"Live job {job_id}: stream broke off: {e!r}")
+    finally:
+        # Flush whatever the backend still holds; the transcript so far is kept either way
+        try:
+            await session.finish()
+        except Exception as e:
+            print(f"Live job {job_id}: error closing transcription stream: {e}")
+        try:
+            await collector
+        except Exception as e:
+            stream_error = stream_error or e
+            print(f"Live job {job_id}: transcription failed: {e!r}")
+    
+    if not utterances:
+        error = "Live stream ended without any transcribed speech"
+        if stream_error is not None:
+            error += f" ({stream_error})"
+        fail_live_job(job_id, error)
+        if client["connected"]:
+            try:
+                await websocket.send_json({"type": "error", "detail": error})
+                await websocket.close(code=1011 if stream_error is not None else 1000)
+            except Exception:
+                pass
+        return
+    
+    index = UtteranceIndex.from_utterances(utterances)
+    transcript = index.full_text()
+    save_json = audio_path.with_suffix(".deepgram.json")
+    save_json.write_text(
+        json.dumps({"results": {"utterances": utterances}}, ensure_ascii=False),
+        encoding="utf-8"
+    )
+    index.save(index_path_for(save_json))
+    await run_in_threadpool(update_transcript, job_id, transcript)
+    
+    # Transcript is already complete: go straight to the tutor pipeline
+    start_transcript_job(job_id, transcript, utterances=index.texts())
+    
+    if client["connected"]:
+        completed = {"type": "completed", "job_id": job_id, "utterances": len(utterances)}
+        if stream_error is not None:
+            completed["error"] = f"Stream broke off; processing the transcript so far ({stream_error})"
+        try:
+            await websocket.send_json(completed)
+            await websocket.close()
+        except Exception:
+            pass
 
 
 @app.get("/status/{job_id}", response_model=JobStatusResponse)
@@ -128,6 +416,7 @@ def get_status(job_id: str):
     Check the status of a processing job.
     
     Possible statuses:
+    - live: Audio is still streaming in over /live
     - pending: Job is queued
     - processing: Job is currently being processed
     - completed: Job finished successfully
@@ -143,7 +432,8 @@ def get_status(job_id: str):
         job_id=job_id,
         status=job_status["status"],
         progress=job_status.get("progress"),
-        error=job_status.get("error")
+        error=job_status.get("error"),
+        metrics=job_status.get("metrics")
     )
 
 
@@ -156,6 +446,7 @@ def get_result(job_id: str):
     - combined_md: The generated study materials in Markdown format
     - status: Current job status
     - error: Error message if job failed
+    - node_outputs: While processing, each step's output so far (streamed)
     """
     # Check job status
     job_status = get_job_status(job_id)
@@ -170,11 +461,12 @@ def get_result(job_id: str):
             error=job_status.get("error")
         )
     
-    if job_status["status"] in ["pending", "processing"]:
+    if job_status["status"] in ["live", "pending", "processing", "deferred"]:
         return JobResultResponse(
             job_id=job_id,
             status=job_status["status"],
-            combined_md=None
+            combined_md=None,
+            node_outputs=job_status.get("node_outputs")
         )
     
     # Job completed - get from database
@@ -234,6 +526,7 @@ def list_recordings(limit: int = 100, offset: int = 0):
             section=rec["section"],
             subject=rec["subject"],
             audio_filename=rec["audio_filename"],
+            duration_seconds=rec["duration_seconds"],
             job_id=rec["job_id"],
             created_at=rec["created_at"]
         )
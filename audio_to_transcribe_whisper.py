@@ -1,11 +1,51 @@
 import os
+import re
 import sys
 import json
+import time
+import asyncio
+import tempfile
+import threading
+import contextlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Union
+import httpx
 from dotenv import load_dotenv
-from deepgram import DeepgramClient, PrerecordedOptions
+from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+
+import simulation
+import transcript_cache
+from transcription_backends import TranscriptionBackend, get_backend
+from utterance_index import UtteranceIndex, index_path_for
+from vad import trim_silence, restore_timestamps
+
+
+# Size of each ffmpeg stdout read in streaming mode; this bounds the audio
+# held in memory per job regardless of recording length.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+DEEPGRAM_MODEL = "whisper-large"
+
+# Connection pool shared by every transcription in the process
+DEEPGRAM_POOL_LIMITS = httpx.Limits(
+    max_connections=32,
+    max_keepalive_connections=8,
+    keepalive_expiry=120.0,
+)
+
+# Segmented mode: silence detection thresholds and per-segment retry policy
+SILENCE_NOISE_DB = -35.0
+SILENCE_MIN_SECONDS = 0.5
+SEGMENT_RETRIES = 3
+SEGMENT_RETRY_BACKOFF = 2.0
+
+# Format every backend receives; inputs already in it skip conversion
+TARGET_SAMPLE_RATE = 16000
+TARGET_CHANNELS = 1
+TARGET_CODEC = "pcm_s16le"
 
 
 def _run(cmd: list[str]) -> None:
@@ -19,6 +59,74 @@ def _run(cmd: list[str]) -> None:
         raise
 
 
+class InvalidMediaError(ValueError):
+    """The input is unreadable, has no audio stream, or has no duration."""
+
+
+@dataclass
+class MediaInfo:
+    duration: float          # seconds
+    codec: str               # audio codec of the first audio stream, e.g. "mp3", "pcm_s16le"
+    sample_rate: int
+    channels: int
+    format_name: str         # container, e.g. "wav", "mov,mp4,m4a,3gp,3g2,mj2"
+
+    @property
+    def is_target_wav(self) -> bool:
+        """True if the file is already 16 kHz mono PCM s16le WAV and needs no conversion."""
+        return (
+            "wav" in self.format_name.split(",")
+            and self.codec == TARGET_CODEC
+            and self.sample_rate == TARGET_SAMPLE_RATE
+            and self.channels == TARGET_CHANNELS
+        )
+
+
+def probe_media(src: Path) -> MediaInfo:
+    """
+    Read duration, codec, sample rate and channels of the first audio stream
+    with ffprobe (headers only, no decode). Requires ffprobe (ships with ffmpeg).
+
+    Raises InvalidMediaError if the file cannot be parsed, has no audio
+    stream, or is empty.
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration,format_name:stream=codec_name,sample_rate,channels,duration",
+        "-of", "json",
+        str(src),
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("ERROR: ffprobe not found. Please install ffmpeg and ensure it's in PATH.", file=sys.stderr)
+        raise
+    if proc.returncode != 0:
+        raise InvalidMediaError(f"Unreadable media: {proc.stderr.strip() or 'ffprobe failed'}")
+
+    data = json.loads(proc.stdout or "{}")
+    streams = data.get("streams") or []
+    if not streams:
+        raise InvalidMediaError("No audio stream found")
+    stream, fmt = streams[0], data.get("format") or {}
+
+    try:
+        duration = float(fmt.get("duration") or stream.get("duration") or 0.0)
+    except ValueError:
+        duration = 0.0
+    if duration <= 0:
+        raise InvalidMediaError("Media has no duration (empty or truncated file)")
+
+    return MediaInfo(
+        duration=duration,
+        codec=stream.get("codec_name") or "",
+        sample_rate=int(stream.get("sample_rate") or 0),
+        channels=int(stream.get("channels") or 0),
+        format_name=fmt.get("format_name") or "",
+    )
+
+
 def _convert_to_wav(src: Path, dst: Path, sr: int = 16000) -> Path:
     """
     Convert any audio/video to 16 kHz mono WAV (PCM s16le). Requires ffmpeg.
@@ -38,27 +146,359 @@ def _convert_to_wav(src: Path, dst: Path, sr: int = 16000) -> Path:
     return dst
 
 
-def _transcribe_whisper(wav_path: Path, language: str = "auto", diarize: bool = False) -> dict:
+def _stream_wav(
+    src: Path,
+    sr: int = 16000,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    start: Optional[float] = None,
+    duration: Optional[float] = None,
+) -> Iterator[bytes]:
+    """
+    Decode any audio/video to 16 kHz mono WAV (PCM s16le) on ffmpeg's stdout
+    and yield it in chunks of at most `chunk_size` bytes. Requires ffmpeg.
+
+    `start`/`duration` (seconds) restrict the output to one slice of the input.
+    Nothing is written to disk. If the consumer stops early (e.g. the upload
+    fails) the ffmpeg process is killed.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if start is not None:
+        cmd += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-i", str(src),
+        "-ac", "1",
+        "-ar", str(sr),
+        "-c:a", "pcm_s16le",
+        "-f", "wav",
+        "pipe:1",
+    ]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        print("ERROR: ffmpeg not found. Please install ffmpeg and ensure it's in PATH.", file=sys.stderr)
+        raise
+
+    try:
+        while True:
+            chunk = proc.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        # -loglevel error keeps stderr tiny, so reading it after stdout is safe
+        err = proc.stderr.read()
+        if proc.wait() != 0:
+            print(f"ERROR: Command failed: {' '.join(cmd)}", file=sys.stderr)
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=err)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def _read_chunks(path: Path, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a file in chunks so it can be uploaded without reading it whole."""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _detect_silences(
+    src: Path,
+    noise_db: float = SILENCE_NOISE_DB,
+    min_silence: float = SILENCE_MIN_SECONDS,
+    duration: Optional[float] = None,
+) -> tuple[list[tuple[float, float]], float]:
+    """
+    Run ffmpeg's silencedetect filter over the input.
+
+    Returns (silences, duration) where silences is a list of (start, end)
+    seconds and duration is the total input length in seconds: `duration`
+    if given (e.g. from probe_media), else the "Duration:" ffmpeg logs, else
+    0.0 (e.g. "Duration: N/A" on piped or unusual containers).
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-nostats",
+        "-i", str(src),
+        "-vn",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-",
+    ]
+    try:
+        proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("ERROR: ffmpeg not found. Please install ffmpeg and ensure it's in PATH.", file=sys.stderr)
+        raise
+    except subprocess.CalledProcessError:
+        print(f"ERROR: Command failed: {' '.join(cmd)}", file=sys.stderr)
+        raise
+
+    log = proc.stderr
+    if not duration:
+        m = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", log)
+        duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else 0.0
+
+    starts = [float(x) for x in re.findall(r"silence_start: (-?\d+(?:\.\d+)?)", log)]
+    ends = [float(x) for x in re.findall(r"silence_end: (\d+(?:\.\d+)?)", log)]
+    # A silence running to the end of the file has no silence_end line
+    if len(ends) < len(starts):
+        ends.append(duration)
+    return [(max(0.0, s), e) for s, e in zip(starts, ends)], duration
+
+
+def _plan_segments(
+    silences: list[tuple[float, float]],
+    duration: float,
+    target: float,
+) -> list[tuple[float, float]]:
+    """
+    Choose (start, end) segment bounds of roughly `target` seconds each,
+    cutting at the middle of the silence closest to each ideal cut point.
+    Falls back to a hard cut when no silence is within half a segment.
+    Raises ValueError for a non-positive duration (nothing to split).
+    """
+    if duration <= 0:
+        raise ValueError(f"Cannot plan segments for a duration of {duration}s")
+    mids = [(s + e) / 2 for s, e in silences]
+    bounds = []
+    cursor = 0.0
+    while duration - cursor > target * 1.5:
+        ideal = cursor + target
+        candidates = [m for m in mids if cursor + target / 2 <= m <= cursor + target * 1.5]
+        cut = min(candidates, key=lambda m: abs(m - ideal)) if candidates else ideal
+        bounds.append((cursor, cut))
+        cursor = cut
+    bounds.append((cursor, duration))
+    return bounds
+
+
+def _transcribe_segment(
+    backend: TranscriptionBackend,
+    src: Path,
+    index: int,
+    start: float,
+    end: float,
+    language: str,
+    diarize: bool,
+) -> dict:
+    """Transcribe one slice of `src`, retrying only this slice on failure."""
+    for attempt in range(1, SEGMENT_RETRIES + 1):
+        try:
+            return backend.transcribe(
+                _stream_wav(src, start=start, duration=end - start),
+                language=language,
+                diarize=diarize,
+            )
+        except Exception as e:
+            if attempt == SEGMENT_RETRIES:
+                raise
+            print(f"Segment {index} ({start:.1f}s–{end:.1f}s) failed on attempt {attempt}: {e}; retrying",
+                  file=sys.stderr)
+            time.sleep(SEGMENT_RETRY_BACKOFF * attempt)
+
+
+def _shift_times(item: dict, offset: float) -> dict:
+    """Copy an utterance/word dict with start/end (and nested words) shifted by offset."""
+    out = dict(item)
+    for k in ("start", "end"):
+        if isinstance(out.get(k), (int, float)):
+            out[k] = out[k] + offset
+    if isinstance(out.get("words"), list):
+        out["words"] = [_shift_times(w, offset) for w in out["words"]]
+    return out
+
+
+def _renumber_speakers(item: dict, first: int) -> dict:
+    """Shift an utterance/word's speaker id (and its words' ids) by `first`, in place."""
+    if isinstance(item.get("speaker"), int):
+        item["speaker"] += first
+    for w in item.get("words") or []:
+        _renumber_speakers(w, first)
+    return item
+
+
+def _max_speaker(items: list) -> int:
+    ids = [i["speaker"] for i in items if isinstance(i.get("speaker"), int)]
+    ids += [w["speaker"] for i in items for w in i.get("words") or [] if isinstance(w.get("speaker"), int)]
+    return max(ids, default=-1)
+
+
+def _merge_segment_results(parts: list[tuple[float, dict]], duration: float) -> dict:
+    """
+    Stitch per-segment Deepgram responses into one response-shaped dict.
+    Each part is (segment start offset, dg_json); timestamps are shifted so
+    they refer to the original input.
+
+    Diarization runs per segment, so one voice gets unrelated ids in
+    different segments. Speaker ids are renumbered to be unique per segment
+    (each segment continues after the previous one's highest id) rather
+    than suggesting that speaker 0 is one person throughout; the first id
+    of every segment is listed in metadata.segments[].first_speaker.
+    """
+    utterances = []
+    transcripts = []
+    words = []
+    confidences = []
+    first_speakers = []
+    first_speaker = 0
+    for offset, dg_json in parts:
+        results = dg_json.get("results", {})
+        channels = results.get("channels") or []
+        alts = channels[0].get("alternatives", []) if channels else []
+        part_utterances = [_shift_times(u, offset) for u in results.get("utterances") or []]
+        part_words = [_shift_times(w, offset) for w in (alts[0].get("words") or [] if alts else [])]
+        for item in part_utterances + part_words:
+            _renumber_speakers(item, first_speaker)
+        first_speakers.append(first_speaker)
+        first_speaker = max(first_speaker, _max_speaker(part_utterances + part_words) + 1)
+
+        utterances.extend(part_utterances)
+        words.extend(part_words)
+        if alts:
+            text = (alts[0].get("transcript") or "").strip()
+            if text:
+                transcripts.append(text)
+            if isinstance(alts[0].get("confidence"), (int, float)):
+                confidences.append(alts[0]["confidence"])
+
+    metadata = dict(parts[0][1].get("metadata", {})) if parts else {}
+    metadata["duration"] = duration
+    metadata["segments"] = [
+        {"start": offset, "request_id": dg_json.get("metadata", {}).get("request_id"), "first_speaker": first}
+        for (offset, dg_json), first in zip(parts, first_speakers)
+    ]
+    return {
+        "metadata": metadata,
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": " ".join(transcripts),
+                    "confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+                    "words": words,
+                }],
+            }],
+            "utterances": utterances,
+        },
+    }
+
+
+def _transcribe_segmented(
+    backend: TranscriptionBackend,
+    src: Path,
+    segment_minutes: float,
+    max_workers: int,
+    language: str,
+    diarize: bool,
+    duration: Optional[float] = None,
+) -> dict:
+    """
+    Split `src` at detected silences into ~segment_minutes pieces, transcribe
+    them concurrently (each streamed straight from ffmpeg) and stitch the
+    results back into a single Deepgram-shaped response. `duration` is the
+    probed length of `src`; without it (or a "Duration:" in ffmpeg's log)
+    the input is transcribed in one piece instead.
+    """
+    silences, duration = _detect_silences(src, duration=duration)
+    if duration <= 0:
+        print(f"Could not determine the duration of {src.name}; transcribing it unsegmented",
+              file=sys.stderr)
+        return backend.transcribe(_stream_wav(src), language=language, diarize=diarize)
+    bounds = _plan_segments(silences, duration, segment_minutes * 60)
+    print(f"Split {duration:.1f}s of audio into {len(bounds)} segment(s) "
+          f"at {len(silences)} detected silence(s)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_transcribe_segment, backend, src, i, start, end, language, diarize)
+            for i, (start, end) in enumerate(bounds)
+        ]
+        parts = [(start, f.result()) for (start, _), f in zip(bounds, futures)]
+
+    return _merge_segment_results(parts, duration)
+
+
+class _KeepAliveTransport(httpx.HTTPTransport):
+    """
+    HTTP transport whose connection pool outlives the short-lived
+    httpx.Client the Deepgram SDK opens and closes around every request,
+    so keep-alive connections (and their TLS sessions) are reused.
+    """
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_dg_lock = threading.Lock()
+_dg_listen = None
+_dg_transport: Optional[_KeepAliveTransport] = None
+
+
+def _get_deepgram():
+    """
+    Return the process-wide Deepgram prerecorded client and its pooled
+    transport, creating both on first use.
+
+    `.env` is read once here instead of on every transcription. The client
+    holds no per-request state and httpx transports are thread-safe, so the
+    pair is shared by all worker threads (and by async callers through
+    `_transcribe_whisper_async`). DEEPGRAM_HOST overrides the API host,
+    e.g. to point at a local stand-in server.
+    """
+    global _dg_listen, _dg_transport
+    with _dg_lock:
+        if _dg_listen is None:
+            load_dotenv()
+            key = os.getenv("DEEPGRAM_API_KEY", "").strip()
+            if not key:
+                raise SystemExit("Set DEEPGRAM_API_KEY in .env")
+            config = DeepgramClientOptions(url=os.getenv("DEEPGRAM_HOST", ""))
+            _dg_listen = DeepgramClient(key, config).listen.prerecorded.v("1")
+            _dg_transport = _KeepAliveTransport(limits=DEEPGRAM_POOL_LIMITS, retries=1)
+        return _dg_listen, _dg_transport
+
+
+def _transcribe_whisper(
+    source: Union[Path, Iterable[bytes]],
+    language: str = "auto",
+    diarize: bool = False,
+) -> dict:
     """
     Transcribe with Deepgram Whisper Cloud (whisper-large) and return JSON dict.
 
+    source:
+      - Path to a WAV file (read into memory and sent as one buffer)
+      - iterable of WAV byte chunks (e.g. from `_stream_wav`), sent as a
+        chunked upload without ever holding the whole file
     language:
       - "auto" (default): auto-detect
       - ISO code like "en", "hi", "de" to lock it
     diarize:
       - False by default; True to get speaker labels
-    """
-    load_dotenv()
-    key = os.getenv("DEEPGRAM_API_KEY", "").strip()
-    if not key:
-        raise SystemExit("Set DEEPGRAM_API_KEY in .env")
 
-    dg = DeepgramClient(key)
-    with open(wav_path, "rb") as f:
-        buf = f.read()
+    With SIMULATION_MODE=1 the simulated backend answers instead of Deepgram.
+    """
+    if simulation.ENABLED:
+        return get_backend("fake").transcribe(source, language=language, diarize=diarize)
+    listen, transport = _get_deepgram()
+    if isinstance(source, Path):
+        with open(source, "rb") as f:
+            payload = {"buffer": f.read(), "mimetype": "audio/wav"}
+        name = source.name
+    else:
+        payload = {"stream": source, "mimetype": "audio/wav"}
+        name = "ffmpeg stream"
 
     params = dict(
-        model="whisper-large",
+        model=DEEPGRAM_MODEL,
         utterances=True,      # sentence-like chunks
         smart_format=True,    # nicer numbers, dates, casing, punctuation
         diarize=diarize,
@@ -68,44 +508,107 @@ def _transcribe_whisper(wav_path: Path, language: str = "auto", diarize: bool =
 
     opts = PrerecordedOptions(**params)
 
-    print(f"Transcribing {wav_path.name} with model=whisper-large "
+    print(f"Transcribing {name} with model={DEEPGRAM_MODEL} "
           f"(language={language}, diarize={diarize}) …")
-    res = dg.listen.prerecorded.v("1").transcribe_file(
-        {"buffer": buf, "mimetype": "audio/wav"},
-        opts
-    )
+    res = listen.transcribe_file(payload, opts, transport=transport)
     return res.to_dict()
 
 
+async def _transcribe_whisper_async(
+    source: Union[Path, Iterable[bytes]],
+    language: str = "auto",
+    diarize: bool = False,
+) -> dict:
+    """`_transcribe_whisper` for async callers; shares the same client and pool."""
+    return await asyncio.to_thread(_transcribe_whisper, source, language, diarize)
+
+
 def _extract_full_transcript(dg_json: dict) -> str:
     """
     Build a single plain-text transcript string from Deepgram JSON.
     Prefer utterances; fall back to channels/alternatives if needed.
     """
+    return UtteranceIndex.from_deepgram(dg_json).full_text()
+
+
+def _strip_words(dg_json: dict) -> dict:
+    """Drop per-word arrays (never read downstream) from a Deepgram response, in place."""
     results = dg_json.get("results", {})
+    for u in results.get("utterances") or []:
+        u.pop("words", None)
+    for ch in results.get("channels") or []:
+        for alt in ch.get("alternatives") or []:
+            alt.pop("words", None)
+    return dg_json
 
-    # 1) Prefer utterances (sentence-like)
-    utterances = results.get("utterances", [])
-    if isinstance(utterances, list) and utterances:
-        parts = []
-        for u in utterances:
-            text = (u.get("transcript") or "").strip()
-            if text:
-                parts.append(text)
-        if parts:
-            return " ".join(parts).strip()
-
-    # 2) Fallback to first channel/alternative transcript
-    channels = results.get("channels", [])
-    if isinstance(channels, list) and channels:
-        alts = channels[0].get("alternatives", [])
-        if isinstance(alts, list) and alts:
-            text = (alts[0].get("transcript") or "").strip()
-            if text:
-                return text
 
-    # 3) Nothing found
-    return ""
+def _transcribe_source(
+    backend: TranscriptionBackend,
+    src: Path,
+    *,
+    out_wav: Optional[str],
+    language: str,
+    diarize: bool,
+    stream: bool,
+    segment_minutes: Optional[float],
+    max_workers: int,
+    vad: bool,
+    media_info: Optional[MediaInfo] = None,
+) -> dict:
+    """Convert/trim/split `src` as requested and return the Deepgram JSON."""
+    info = media_info or probe_media(src)
+    print(f"Probed {src.name}: {info.duration:.1f}s {info.codec} "
+          f"{info.sample_rate} Hz x{info.channels} ({info.format_name})")
+    # Already 16 kHz mono PCM WAV: upload/trim it as-is instead of re-encoding
+    skip_convert = info.is_target_wav and not segment_minutes
+    if skip_convert:
+        print("Input is already 16 kHz mono PCM WAV; skipping conversion")
+
+    # VAD's converted and trimmed WAVs go to a directory removed after transcription
+    with tempfile.TemporaryDirectory(prefix="vad_") if vad else contextlib.nullcontext() as vad_dir:
+        vad_result = None
+        if vad:
+            # 0) VAD needs PCM on disk; later steps read the trimmed WAV instead
+            if skip_convert:
+                wav_path = src
+            else:
+                wav_path = _convert_to_wav(src, Path(vad_dir, "converted.wav"))
+                print(f"Converted to WAV: {wav_path.resolve()}")
+            vad_result = trim_silence(wav_path, Path(vad_dir, "vad.wav"))
+            print(f"VAD removed {vad_result.removed_seconds:.1f}s of non-speech "
+                  f"from {vad_result.original_seconds:.1f}s of audio")
+            src = vad_result.wav_path
+
+        if segment_minutes:
+            # 1+2) Silence-split, transcribe segments in parallel, stitch
+            dg_json = _transcribe_segmented(
+                backend, src, segment_minutes, max_workers, language=language, diarize=diarize,
+                duration=vad_result.kept_seconds if vad_result else info.duration,
+            )
+        elif vad_result or skip_convert:
+            # 1) already converted (or nothing to convert); 2) Transcribe the WAV
+            audio = _read_chunks(src) if stream else src
+            dg_json = backend.transcribe(audio, language=language, diarize=diarize)
+        elif stream:
+            # 1+2) Convert and upload in one pass, no intermediate WAV
+            dg_json = backend.transcribe(_stream_wav(src), language=language, diarize=diarize)
+        else:
+            # 1) Convert to wav
+            wav_path = _convert_to_wav(src, Path(out_wav))
+            print(f"Converted to WAV: {wav_path.resolve()}")
+
+            # 2) Transcribe
+            dg_json = backend.transcribe(wav_path, language=language, diarize=diarize)
+
+    if vad_result:
+        restore_timestamps(dg_json, vad_result.offset_map)
+        metadata = dg_json.setdefault("metadata", {})
+        metadata["duration"] = vad_result.original_seconds
+        metadata["vad"] = {
+            "original_seconds": round(vad_result.original_seconds, 3),
+            "removed_seconds": round(vad_result.removed_seconds, 3),
+        }
+    return dg_json
 
 
 def transcribe_audio_to_text(
@@ -114,19 +617,60 @@ def transcribe_audio_to_text(
     out_wav: Optional[str] = "converted.wav",
     save_json: Optional[str] = "transcript_full.json",
     language: str = "auto",
-    diarize: bool = False
+    diarize: bool = False,
+    stream: bool = False,
+    segment_minutes: Optional[float] = None,
+    max_workers: int = 4,
+    vad: bool = False,
+    use_cache: bool = True,
+    backend: Optional[str] = None,
+    keep_words: bool = False,
+    media_info: Optional[MediaInfo] = None,
 ) -> str:
     """
-    Convert input media to WAV, transcribe with Deepgram Whisper Large,
-    save the full JSON to disk (same behavior as before), and return
+    Convert input media to WAV, transcribe with Deepgram Whisper Large
+    (or another backend from transcription_backends), save the full JSON
+    to disk (same behavior as before), and return
     the full transcript as a single string.
 
     Args:
         input_path: Path to input media (any format ffmpeg can read)
-        out_wav:    Path for intermediate WAV (default: 'converted.wav')
+        out_wav:    Path for intermediate WAV (default: 'converted.wav'); not
+                    written with stream or vad (VAD converts into a temporary
+                    directory that is removed after transcription)
         save_json:  Path where the full JSON is saved (default: 'transcript_full.json')
         language:   'auto' or ISO code like 'en', 'hi', 'de'
         diarize:    If True, request speaker labels in JSON
+        stream:     If True, pipe ffmpeg's output straight into the upload
+                    body in chunks instead of writing `out_wav` and reading
+                    it back; peak memory stays at a few MB per job
+        segment_minutes: If set, split the input at silences into segments
+                    of about this many minutes and transcribe them
+                    concurrently; timestamps in the saved JSON still refer
+                    to the original input. Failed segments are retried
+                    individually. With diarize, speaker ids are per
+                    segment (renumbered so they never collide)
+        max_workers: Concurrent segment uploads in segmented mode
+        vad:        If True, convert to WAV and run a local voice-activity
+                    pass that cuts long non-speech spans before upload;
+                    timestamps in the saved JSON are mapped back to the
+                    original input and the removed seconds are recorded
+                    under metadata.vad
+        use_cache:  If True, look the input up in the on-disk transcript
+                    cache (keyed by audio content hash + model, language,
+                    diarize and vad) and skip conversion and transcription
+                    on a hit
+        backend:    Transcription backend name ('deepgram', 'local', ...);
+                    defaults to $TRANSCRIPTION_BACKEND or 'deepgram'. All
+                    backends return the same Deepgram-shaped JSON
+        keep_words: If False (default), per-word arrays are dropped from the
+                    response before it is cached and saved
+        media_info: Result of an earlier `probe_media(input_path)`; probed
+                    here on a cache miss if not given. Inputs that are
+                    already 16 kHz mono PCM WAV skip conversion
+
+    A compact utterance index (see utterance_index.py) is saved next to
+    `save_json` as `<name>.utt.npz` for fast reloads and time-range lookups.
 
     Returns:
         The complete transcript as a plain string ("" if none).
@@ -135,20 +679,52 @@ def transcribe_audio_to_text(
     if not src.exists():
         raise FileNotFoundError(f"Input not found: {src.resolve()}")
 
-    # 1) Convert to wav
-    wav_path = _convert_to_wav(src, Path(out_wav))
-    print(f"Converted to WAV: {wav_path.resolve()}")
+    engine = get_backend(backend)
+    cache_key = None
+    dg_json = None
+    if use_cache:
+        cache_key = transcript_cache.cache_key(
+            transcript_cache.fingerprint(src),
+            backend=engine.name,
+            model=engine.model,
+            language=(language or "auto").lower(),
+            diarize=diarize,
+            vad=vad,
+            keep_words=keep_words,
+        )
+        dg_json = transcript_cache.get(cache_key)
+        stats = transcript_cache.cache_stats()
+        print(f"Transcript cache {'hit' if dg_json is not None else 'miss'} for {src.name} "
+              f"(hits={stats['hits']}, misses={stats['misses']})")
+
+    if dg_json is None:
+        dg_json = _transcribe_source(
+            engine,
+            src,
+            out_wav=out_wav,
+            language=language,
+            diarize=diarize,
+            stream=stream,
+            segment_minutes=segment_minutes,
+            max_workers=max_workers,
+            vad=vad,
+            media_info=media_info,
+        )
+        if not keep_words:
+            _strip_words(dg_json)
+        if cache_key:
+            transcript_cache.put(cache_key, dg_json)
 
-    # 2) Transcribe
-    dg_json = _transcribe_whisper(wav_path, language=language, diarize=diarize)
+    index = UtteranceIndex.from_deepgram(dg_json)
 
-    # 3) Save full JSON (same behavior)
+    # 3) Save full JSON (compact) plus the utterance index next to it
     if save_json:
         save_path = Path(save_json)
         save_path.parent.mkdir(parents=True, exist_ok=True)
         with open(save_path, "w", encoding="utf-8") as f:
-            json.dump(dg_json, f, ensure_ascii=False, indent=2)
+            json.dump(dg_json, f, ensure_ascii=False, separators=(",", ":"))
+        index.save(index_path_for(save_path))
         print(f"Saved full JSON: {save_path.resolve()}")
 
     # 4) Return full transcript as a single string
-    return _extract_full_transcript(dg_json)
+    return index.full_text()
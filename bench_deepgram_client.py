@@ -0,0 +1,129 @@
+"""
+Micro-benchmark: per-call overhead of a fresh Deepgram client vs the
+process-wide pooled client in audio_to_transcribe_whisper.
+
+A local stand-in HTTP server answers every /v1/listen request with a canned
+response, so the numbers are pure client overhead (env loading, client
+construction, TCP connection setup). Against api.deepgram.com the pooled
+client also skips a TLS handshake per call, so real savings are larger.
+
+Run:
+  python bench_deepgram_client.py [calls]
+"""
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import statistics
+from pathlib import Path
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from dotenv import load_dotenv
+from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
+
+
+CANNED = json.dumps({
+    "metadata": {"request_id": "bench", "duration": 1.0, "channels": 1},
+    "results": {
+        "channels": [{"alternatives": [{"transcript": "hello class", "confidence": 1.0, "words": []}]}],
+        "utterances": [{"start": 0.0, "end": 1.0, "confidence": 1.0, "channel": 0,
+                        "transcript": "hello class", "words": [], "id": "u0"}],
+    },
+}).encode()
+
+AUDIO = b"RIFF" + b"\0" * 32_000  # payload size is irrelevant to the stand-in
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    break
+        else:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CANNED)))
+        self.end_headers()
+        self.wfile.write(CANNED)
+
+    def log_message(self, *args):
+        pass
+
+
+def _fresh_client_call(host: str) -> None:
+    """What every transcription used to do: read .env, build a client, one request."""
+    load_dotenv()
+    key = os.getenv("DEEPGRAM_API_KEY", "").strip()
+    dg = DeepgramClient(key, DeepgramClientOptions(url=host))
+    opts = PrerecordedOptions(model="whisper-large", utterances=True, smart_format=True)
+    dg.listen.prerecorded.v("1").transcribe_file({"buffer": AUDIO, "mimetype": "audio/wav"}, opts)
+
+
+def _pooled_client_call(wav: Path) -> None:
+    import audio_to_transcribe_whisper as atw
+    atw._transcribe_whisper(wav)
+
+
+def _measure(fn, calls: int) -> list[float]:
+    fn()  # warm-up (imports, first connection)
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main() -> int:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_port}"
+    os.environ["DEEPGRAM_HOST"] = host
+    os.environ.setdefault("DEEPGRAM_API_KEY", "bench-key")
+
+    wav = Path(tempfile.mkdtemp()) / "bench.wav"
+    wav.write_bytes(AUDIO)
+
+    results = {}
+    for label, fn in (
+        ("fresh client per call", lambda: _fresh_client_call(host)),
+        ("pooled shared client", lambda: _pooled_client_call(wav)),
+    ):
+        _StandIn.connections = 0
+        with redirect_stdout(io.StringIO()):
+            samples = _measure(fn, calls)
+        results[label] = samples
+        print(f"{label:>22}: mean {statistics.mean(samples):7.3f} ms | "
+              f"p50 {statistics.median(samples):7.3f} ms | "
+              f"p95 {statistics.quantiles(samples, n=20)[18]:7.3f} ms | "
+              f"TCP connections opened: {_StandIn.connections}")
+
+    before = statistics.mean(results["fresh client per call"])
+    after = statistics.mean(results["pooled shared client"])
+    print(f"\nPer-call overhead saved: {before - after:.3f} ms ({before / after:.1f}x faster), "
+          f"{calls} calls each")
+    server.shutdown()
+    wav.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark: tail latency of a node with and without hedged fallbacks.
+
+Simulated models: the primary usually answers in ~BASE seconds but a
+fraction SLOW_RATE of its calls stall for SLOW_FACTOR times longer (the
+"one slow gpt-5 response" case); the fallback is somewhat slower on
+average but has no stall tail. Calls run through llm_hedging.run_hedged
+exactly as call_llm does, first with hedging disabled, then enabled after
+a warm-up that fills the latency history.
+
+Run:
+  python bench_hedging.py [calls]
+"""
+import sys
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_hedging
+from llm_hedging import AttemptCancelled
+
+
+BASE, SLOW_RATE, SLOW_FACTOR = 0.05, 0.05, 20
+FALLBACK_BASE = 0.08
+NODE = "bench_node"
+
+
+def _model(base: float, slow_rate: float):
+    def attempt(cancel):
+        seconds = random.lognormvariate(0, 0.25) * base
+        if random.random() < slow_rate:
+            seconds *= SLOW_FACTOR
+        # Sleep in slices, like a stream that checks for cancellation per chunk
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            if cancel is not None and cancel.is_set():
+                raise AttemptCancelled()
+            time.sleep(min(0.01, max(0.0, end - time.perf_counter())))
+        return seconds
+    return attempt
+
+
+def _call(_):
+    start = time.perf_counter()
+    _, _, hedged = llm_hedging.run_hedged(
+        NODE,
+        ["primary", "fallback"],
+        [_model(BASE, SLOW_RATE), _model(FALLBACK_BASE, 0.0)],
+        [2 * BASE, 2 * FALLBACK_BASE],
+    )
+    return time.perf_counter() - start, hedged
+
+
+def _run(n: int):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        return list(pool.map(_call, range(n)))
+
+
+def _summary(label: str, results):
+    latencies = sorted(seconds for seconds, _ in results)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+    print(f"{label:<18} p50 {pct(50) * 1000:7.1f} ms   p95 {pct(95) * 1000:7.1f} ms   "
+          f"p99 {pct(99) * 1000:7.1f} ms   max {latencies[-1] * 1000:7.1f} ms")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    llm_hedging.HEDGE_MIN_DELAY_SECONDS = 0.0
+    llm_hedging.print = lambda *a, **k: None   # silence per-hedge logs
+
+    llm_hedging.HEDGE_DISABLED = True
+    _summary("no hedging", _run(n))
+
+    llm_hedging.HEDGE_DISABLED = False
+    llm_hedging.reset_history()
+    _run(llm_hedging.HEDGE_MIN_SAMPLES)  # warm-up fills the latency history
+    results = _run(n)
+    _summary(f"hedged @ p{llm_hedging.HEDGE_PERCENTILE:.0f}", results)
+    print(f"hedge rate: {sum(hedged for _, hedged in results) / n:.1%} of {n} calls")
+
+
+if __name__ == "__main__":
+    main()
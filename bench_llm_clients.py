@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: per-call latency of building a ChatOpenAI client per node
+call (old call_llm behaviour) vs the shared registry in llm_clients.
+
+A local stand-in HTTP server answers every /v1/chat/completions request with
+a canned completion, so the numbers are pure client overhead (SDK client
+construction, connection pool, TCP connection setup). Against the real API
+the shared pool also skips a TLS handshake per call, so real savings are
+larger.
+
+Run:
+  python bench_llm_clients.py [calls]
+"""
+import os
+import sys
+import json
+import time
+import threading
+import statistics
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage, HumanMessage
+
+
+CANNED = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "## Notes\n- benchmark"}}],
+    "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+}).encode()
+
+MESSAGES = [SystemMessage(content="You are Node 1A."), HumanMessage(content="Transcript: hello class")]
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CANNED)))
+        self.end_headers()
+        self.wfile.write(CANNED)
+
+    def log_message(self, *args):
+        pass
+
+
+def _fresh_client_call(base_url: str) -> None:
+    """What every node call used to do: build a ChatOpenAI, one request."""
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, api_key="bench-key", base_url=base_url)
+    llm.invoke(MESSAGES)
+
+
+def _shared_client_call() -> None:
+    from llm_clients import get_chat_model
+    get_chat_model("openai", "gpt-4o-mini", temperature=0.3).invoke(MESSAGES)
+
+
+def _measure(fn, calls: int) -> list[float]:
+    fn()  # warm-up (imports, first connection)
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main() -> int:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "bench-key"
+    os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
+
+    results = {}
+    for label, fn in (
+        ("fresh client per call", lambda: _fresh_client_call(base_url)),
+        ("shared pooled client", _shared_client_call),
+    ):
+        _StandIn.connections = 0
+        samples = _measure(fn, calls)
+        results[label] = samples
+        print(f"{label:>22}: mean {statistics.mean(samples):7.3f} ms | "
+              f"p50 {statistics.median(samples):7.3f} ms | "
+              f"p95 {statistics.quantiles(samples, n=20)[18]:7.3f} ms | "
+              f"TCP connections opened: {_StandIn.connections}")
+
+    before = statistics.mean(results["fresh client per call"])
+    after = statistics.mean(results["shared pooled client"])
+    print(f"\nPer-call latency saved: {before - after:.3f} ms ({before / after:.1f}x faster), "
+          f"{calls} calls each")
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
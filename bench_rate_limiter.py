@@ -0,0 +1,68 @@
+"""
+Benchmark: how rate_limiter shapes a burst of concurrent LLM calls.
+
+N threads (several jobs' nodes firing at once) each acquire one request of
+TOKENS tokens against a model limited to RPM requests and TPM tokens per
+minute. Without the limiter all N go out in the same instant; with it the
+first bucketful goes immediately and the rest follow at the limit rate.
+Run with --processes to split the threads over separate processes sharing
+a SQLite bucket file (LLM_RATE_LIMIT_DB), which must give the same shape.
+
+Run:
+  python bench_rate_limiter.py [calls] [--processes]
+"""
+import os
+import sys
+import time
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import rate_limiter
+
+
+RPM, TPM, TOKENS = 1_200, 240_000, 2_000   # bucket: 200 requests / 40_000 tokens (20 calls)
+MODEL = "bench-model"
+
+
+def _burst(n: int, t0: float, db: str = "") -> list:
+    rate_limiter.RATE_LIMITS[MODEL] = (RPM, TPM)
+    if db:
+        rate_limiter.reset(db)
+
+    def one(_):
+        rate_limiter.acquire("openai", MODEL, TOKENS)
+        return time.time() - t0
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(one, range(n)))
+
+
+def main():
+    n = int(next((a for a in sys.argv[1:] if a.isdigit()), "40"))
+    processes = "--processes" in sys.argv
+    t0 = time.time()
+
+    if processes:
+        db = os.path.join(tempfile.mkdtemp(), "rate.db")
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            parts = pool.map(_burst, [n // 4] * 4, [t0] * 4, [db] * 4)
+            sent = sorted(t for part in parts for t in part)
+    else:
+        sent = sorted(_burst(n, t0))
+
+    wall = sent[-1]
+    steady = [b - a for a, b in zip(sent, sent[1:]) if b - a > 0.01]
+    token_rate = TPM / 60 / TOKENS
+    print(f"{len(sent)} calls, limits {RPM} RPM / {TPM} TPM, {TOKENS} tokens each"
+          f"{' (4 processes, SQLite buckets)' if processes else ''}")
+    print(f"  immediate:            {sum(t < 0.05 for t in sent)}")
+    print(f"  last call sent after: {wall:.2f}s")
+    if steady:
+        print(f"  steady-state gap:     {statistics.median(steady):.3f}s "
+              f"(limit allows one per {1 / min(RPM / 60, token_rate):.3f}s)")
+    print(f"  effective rate:       {(len(sent) - 1) / wall * 60:.0f} calls/min" if wall else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Load test / profile of the whole stack with simulated providers.
+
+Serves the API with uvicorn on a local port and uploads JOBS synthetic
+recordings (MINUTES of 16 kHz mono WAV each) through POST /process,
+CONCURRENCY at a time, polling /status like a client until each job
+completes. Everything runs for real except the providers (simulation.py,
+SIMULATION_MODE=1): HTTP handling, upload probing, the worker, the fake
+transcription backend, normalization, the DAG scheduler, budgets, hedging,
+metrics and the database. The LLM and transcript caches are disabled so
+every job transcribes and calls the simulated models. Rate limits are off
+unless --rate-limits is given (LLM_RATE_LIMITS, or the tier-1 limits if it
+is unset), since they would measure the provider quota rather than our
+overhead.
+
+The run is done twice:
+  - simulated delays at SIM_TIME_SCALE = 0: the job latency is our own
+    overhead only
+  - simulated delays at --time-scale: realistic end-to-end latency
+Each run reports job latency percentiles, throughput and the CPU seconds
+the process spent per job. With --profile the second run is profiled in
+the worker, scheduler and client threads, and the top functions by own
+time are printed (waiting on providers shows up as sleep / lock acquire).
+
+Uploads, recordings and cache files go to a temporary directory.
+Needs ffprobe (upload probing), no API keys and no network.
+
+Run:
+  python bench_simulated_load.py [--jobs 20] [--concurrency 5] [--minutes 10]
+                                 [--time-scale 0.1] [--rate-limits] [--profile]
+"""
+import io
+import os
+import sys
+import time
+import wave
+import pstats
+import random
+import shutil
+import socket
+import argparse
+import cProfile
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="bench_simulated_"))
+os.environ.setdefault("SIMULATION_MODE", "1")
+os.environ.setdefault("LLM_CACHE_DISABLED", "1")
+os.environ.setdefault("LLM_CACHE_PATH", str(WORKDIR / "llm_cache.db"))
+os.environ.setdefault("TRANSCRIPT_CACHE_DIR", str(WORKDIR / "transcript_cache"))
+os.environ.setdefault("TRANSCRIPT_CACHE_MAX_ENTRIES", "0")
+
+import httpx
+import uvicorn
+
+import api
+import database
+import rate_limiter
+import simulation
+
+
+POLL_SECONDS = 0.05
+
+
+def _synthetic_wav(minutes: float) -> Path:
+    """Noise as 16 kHz mono PCM WAV (already in the target format, so no conversion)."""
+    path = WORKDIR / "synthetic.wav"
+    rng = random.Random(0)
+    second = bytes(rng.getrandbits(8) for _ in range(32000))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        for _ in range(int(minutes * 60)):
+            w.writeframes(second)
+    return path
+
+
+def _serve() -> str:
+    """Run the API on a free local port in a background thread; returns its base URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def _job(client: httpx.Client, wav: Path, i: int):
+    start = time.perf_counter()
+    with wav.open("rb") as f:
+        r = client.post(
+            "/process",
+            files={"audio_file": (f"bench_{i}.wav", f, "audio/wav")},
+            data={"subject": "Calculus", "class_name": "12th"},
+        )
+    r.raise_for_status()
+    job_id = r.json()["job_id"]
+    while True:
+        status = client.get(f"/status/{job_id}").json()
+        if status["status"] in ("completed", "failed"):
+            return time.perf_counter() - start, status
+        time.sleep(POLL_SECONDS)
+
+
+def _run(client: httpx.Client, wav: Path, jobs: int, concurrency: int):
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    # Worker logs would drown the report
+    with redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _job(client, wav, i), range(jobs)))
+    return results, time.perf_counter() - t0, time.process_time() - cpu0
+
+
+def _summary(label: str, results, wall: float, cpu: float) -> None:
+    latencies = sorted(seconds for seconds, _ in results)
+    failed = sum(status["status"] == "failed" for _, status in results)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+    calls = sum((status.get("metrics") or {}).get("llm_calls", 0) for _, status in results)
+    print(f"{label:<22} p50 {pct(50):7.3f} s   p95 {pct(95):7.3f} s   max {latencies[-1]:7.3f} s   "
+          f"{len(results) / wall * 60:7.1f} jobs/min   CPU {cpu / len(results) * 1000:7.1f} ms/job   "
+          f"{calls / len(results):.1f} LLM calls/job   {failed} failed")
+
+
+def _profile_threads():
+    """cProfile every thread started from now on, plus this one."""
+    profiles = []
+
+    def start(frame, event, arg):
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.enable()
+
+    threading.setprofile(start)
+    main = cProfile.Profile()
+    profiles.append(main)
+    main.enable()
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--minutes", type=float, default=10.0, help="audio minutes per job")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="SIM_TIME_SCALE of the second run (1 = provider-realistic delays)")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="apply LLM_RATE_LIMITS (tier-1 limits if unset)")
+    parser.add_argument("--profile", action="store_true", help="profile the second run and print the top functions")
+    args = parser.parse_args()
+
+    database.DB_PATH = WORKDIR / "recordings.db"
+    database.init_database()
+    api.UPLOADS_DIR = WORKDIR
+    if not args.rate_limits:
+        rate_limiter.RATE_LIMITS.clear()
+    elif not rate_limiter.RATE_LIMITS:
+        rate_limiter.RATE_LIMITS.update(rate_limiter.TIER1_LIMITS)
+
+    wav = _synthetic_wav(args.minutes)
+    client = httpx.Client(base_url=_serve(), timeout=600)
+    print(f"{args.jobs} jobs x {args.minutes:g} min audio, {args.concurrency} concurrent")
+    try:
+        simulation.TIME_SCALE = 0.0
+        _summary("overhead (no delays)", *_run(client, wav, args.jobs, args.concurrency))
+
+        simulation.TIME_SCALE = args.time_scale
+        profiles = _profile_threads() if args.profile else None
+        results, wall, cpu = _run(client, wav, args.jobs, args.concurrency)
+        if profiles:
+            threading.setprofile(None)
+            for profile in profiles:
+                profile.disable()
+        _summary(f"delays x{args.time_scale:g}", results, wall, cpu)
+    finally:
+        client.close()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    if profiles:
+        print("\nTop functions by own time (all threads):")
+        stats = pstats.Stats(*profiles, stream=sys.stdout)
+        stats.sort_stats("tottime").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
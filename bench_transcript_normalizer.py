@@ -0,0 +1,109 @@
+"""
+Benchmark: transcript_normalizer throughput and token reduction on
+multi-hour class transcripts.
+
+Builds a synthetic transcript of HOURS hours (about 150 spoken words per
+minute, one utterance every ~8 seconds) from lecture sentences with the
+usual classroom noise mixed in: hesitations, stutters, restarted phrases,
+comma-delimited fillers, back-channel replies and crosstalk lines repeated
+by the recognizer. Each level is timed over the whole transcript; tokens
+are counted with tiktoken (or the 4-chars-per-token estimate offline).
+
+Run:
+  python bench_transcript_normalizer.py [hours ...]
+  python bench_transcript_normalizer.py --json lecture.deepgram.json
+"""
+import sys
+import time
+import random
+from pathlib import Path
+
+from token_utils import count_tokens
+from transcript_normalizer import LEVELS, normalize_transcript
+from utterance_index import load_transcript_index
+
+
+WORDS_PER_MINUTE = 150
+SECONDS_PER_UTTERANCE = 8
+
+SENTENCES = [
+    "Today we will look at how the derivative measures the rate of change of a function",
+    "If you take the limit of the difference quotient you get the slope of the tangent line",
+    "Remember that the chain rule applies whenever one function is nested inside another",
+    "Let us write the product rule on the board and check it with a simple example",
+    "The second derivative tells us whether the curve is bending up or bending down",
+    "So for a maximum the first derivative is zero and the second derivative is negative",
+    "This is exactly the kind of question that shows up in the final exam every year",
+    "Notice how the units of the derivative are the units of the output per unit of input",
+]
+EXAMPLES = ["in example", "on page", "for x equal to", "as in exercise", "with step size"]
+FILLERS = ["um,", "uh,", "you know,", "like,", "I mean,", "erm"]
+BACKCHANNELS = ["Yeah.", "Okay.", "Mm-hmm.", "Right, right.", "Okay okay."]
+
+
+def _noisy(sentence: str, rng: random.Random) -> str:
+    words = sentence.split()
+    out = []
+    for i, word in enumerate(words):
+        r = rng.random()
+        if r < 0.06:
+            out.append(rng.choice(FILLERS))
+        elif r < 0.10:
+            out.append(word)                     # stutter
+        elif r < 0.12 and i + 1 < len(words):
+            out.extend([word, words[i + 1]])     # restarted phrase
+        out.append(word)
+    return " ".join(out) + "."
+
+
+def synthetic_utterances(hours: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    utterances = []
+    words_per_utterance = WORDS_PER_MINUTE * SECONDS_PER_UTTERANCE / 60
+    words = 0
+    target = hours * 60 * WORDS_PER_MINUTE
+    while words < target:
+        r = rng.random()
+        if r < 0.10:
+            text = rng.choice(BACKCHANNELS)
+        elif r < 0.14 and utterances:
+            text = utterances[-1]                # crosstalk emitted twice
+        else:
+            parts = []
+            while len(" ".join(parts).split()) < words_per_utterance:
+                # Vary the sentences so only the injected crosstalk repeats verbatim
+                sentence = f"{rng.choice(SENTENCES)} {rng.choice(EXAMPLES)} {rng.randint(1, 500)}"
+                parts.append(_noisy(sentence, rng))
+            text = " ".join(parts)
+        utterances.append(text)
+        words += len(text.split())
+    return utterances
+
+
+def _bench(label: str, utterances: list) -> None:
+    transcript = " ".join(utterances)
+    tokens_before = count_tokens(transcript)
+    kb = len(transcript.encode("utf-8")) / 1e3
+    print(f"\n{label}: {len(utterances)} utterances, {kb:.0f} KB, {tokens_before} tokens")
+    for level in LEVELS:
+        t0 = time.perf_counter()
+        result = normalize_transcript(transcript, utterances, level)
+        seconds = time.perf_counter() - t0
+        tokens_after = count_tokens(result.text)
+        print(f"  {level:<10} {seconds * 1000:8.1f} ms  {kb / 1e3 / max(seconds, 1e-9):7.2f} MB/s  "
+              f"{len(result.utterances or []):6d} utterances  {tokens_after:8d} tokens  "
+              f"(-{1 - tokens_after / tokens_before:.1%})")
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--json"]:
+        index = load_transcript_index(Path(args[1]))
+        _bench(Path(args[1]).name, index.texts())
+        return
+    for hours in [float(a) for a in args] or [1.0, 3.0, 6.0]:
+        _bench(f"{hours:g}h synthetic", synthetic_utterances(hours))
+
+
+if __name__ == "__main__":
+    main()
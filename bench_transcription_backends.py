@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for transcription backends.
+
+Transcribes the same recording with each backend (transcript cache disabled)
+and reports:
+  - wall RTF:      wall-clock seconds per second of audio
+  - RTF per core:  CPU seconds (all threads of this process) per second of
+                   audio; for a remote backend this is only local overhead
+  - x real-time:   audio seconds processed per wall-clock second
+
+Run:
+  python bench_transcription_backends.py lecture.mp3 [--backends deepgram local] [--jobs 2]
+"""
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_to_transcribe_whisper import transcribe_audio_to_text
+from transcription_backends import get_backend
+
+
+def _run_once(path: Path, backend: str) -> float:
+    """Transcribe once and return the audio duration in seconds."""
+    fd, tmp = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    out_json = Path(tmp)
+    with redirect_stdout(io.StringIO()):
+        transcribe_audio_to_text(
+            str(path),
+            out_wav=None,
+            save_json=str(out_json),
+            stream=True,
+            use_cache=False,
+            backend=backend,
+        )
+    duration = json.loads(out_json.read_text(encoding="utf-8")).get("metadata", {}).get("duration", 0.0)
+    out_json.unlink()
+    return float(duration)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Report real-time factor per core for transcription backends.")
+    ap.add_argument("input", type=Path, help="Audio/video file to transcribe")
+    ap.add_argument("--backends", nargs="+", default=["deepgram", "local"])
+    ap.add_argument("--jobs", type=int, default=1, help="Concurrent transcriptions of the same file")
+    args = ap.parse_args()
+
+    if not args.input.exists():
+        raise SystemExit(f"Input not found: {args.input.resolve()}")
+
+    cores = os.cpu_count() or 1
+    print(f"{args.input.name}: {args.jobs} concurrent job(s), {cores} CPU core(s) available\n")
+    print(f"{'backend':>10} | {'model':>14} | {'audio s':>9} | {'wall s':>8} | "
+          f"{'wall RTF':>8} | {'RTF/core':>8} | {'x realtime':>10}")
+
+    for name in args.backends:
+        try:
+            backend = get_backend(name)
+            _run_once(args.input, name)  # warm-up: model load / first connection
+        except Exception as e:
+            print(f"{name:>10} | skipped: {e}")
+            continue
+
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            durations = list(pool.map(lambda _: _run_once(args.input, name), range(args.jobs)))
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+
+        audio = sum(durations)
+        if audio <= 0:
+            print(f"{name:>10} | no duration reported")
+            continue
+        print(f"{name:>10} | {backend.model:>14} | {audio:9.1f} | {wall:8.2f} | "
+              f"{wall / audio:8.3f} | {cpu / audio:8.3f} | {audio / wall:10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,37 +2,78 @@ r"""
 Class Tutor LangGraph - Final Version (Provider & Model Parametrized)
 Supports GPT-5, Gemini, Graph DAG dependencies, structured outputs.
 
-Graph Flow:
+Graph Flow (dependencies derived from the state fields each node reads):
     transcript
        |
   --------------------------
   |                        |
-node_1a_notes      node_1b_misconception
-  |         \            /            |
-  |          \          /             |
-  |           \        /              |
-  |         (notes, misconceptions)   |
-  |         /          |              |
-  |        /           |              |
+node_1a_notes      node_1b_misconceptions      (both start immediately)
+  |      |    \          /
+  |      |     \        /
+  |      |   (notes, misconceptions)
+  |      |      |               |
 node_3_resources   node_2_practice   node_4_actions
     |                   |                   |
     -------- (All paths lead) ---------------
                        |
                       END
+
+node_3 needs only the notes, so it starts as soon as 1A finishes, without
+waiting for 1B (see dag_scheduler.py).
 """
 
 # ---------------------------------------------------------------------
 # Imports
 # ---------------------------------------------------------------------
 import os
-from typing import TypedDict, Tuple, Dict, Any, Annotated
+import sys
+import json
+import math
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import TypedDict, Tuple, Dict, Any, Annotated, List, Callable, Optional, Type, Iterable, Union
 import operator
-from langgraph.graph import StateGraph, END
+from langgraph.config import get_config
 from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
+from pydantic import BaseModel, ValidationError
+
+import llm_batch
+import llm_cache
+import llm_hedging
+import rate_limiter
+import simulation
+import dag_scheduler
+from dag_scheduler import DagScheduler, to_state_graph
+from llm_clients import get_chat_model
+from job_metrics import record_llm_call, record_hedge, record_schedule
+from node_streams import current_buffer
+from token_utils import count_tokens, chunk_transcript
+from tutor_schemas import (
+    ClassNotes,
+    MisconceptionList,
+    concepts_digest,
+    misconceptions_digest,
+    openai_response_format,
+    render_misconceptions,
+    render_notes,
+    render_partial,
+    response_format_kwargs,
+    schema_fingerprint,
+)
+from token_budget import (
+    NODE_TOKEN_BUDGET,
+    JOB_TOKEN_BUDGET,
+    JOB_COST_BUDGET_USD,
+    MESSAGE_OVERHEAD_TOKENS,
+    check_call,
+    call_cost,
+    release_call,
+    call_latency,
+    estimate_transcription,
+)
 
 try:
     from langsmith import uuid7
@@ -53,8 +94,11 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not OPENAI_API_KEY and not GOOGLE_API_KEY:
-    raise RuntimeError("You must set either OPENAI_API_KEY or GOOGLE_API_KEY.")
+# Checked at import but not fatal: estimates, stored results and simulation
+# mode (SIMULATION_MODE=1, see simulation.py) need no key
+if not OPENAI_API_KEY and not GOOGLE_API_KEY and not simulation.ENABLED:
+    print("WARNING: neither OPENAI_API_KEY nor GOOGLE_API_KEY is set; LLM calls will fail "
+          "(set SIMULATION_MODE=1 to run with simulated providers)", file=sys.stderr)
 
 # ---------------------------------------------------------------------
 # Node Model/Provider Configs
@@ -65,10 +109,82 @@ MODEL_NODE_2  = ("gpt-4o-mini", "openai")
 MODEL_NODE_3  = ("gpt-5", "openai")
 MODEL_NODE_4  = ("gemini-2.5-flash", "gemini")
 
+# Ordered fallbacks per node: hedged once the primary passes HEDGE_PERCENTILE
+# of its usual latency, and tried right away if the primary fails
+# (see llm_hedging)
+MODEL_FALLBACKS: Dict[str, List[Tuple[str, str]]] = {
+    "node_1a_notes": [("gemini-2.5-pro", "gemini")],
+    "node_1b_misconceptions": [("gemini-2.5-flash", "gemini")],
+    "node_2_practice": [("gemini-2.5-flash", "gemini")],
+    "node_3_resources": [("gpt-4o", "openai"), ("gemini-2.5-flash", "gemini")],
+    "node_4_actions": [("gpt-4o-mini", "openai")],
+}
+
+# ---------------------------------------------------------------------
+# Long-transcript (map-reduce) mode for nodes 1A/1B
+# ---------------------------------------------------------------------
+# Transcripts longer than this many tokens are split on utterance boundaries;
+# each chunk gets its own notes/misconceptions call and a reduce call merges them
+LONG_TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("LONG_TRANSCRIPT_CHUNK_TOKENS", "12000"))
+# Max concurrent chunk calls per node
+LONG_TRANSCRIPT_MAX_PARALLEL = int(os.getenv("LONG_TRANSCRIPT_MAX_PARALLEL", "4"))
+
+# Expected output tokens per node: budget checks and pre-flight estimates
+EXPECTED_OUTPUT_TOKENS = {
+    "node_1a_notes": 2500,
+    "node_1b_misconceptions": 1200,
+    "node_2_practice": 3000,
+    "node_3_resources": 1800,
+    "node_4_actions": 900,
+}
+# System prompt + output template, i.e. everything in a prompt but the transcript/inputs
+PROMPT_OVERHEAD_TOKENS = 600
+# Downstream nodes read compact digests of these fields, not the full output
+DIGEST_TOKENS = {
+    "notes_1a": 250,
+    "misconceptions_1b": 300,
+}
+
+
+def _chunk_limit() -> int:
+    """Transcript tokens per 1A/1B call: the chunk size, capped by the per-node budget."""
+    if NODE_TOKEN_BUDGET:
+        return max(1000, min(LONG_TRANSCRIPT_CHUNK_TOKENS, NODE_TOKEN_BUDGET - PROMPT_OVERHEAD_TOKENS))
+    return LONG_TRANSCRIPT_CHUNK_TOKENS
+
 # ---------------------------------------------------------------------
 # LLM Helper using LangChain integrations for automatic token tracking
 # ---------------------------------------------------------------------
-def call_llm(provider: str, model: str, system_prompt: str, user_prompt: str) -> str:
+def _temperature(provider: str, model: str) -> Optional[float]:
+    if provider == "openai":
+        # Configure temperature only for non-GPT-5 models
+        return None if model.startswith("gpt-5") else 0.3
+    if provider == "gemini":
+        return 0.3
+    raise ValueError("provider must be 'openai' or 'gemini'")
+
+
+def _current_node() -> Optional[str]:
+    """Name of the graph node this call runs in (None outside the graph)."""
+    node = dag_scheduler.current_node()
+    if node:
+        return node
+    try:
+        return get_config().get("metadata", {}).get("langgraph_node")
+    except RuntimeError:
+        return None
+
+
+def call_llm(
+    provider: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    expected_output_tokens: int = 1500,
+    stream_key: Optional[str] = None,
+    shared_context: Optional[str] = None,
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> str:
     """
     Call LLM using LangChain integrations.
     
@@ -76,31 +192,272 @@ def call_llm(provider: str, model: str, system_prompt: str, user_prompt: str) ->
     eliminating the need for manual token extraction. Token counts, costs,
     and detailed breakdowns (cached tokens, reasoning tokens, etc.) are
     automatically captured and displayed in the LangSmith UI.
+
+    Model clients come from the shared registry in llm_clients, so
+    connections are reused across nodes and jobs. Responses are cached on
+    disk (llm_cache) by provider, model, temperature and prompt hashes;
+    calls, token usage and cache hits are recorded in the current job's
+    metrics (job_metrics).
+
+    The prompt is counted with tiktoken before anything is sent, and the
+    per-node / per-job budgets (token_budget) are enforced; a call may be
+    moved to a cheaper model or rejected with TokenBudgetExceeded.
+
+    Nodes with MODEL_FALLBACKS race the next model once the primary is
+    slower than usual, or switch to it when the primary fails
+    (llm_hedging); the first response wins.
+
+    Before the request is sent, the shared rate limiter (rate_limiter)
+    charges it one request plus the prompt and expected output tokens,
+    queueing the call if the provider/model is at its limit.
+
+    Inside a deferred job (llm_batch.collect_batch) OpenAI calls are not
+    sent: the request is queued for the Batch API and DeferredCall is raised
+    until the batch has answered it.
+
+    The completion is streamed; chunks are appended to the job's live
+    output buffer (node_streams) under `stream_key`, by default the name of
+    the calling graph node.
+
+    `shared_context` (the transcript, or notes and misconceptions) is sent
+    first, after a system prompt common to all nodes, and the node's own
+    system/user prompt follows it (see _prompt_layout). Calls with the same
+    context then begin with an identical prefix, which provider-side prompt
+    caching reuses; cached input tokens are recorded per node.
+
+    With `response_schema` (a tutor_schemas model) the provider is asked for
+    JSON matching it, and the returned text is that JSON. An answer that does
+    not validate counts as a failed attempt, so the node's fallback model is
+    tried; invalid answers are never cached.
     """
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=user_prompt)
-    ]
-    
-    if provider.lower() == "openai":
-        # Configure temperature only for non-GPT-5 models
-        if model.startswith("gpt-5"):
-            llm = ChatOpenAI(model=model, api_key=OPENAI_API_KEY)
+    provider = provider.lower()
+    temperature = _temperature(provider, model)
+    buffer = current_buffer()
+    stream_key = stream_key or _current_node()
+    node = _current_node()
+    system_prompt, user_parts = _prompt_layout(system_prompt, user_prompt, shared_context)
+
+    key = _cache_key(provider, model, temperature, system_prompt, user_parts, response_schema)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        record_llm_call(model, cached["usage"], cache="hit", node=node)
+        if buffer is not None and stream_key:
+            buffer.append(stream_key, cached["response"])
+        return cached["response"]
+
+    # Pre-flight: count tokens and enforce budgets before paying for the call
+    prompt_tokens = (
+        count_tokens(system_prompt, model)
+        + sum(count_tokens(part, model) for part in user_parts)
+        + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+    budget_model = check_call(provider, model, prompt_tokens, expected_output_tokens)
+    # The check reserved the call's estimate in the job budget until its usage is recorded
+    try:
+        if budget_model != model:
+            model = budget_model
+            temperature = _temperature(provider, model)
+            key = _cache_key(provider, model, temperature, system_prompt, user_parts, response_schema)
+            cached = llm_cache.get(key)
+            if cached is not None:
+                record_llm_call(model, cached["usage"], cache="hit", node=node)
+                if buffer is not None and stream_key:
+                    buffer.append(stream_key, cached["response"])
+                return cached["response"]
+
+        collector = llm_batch.current_collector()
+        if collector is not None and provider == "openai":
+            batched = _batched_call(
+                collector, key, model, temperature, system_prompt, user_parts, node, response_schema
+            )
+            if batched is not None:
+                return batched
+
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_parts[0] if len(user_parts) == 1 else [
+                {"type": "text", "text": part} for part in user_parts
+            ])
+        ]
+        candidates = [(model, provider)] + [
+            fallback for fallback in MODEL_FALLBACKS.get(node, []) if fallback != (model, provider)
+        ]
+
+        def attempt(index: int):
+            def run(cancel):
+                attempt_model, attempt_provider = candidates[index]
+                if index:
+                    attempt_model = check_call(attempt_provider, attempt_model, prompt_tokens, expected_output_tokens)
+                try:
+                    rate_limiter.acquire(attempt_provider, attempt_model, prompt_tokens + expected_output_tokens)
+                    # Only the primary streams live; a fallback's text replaces it if it wins
+                    live_key = stream_key if index == 0 and buffer is not None else None
+                    content, usage = _stream_completion(
+                        attempt_provider, attempt_model, messages, cancel, buffer, live_key, response_schema
+                    )
+                    if response_schema is not None:
+                        response_schema.model_validate_json(content)
+                    return attempt_model, content, usage
+                finally:
+                    if index:
+                        release_call(attempt_model, prompt_tokens, expected_output_tokens)
+            return run
+
+        if len(candidates) == 1:
+            winner = 0
+            model, content, usage = attempt(0)(None)
         else:
-            llm = ChatOpenAI(model=model, temperature=0.3, api_key=OPENAI_API_KEY)
-        
-        # LangChain automatically tracks token usage in LangSmith
-        response = llm.invoke(messages)
-        return response.content.strip()
-    
-    elif provider.lower() == "gemini":
-        # ChatGoogleGenerativeAI automatically tracks token usage
-        llm = ChatGoogleGenerativeAI(model=model, google_api_key=GOOGLE_API_KEY,temperature=0.3)
-        response = llm.invoke(messages)
-        return response.content.strip()
-    
+            winner, (model, content, usage), hedged = llm_hedging.run_hedged(
+                node or "call_llm",
+                [m for m, _ in candidates],
+                [attempt(i) for i in range(len(candidates))],
+                [2 * call_latency(m, expected_output_tokens) for m, _ in candidates],
+            )
+            record_hedge(hedged=hedged, fallback_won=winner > 0)
+            if winner and buffer is not None and stream_key:
+                buffer.reset(stream_key)
+                buffer.append(stream_key, content)
+        if buffer is not None:
+            buffer.flush()
+
+        provider = candidates[winner][1]
+        key = _cache_key(provider, model, _temperature(provider, model), system_prompt, user_parts, response_schema)
+        llm_cache.put(key, content, usage)
+        record_llm_call(
+            model,
+            usage,
+            cache="bypassed" if llm_cache.is_bypassed() else "miss",
+            cost_usd=_usage_cost(model, usage),
+            node=node,
+        )
+        return content
+    finally:
+        release_call(budget_model, prompt_tokens, expected_output_tokens)
+
+
+def _prompt_layout(
+    system_prompt: str,
+    user_prompt: str,
+    shared_context: Optional[str],
+) -> Tuple[str, List[str]]:
+    """
+    (system prompt, user message parts) for a call. With a shared context
+    the node's instructions move behind it:
+        [SHARED_SYSTEM_PROMPT] [shared_context] [node system + user prompt]
+    One user message with two text parts keeps the order identical for every
+    provider (Gemini folds later system messages into its system instruction).
+    """
+    if shared_context is None:
+        return system_prompt, [user_prompt]
+    return SHARED_SYSTEM_PROMPT, [shared_context, f"{system_prompt}\n{user_prompt}"]
+
+
+def _cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    system_prompt: str,
+    user_parts: List[str],
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> str:
+    if response_schema is not None:
+        user_parts = user_parts + [schema_fingerprint(response_schema)]
+    user = user_parts[0] if len(user_parts) == 1 else json.dumps(user_parts)
+    return llm_cache.cache_key(provider, model, temperature, system_prompt, user)
+
+
+def _usage_cost(model: str, usage: Dict[str, Any]) -> float:
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    return call_cost(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached_input_tokens=cached)
+
+
+def _batched_call(
+    collector: "llm_batch.BatchCollector",
+    key: str,
+    model: str,
+    temperature: Optional[float],
+    system_prompt: str,
+    user_parts: List[str],
+    node: Optional[str] = None,
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> Optional[str]:
+    """
+    Deferred jobs: the answer from a finished batch, or queue the request
+    for the next one. None = call synchronously (the batch path gave up,
+    or its answer does not match `response_schema`).
+    """
+    answer = collector.answer(key)
+    if answer is None:
+        if collector.synchronous:
+            return None
+        response_format = openai_response_format(response_schema) if response_schema is not None else None
+        collector.request(
+            key, llm_batch.chat_body(model, temperature, system_prompt, user_parts, response_format)
+        )
+        raise llm_batch.DeferredCall(key)
+
+    if response_schema is not None and not answer.get("recorded"):
+        try:
+            response_schema.model_validate_json(answer["response"])
+        except ValidationError as e:
+            print(f"Batch answer for {node} does not match {response_schema.__name__} ({e.error_count()} errors); "
+                  f"calling synchronously")
+            return None
+    if answer.get("recorded"):
+        # Replay of a node that finished this call in an earlier round
+        return answer["response"]
+    answer["recorded"] = True
+    usage = answer["usage"]
+    llm_cache.put(key, answer["response"], usage)
+    record_llm_call(
+        model,
+        usage,
+        cache="bypassed" if llm_cache.is_bypassed() else "miss",
+        cost_usd=llm_batch.BATCH_PRICE_FACTOR * _usage_cost(model, usage),
+        node=node,
+    )
+    return answer["response"]
+
+
+def _stream_completion(
+    provider: str,
+    model: str,
+    messages: List[Any],
+    cancel: Optional[Any] = None,
+    buffer: Optional[Any] = None,
+    stream_key: Optional[str] = None,
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Stream one completion; returns (text, usage). Stops early once `cancel` is set."""
+    temperature = _temperature(provider, model)
+    if temperature is None:
+        llm = get_chat_model(provider, model)
     else:
-        raise ValueError("provider must be 'openai' or 'gemini'")
+        llm = get_chat_model(provider, model, temperature=temperature)
+    
+    # Stream so the job's buffer fills while the model is still generating;
+    # LangChain automatically tracks token usage in LangSmith
+    response = None
+    if buffer is not None and stream_key:
+        buffer.reset(stream_key)
+        if response_schema is not None:
+            # Readers see the JSON received so far rendered as markdown, not raw JSON
+            buffer.set_renderer(stream_key, partial(render_partial, response_schema))
+    kwargs = response_format_kwargs(provider, response_schema) if response_schema is not None else {}
+    stream = llm.stream(messages, **kwargs)
+    try:
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                raise llm_hedging.AttemptCancelled(model)
+            response = chunk if response is None else response + chunk
+            if buffer is not None and stream_key:
+                buffer.append(stream_key, chunk.text)
+    finally:
+        # Closing the generator closes the HTTP response of a cancelled request
+        stream.close()
+    content = response.text.strip() if response is not None else ""
+    usage = dict(getattr(response, "usage_metadata", None) or {})
+    return content, usage
 
 # ---------------------------------------------------------------------
 # State Definition with Annotated Types for Concurrent Updates
@@ -110,68 +467,269 @@ class TutorState(TypedDict):
     transcript: str
     student_level: str
     student_goal: str
+    utterances: List[str]   # optional: utterance texts, used as chunk boundaries
+
+    # Structured outputs of 1A/1B (tutor_schemas.ClassNotes / MisconceptionList as dicts);
+    # one writer each, so no reducer
+    notes_1a: Dict[str, Any]
+    misconceptions_1b: Dict[str, Any]
 
     # Output fields (use Annotated with operator.add to handle multiple concurrent writes)
     # This prevents "Can receive only one value per step" error when nodes run in parallel
-    notes_1a: Annotated[str, operator.add]
-    misconceptions_1b: Annotated[str, operator.add]
     practice_2: Annotated[str, operator.add]
     resources_3: Annotated[str, operator.add]
     actions_4: Annotated[str, operator.add]
 
+# ---------------------------------------------------------------------
+# Map-reduce helpers for long transcripts
+# ---------------------------------------------------------------------
+def _transcript_chunks(state: TutorState, model: str) -> List[str]:
+    return chunk_transcript(
+        state["transcript"],
+        _chunk_limit(),
+        model,
+        utterances=state.get("utterances") or None,
+    )
+
+
+def _parallel_llm_calls(
+    provider: str,
+    model: str,
+    system_prompt: str,
+    user_prompts: List[str],
+    expected_output_tokens: int,
+    shared_contexts: Optional[List[str]] = None,
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> List[str]:
+    """call_llm for every prompt, at most LONG_TRANSCRIPT_MAX_PARALLEL at a time, results in order."""
+    contexts = shared_contexts or [None] * len(user_prompts)
+    if len(user_prompts) == 1:
+        return [call_llm(
+            provider, model, system_prompt, user_prompts[0], expected_output_tokens,
+            shared_context=contexts[0], response_schema=response_schema,
+        )]
+    workers = max(1, min(LONG_TRANSCRIPT_MAX_PARALLEL, len(user_prompts)))
+    node = _current_node() or model
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each call runs in a copy of this context so job metrics / cache bypass still apply;
+        # concurrent calls stream into their own buffer keys
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,
+                call_llm, provider, model, system_prompt, prompt, expected_output_tokens,
+                f"{node}#{i}", context, response_schema,
+            )
+            for i, (prompt, context) in enumerate(zip(user_prompts, contexts), start=1)
+        ]
+        return [f.result() for f in futures]
+
+
+def _map_reduce(
+    provider: str,
+    model: str,
+    chunks: List[str],
+    map_system: str,
+    map_prompt: Callable[[int, int], str],
+    reduce_system: str,
+    reduce_prompt: Callable[[List[str]], str],
+    expected_output_tokens: int,
+    response_schema: Optional[Type[BaseModel]] = None,
+) -> str:
+    """
+    Map: one call per transcript chunk (concurrently), the chunk sent as
+    shared context so 1A and 1B calls on the same chunk share a prefix.
+    Reduce: merge the partial outputs into one; if they do not fit one
+    reduce call, merge them in token-bounded groups and repeat.
+    """
+    n = len(chunks)
+    print(f"Long transcript: {n} chunks for {model} (max {LONG_TRANSCRIPT_MAX_PARALLEL} in parallel)")
+    partials = _parallel_llm_calls(
+        provider, model, map_system,
+        [map_prompt(i + 1, n) for i in range(n)],
+        expected_output_tokens,
+        shared_contexts=[_transcript_context(chunk, i + 1, n) for i, chunk in enumerate(chunks)],
+        response_schema=response_schema,
+    )
+
+    while len(partials) > 1:
+        groups = _group_partials(partials, model)
+        partials = _parallel_llm_calls(
+            provider, model, reduce_system, [reduce_prompt(g) for g in groups], expected_output_tokens,
+            response_schema=response_schema,
+        )
+    return partials[0]
+
+
+def _group_partials(partials: List[str], model: str) -> List[List[str]]:
+    """Consecutive groups of partial outputs that fit one reduce call (at least two per group)."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    tokens = 0
+    for part in partials:
+        part_tokens = count_tokens(part, model)
+        if current and tokens + part_tokens > _chunk_limit() and len(current) > 1:
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(part)
+        tokens += part_tokens
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
+
+
+def _transcript_context(transcript: str, part: int = 0, parts: int = 0) -> str:
+    label = f"Class transcript (part {part} of {parts})" if parts else "Class transcript"
+    return f"{label}:\n\"\"\"{transcript}\"\"\""
+
+
+def _notes_context(notes: Dict[str, Any], misconceptions: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compact digests of the 1A/1B outputs (tutor_schemas), not their full text.
+    Notes first, so a notes-only call shares its prefix with notes + misconceptions calls.
+    """
+    context = f"Class notes:\n\"\"\"{concepts_digest(notes)}\"\"\""
+    if misconceptions is not None:
+        context += (
+            f"\n\nLikely misconceptions and their corrections:\n\"\"\"{misconceptions_digest(misconceptions)}\"\"\""
+        )
+    return context
+
+
+def _structured_output(
+    schema: Type[BaseModel],
+    text: str,
+    render: Callable[[Dict[str, Any]], str],
+) -> Dict[str, Any]:
+    """A node's validated JSON answer as a dict; its full markdown replaces the streamed preview in the live buffer."""
+    data = schema.model_validate_json(text).model_dump()
+    buffer = current_buffer()
+    node = _current_node()
+    if buffer is not None and node:
+        buffer.reset(node)
+        buffer.append(node, render(data))
+        buffer.flush()
+    return data
+
+
+def _numbered_parts(parts: List[str], label: str) -> str:
+    return "\n\n".join(
+        f"{label} {i}:\n\"\"\"{part}\"\"\"" for i, part in enumerate(parts, start=1)
+    )
+
 # ---------------------------------------------------------------------
 # Node Functions
 # ---------------------------------------------------------------------
 
+# Every call with a shared context starts with this system prompt, then the
+# context (transcript or notes), then the node's own role and instructions,
+# so nodes reading the same context send an identical leading prefix
+SHARED_SYSTEM_PROMPT = """You are an AI class tutor working on one recorded class session.
+The class material comes first. The instructions for your current task follow it:
+take on the role they describe and follow their output format exactly.
+"""
+
+# Field guide for the ClassNotes JSON (the provider enforces the schema itself)
+NOTES_1A_FORMAT = """
+- summary: 1–3 short paragraphs
+- key_concepts: the main concepts taught, one short phrase each, in teaching order
+- sections: section-wise notes, each {title, points: [bullet, ...]}
+- glossary: important terms, each {term, definition}
+- formulas: each {formula, explanation}; empty if the class had none
+- examples: each {example, shows}: where it appears / what it shows
+"""
+
+NOTES_1A_REDUCE_SYSTEM = """You are Node 1A – Structured Class Notes Generator (merge step).
+You receive partial notes written for consecutive parts of ONE class session, in order.
+Merge them into a single set of notes that a student can revise from.
+
+Guidelines:
+- Keep the order in which topics were taught.
+- Merge sections that continue the same topic across parts; remove duplicates.
+- Deduplicate key concepts, glossary terms, formulas and examples.
+- The summary must cover the whole session (1–3 short paragraphs).
+- Do NOT add content that is not in the partial notes.
+"""
+
+
 def node_1a_notes(state: TutorState) -> TutorState:
     model, provider = MODEL_NODE_1A
     system_prompt = """You are Node 1A – Structured Class Notes Generator.
-Your job is to convert a classroom transcript into clean, structured notes that a student can revise from.
+Your job is to convert a classroom transcript into structured notes that a student can revise from.
+You answer with a single JSON object; the fields are listed in the task below.
 
 Guidelines:
 - Focus only on the content of this specific class session.
 - Use clear, simple language suitable for the given student level.
-- Be information-dense but not wordy.
+- Be information-dense but not wordy: each point is one short, complete statement.
 - Do NOT invent topics that are not implied by the transcript.
-- Use headings, bullet points, and clear formatting.
-- Include:
-  1) Short summary (1–3 short paragraphs)
-  2) Section-wise notes with titles
-  3) Small glossary (important terms + short definitions)
-  4) Formula list (if there are formulas) with brief explanation
-  5) Example index (brief description of examples discussed)
+- Write plain text inside the fields: no markdown headings, bullet markers or numbering.
+- Fill every field. Keep the glossary small (important terms only) and
+  leave formulas empty if the class had none.
 """
 
     user_prompt = f"""
 Student level: {state.get('student_level', 'college')}
 Student goal: {state.get('student_goal', 'exam')}
-Transcript:
-\"\"\"{state['transcript']}\"\"\"
 
-Produce the full detailed notes in this structure:
+Produce the full detailed notes for the transcript above as JSON with these fields:
+{NOTES_1A_FORMAT}"""
+    
+    chunks = _transcript_chunks(state, model)
+    if len(chunks) == 1:
+        notes = call_llm(
+            provider, model, system_prompt, user_prompt, EXPECTED_OUTPUT_TOKENS["node_1a_notes"],
+            shared_context=_transcript_context(state['transcript']),
+            response_schema=ClassNotes,
+        )
+        return {"notes_1a": _structured_output(ClassNotes, notes, render_notes)}
+
+    def map_prompt(i: int, n: int) -> str:
+        return f"""
+Student level: {state.get('student_level', 'college')}
+Student goal: {state.get('student_goal', 'exam')}
+The transcript above is part {i} of {n} of a long class. Cover only this part.
 
-# Summary
-- ...
+Produce the full detailed notes for this part as JSON with these fields:
+{NOTES_1A_FORMAT}"""
 
-# Section-wise Notes
-## Section 1: ...
-- ...
+    def reduce_prompt(parts: List[str]) -> str:
+        return f"""
+Student level: {state.get('student_level', 'college')}
+Student goal: {state.get('student_goal', 'exam')}
+{_numbered_parts(parts, "Partial notes")}
 
-## Section 2: ...
-- ...
+Produce the merged, full detailed notes as JSON with these fields:
+{NOTES_1A_FORMAT}"""
 
-# Glossary
-- Term: short definition
+    notes = _map_reduce(
+        provider, model, chunks,
+        system_prompt, map_prompt,
+        NOTES_1A_REDUCE_SYSTEM, reduce_prompt,
+        EXPECTED_OUTPUT_TOKENS["node_1a_notes"],
+        response_schema=ClassNotes,
+    )
+    return {"notes_1a": _structured_output(ClassNotes, notes, render_notes)}
 
-# Formulas
-- Formula: explanation
 
-# Example Index
-- Example: where it appears / what it shows
+# Field guide for the MisconceptionList JSON
+MISCONCEPTIONS_1B_FORMAT = """
+- misconceptions: most important first, each
+  {title, why_students_think_this, why_wrong, correction}
+"""
+
+MISCONCEPTIONS_1B_REDUCE_SYSTEM = """You are Node 1B – Misconception Detector (merge step).
+You receive misconception lists written for consecutive parts of ONE class session, in order.
+Merge them into a single list.
+
+You must:
+- Merge misconceptions that are the same or overlap; keep the clearest explanation.
+- Keep the most important misconceptions first.
+- Use simple language suitable for the student level.
+- Do NOT add misconceptions that are not in the lists.
 """
-    
-    notes = call_llm(provider, model, system_prompt, user_prompt)
-    return {"notes_1a": notes}
 
 
 def node_1b_misconceptions(state: TutorState) -> dict:
@@ -181,13 +739,16 @@ Your job is to look only at the class transcript and point out:
 - likely misconceptions
 - typical mistakes
 - confusion points
+You answer with a single JSON object; the fields are listed in the task below.
 
 You must:
 - Use simple language suitable for the student level.
-- For each misconception:
-  - Name it
-  - Explain why it is wrong
-  - Give the correct explanation clearly
+- For each misconception fill in:
+  - title: the misconception, stated as the student would believe it
+  - why_students_think_this: what in the class makes it tempting
+  - why_wrong: why it is wrong
+  - correction: the correct explanation, stated clearly
+- Write plain text inside the fields: no markdown headings, bullet markers or numbering.
 - Do NOT invent far-fetched misconceptions. Stay realistic.
 """
 
@@ -196,19 +757,46 @@ You must:
 
 Student level: {state.get('student_level', 'college')}
 Student goal: {state.get('student_goal', 'exam')}
-Transcript:
-\"\"\"{state['transcript']}\"\"\"
 
-Format:
-## Misconception 1
-- Why students think this:
-- Why it’s wrong:
-- Correct explanation:
+Answer as JSON with these fields:
+{MISCONCEPTIONS_1B_FORMAT}"""
+    chunks = _transcript_chunks(state, model)
+    if len(chunks) == 1:
+        misconceptions = call_llm(
+            provider, model, system_prompt, user_prompt, EXPECTED_OUTPUT_TOKENS["node_1b_misconceptions"],
+            shared_context=_transcript_context(state['transcript']),
+            response_schema=MisconceptionList,
+        )
+        return {"misconceptions_1b": _structured_output(MisconceptionList, misconceptions, render_misconceptions)}
 
-## Misconception 2: ...
-"""
-    misconceptions = call_llm(provider, model, system_prompt, user_prompt)
-    return {"misconceptions_1b": misconceptions}
+    def map_prompt(i: int, n: int) -> str:
+        return f"""
+
+Student level: {state.get('student_level', 'college')}
+Student goal: {state.get('student_goal', 'exam')}
+The transcript above is part {i} of {n} of a long class. Cover only this part.
+
+Answer as JSON with these fields:
+{MISCONCEPTIONS_1B_FORMAT}"""
+
+    def reduce_prompt(parts: List[str]) -> str:
+        return f"""
+
+Student level: {state.get('student_level', 'college')}
+Student goal: {state.get('student_goal', 'exam')}
+{_numbered_parts(parts, "Misconceptions from part")}
+
+Answer as JSON with these fields:
+{MISCONCEPTIONS_1B_FORMAT}"""
+
+    misconceptions = _map_reduce(
+        provider, model, chunks,
+        system_prompt, map_prompt,
+        MISCONCEPTIONS_1B_REDUCE_SYSTEM, reduce_prompt,
+        EXPECTED_OUTPUT_TOKENS["node_1b_misconceptions"],
+        response_schema=MisconceptionList,
+    )
+    return {"misconceptions_1b": _structured_output(MisconceptionList, misconceptions, render_misconceptions)}
 
 
 def node_2_practice(state: TutorState) -> dict:
@@ -232,10 +820,6 @@ Requirements:
 
 Student level: {state.get('student_level', 'college')}
 Student goal: {state.get('student_goal', 'exam')}
-Notes:
-\"\"\"{state.get('notes_1a', '')}\"\"\"
-Misconceptions:
-\"\"\"{state.get('misconceptions_1b', '')}\"\"\"
 
 Output format:
 
@@ -263,7 +847,10 @@ Step-by-step solution:
 Q1. ...
 Solution / reasoning:
 """
-    practice = call_llm(provider, model, system_prompt, user_prompt)
+    practice = call_llm(
+        provider, model, system_prompt, user_prompt, EXPECTED_OUTPUT_TOKENS["node_2_practice"],
+        shared_context=_notes_context(state['notes_1a'], state['misconceptions_1b']),
+    )
     return {"practice_2": practice}
 
 
@@ -291,8 +878,6 @@ Instructions:
 
 Student level: {state.get('student_level', 'college')}
 Student goal: {state.get('student_goal', 'exam')}
-Notes:
-\"\"\"{state.get('notes_1a', '')}\"\"\"
 
 Output format:
 
@@ -312,7 +897,10 @@ Short explanation (2–4 lines).
 ## Concept 2: ...
 """
 
-    resources = call_llm(provider, model, system_prompt, user_prompt)
+    resources = call_llm(
+        provider, model, system_prompt, user_prompt, EXPECTED_OUTPUT_TOKENS["node_3_resources"],
+        shared_context=_notes_context(state['notes_1a']),
+    )
     return {"resources_3": resources}
 
 
@@ -328,14 +916,9 @@ Guidelines:
 - Be specific and actionable.
 - Use simple language.
 - Keep it short enough to follow in real life.
-- Base your advice on the notes, misconceptions.
+- Base your advice on the class notes and likely misconceptions above.
 """
-    user_prompt = f"""
-Notes:
-\"\"\"{state.get('notes_1a', '')}\"\"\"
-Misconceptions:
-\"\"\"{state.get('misconceptions_1b', '')}\"\"\"
-
+    user_prompt = """
 Output format:
 
 # Study Plan (Next 4 Days)
@@ -352,78 +935,149 @@ Day 2: ...
 # Motivational but Realistic Message
 <3–6 lines>
 """
-    actions = call_llm(provider, model, system_prompt, user_prompt)
+    actions = call_llm(
+        provider, model, system_prompt, user_prompt, EXPECTED_OUTPUT_TOKENS["node_4_actions"],
+        shared_context=_notes_context(state['notes_1a'], state['misconceptions_1b']),
+    )
     return {"actions_4": actions}
 
 # ---------------------------------------------------------------------
 # Combined Output Assembler
 # ---------------------------------------------------------------------
+def _rendered(value: Any, render: Callable[[Dict[str, Any]], str]) -> str:
+    """Markdown of a structured node output (plain text is passed through)."""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return render(value)
+
+
 def combine_tutor_outputs(state: TutorState) -> Tuple[str, Dict]:
-    notes = state.get("notes_1a", "").strip()
-    misconceptions = state.get("misconceptions_1b", "").strip()
+    notes = _rendered(state.get("notes_1a"), render_notes)
+    misconceptions = _rendered(state.get("misconceptions_1b"), render_misconceptions)
     practice = state.get("practice_2", "").strip()
     resources = state.get("resources_3", "").strip()
     actions = state.get("actions_4", "").strip()
 
-    combined_md = (
-        "# Class Tutor – Combined Output\n\n"
-        "## 1A – Structured Class Notes\n\n"
-        f"{notes}\n\n"
-        "## 1B – Likely Misconceptions\n\n"
-        f"{misconceptions}\n\n"
-        "## 2 – Practice & Challenges\n\n"
-        f"{practice}\n\n"
-        "## 3 – Real-life Applications & Resources\n\n"
-        f"{resources}\n\n"
-        "## 4 – Actions & Feedback\n\n"
-        f"{actions}\n"
-    )
+    # Sections whose node did not run (not selected, see SECTIONS) are left out
+    parts = [
+        (field, title, text)
+        for field, title, text in (
+            ("notes_1a", "1A – Structured Class Notes", notes),
+            ("misconceptions_1b", "1B – Likely Misconceptions", misconceptions),
+            ("practice_2", "2 – Practice & Challenges", practice),
+            ("resources_3", "3 – Real-life Applications & Resources", resources),
+            ("actions_4", "4 – Actions & Feedback", actions),
+        )
+        if state.get(field)
+    ]
+    combined_md = "# Class Tutor – Combined Output\n\n" + "\n\n".join(
+        f"## {title}\n\n{text}" for _, title, text in parts
+    ) + "\n"
 
     combined_json = {
-        "notes_1a": notes,
-        "misconceptions_1b": misconceptions,
-        "practice_2": practice,
-        "resources_3": resources,
-        "actions_4": actions,
+        **{field: text for field, _, text in parts},
         "combined_text": combined_md,
+        "structured": {
+            "notes_1a": state.get("notes_1a"),
+            "misconceptions_1b": state.get("misconceptions_1b"),
+        },
     }
     return combined_md, combined_json
 
 # ---------------------------------------------------------------------
 # Build Graph
 # ---------------------------------------------------------------------
-def build_tutor_graph():
-    graph = StateGraph(TutorState)
-
-    graph.add_node("node_1a_notes", node_1a_notes)
-    graph.add_node("node_1b_misconceptions", node_1b_misconceptions)
-    graph.add_node("node_2_practice", node_2_practice)
-    graph.add_node("node_3_resources", node_3_resources)
-    graph.add_node("node_4_actions", node_4_actions)
-
-    # Entry point
-    graph.set_entry_point("node_1a_notes")
-
-    # First branch
-    graph.add_edge("node_1a_notes", "node_1b_misconceptions")
-
-    # Downstream dependencies
-    graph.add_edge("node_1a_notes", "node_3_resources")
-    graph.add_edge("node_1b_misconceptions", "node_2_practice")
-    graph.add_edge("node_1a_notes", "node_2_practice")
-    graph.add_edge("node_1a_notes", "node_4_actions")
-    graph.add_edge("node_1b_misconceptions", "node_4_actions")
-
-    # Ending
-    graph.add_edge("node_2_practice", END)
-    graph.add_edge("node_3_resources", END)
-    graph.add_edge("node_4_actions", END)
-
-    return graph.compile()
+TUTOR_NODES = {
+    "node_1a_notes": node_1a_notes,
+    "node_1b_misconceptions": node_1b_misconceptions,
+    "node_2_practice": node_2_practice,
+    "node_3_resources": node_3_resources,
+    "node_4_actions": node_4_actions,
+}
+
+# Dependencies come from the fields each node reads / writes
+SCHEDULER = DagScheduler(TUTOR_NODES)
+
+# Output sections a client can select (`sections`); the nodes they depend on
+# run too, e.g. "practice" also runs notes and misconceptions
+SECTIONS = {
+    "notes": "node_1a_notes",
+    "misconceptions": "node_1b_misconceptions",
+    "practice": "node_2_practice",
+    "resources": "node_3_resources",
+    "actions": "node_4_actions",
+}
+
+
+def parse_sections(sections: Union[None, str, Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    Normalize a section selection ("notes,practice" or a list) to a tuple in
+    SECTIONS order; None / "" / "all" mean every section. Raises ValueError
+    on unknown names.
+    """
+    if sections is None:
+        return None
+    if isinstance(sections, str):
+        sections = sections.split(",")
+    names = {name.strip().lower() for name in sections if name.strip()}
+    if not names or "all" in names:
+        return None
+    unknown = names - SECTIONS.keys()
+    if unknown:
+        raise ValueError(f"Unknown section(s) {', '.join(sorted(unknown))}; choose from {', '.join(SECTIONS)}")
+    if names == SECTIONS.keys():
+        return None
+    return tuple(name for name in SECTIONS if name in names)
+
+
+@lru_cache(maxsize=None)
+def scheduler_for(sections: Optional[Tuple[str, ...]] = None) -> DagScheduler:
+    """The pruned scheduler for a parse_sections() result, built once per selection."""
+    if sections is None:
+        return SCHEDULER
+    return SCHEDULER.subset(SECTIONS[name] for name in sections)
+
+
+def build_tutor_graph(sections: Union[None, str, Iterable[str]] = None):
+    """
+    The same DAG as a compiled LangGraph graph (run_tutor_pipeline uses
+    SCHEDULER), pruned to `sections`; compiled once per selection.
+    """
+    return _compiled_graph(parse_sections(sections))
+
+
+@lru_cache(maxsize=None)
+def _compiled_graph(sections: Optional[Tuple[str, ...]]):
+    return to_state_graph(TutorState, scheduler_for(sections))
+
+
 # ---------------------------------------------------------------------
 # One-shot Runner with LangSmith Tracing
 # ---------------------------------------------------------------------
-def run_tutor_pipeline(transcript: str, student_level="college", student_goal="exam"):
+def initial_state(
+    transcript: str,
+    student_level: str = "college",
+    student_goal: str = "exam",
+    utterances: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    return {
+        "transcript": transcript,
+        "student_level": student_level,
+        "student_goal": student_goal,
+        "utterances": utterances or [],
+    }
+
+
+def run_tutor_pipeline(
+    transcript: str,
+    student_level="college",
+    student_goal="exam",
+    use_llm_cache: bool = True,
+    utterances: Optional[List[str]] = None,
+    sections: Union[None, str, Iterable[str]] = None,
+):
     """
     Run the complete tutor pipeline with LangSmith tracing enabled.
     
@@ -435,13 +1089,24 @@ def run_tutor_pipeline(transcript: str, student_level="college", student_goal="e
     - Input/output for each node
     
     View traces at: https://smith.langchain.com
+
+    With use_llm_cache=False every node calls its model even if an identical
+    prompt was answered before (fresh responses still refresh the cache).
+
+    Transcripts over LONG_TRANSCRIPT_CHUNK_TOKENS are processed by 1A/1B in
+    map-reduce mode; `utterances` (the transcript's utterance texts) are
+    used as chunk boundaries when given, sentence ends otherwise.
+
+    Nodes run as soon as their inputs are ready; the measured schedule and
+    critical path are returned as "schedule" (and recorded in job metrics).
+
+    `sections` (names from SECTIONS, default all) limits the run to the
+    nodes those sections need; the others are skipped and left out of the
+    combined output.
     """
-    app = build_tutor_graph()
-    init_state = {
-        "transcript": transcript,
-        "student_level": student_level,
-        "student_goal": student_goal,
-    }
+    sections = parse_sections(sections)
+    scheduler = scheduler_for(sections)
+    init_state = initial_state(transcript, student_level, student_goal, utterances)
     
     # Configure LangSmith tracing with metadata
     # The LANGCHAIN_TRACING_V2 env var enables automatic tracing
@@ -451,24 +1116,193 @@ def run_tutor_pipeline(transcript: str, student_level="college", student_goal="e
             "student_level": student_level,
             "student_goal": student_goal,
             "transcript_length": len(transcript),
+            "sections": list(sections or SECTIONS),
             "models_used": {
-                "node_1a": MODEL_NODE_1A[0],
-                "node_1b": MODEL_NODE_1B[0],
-                "node_2": MODEL_NODE_2[0],
-                "node_3": MODEL_NODE_3[0],
-                "node_4": MODEL_NODE_4[0],
+                node: NODE_MODELS[node][0] for node in scheduler.order
             }
         },
         "tags": ["class-tutor", "parallel-graph", student_level, student_goal]
     }
     
-    final_state = app.invoke(init_state, config=config)
+    with llm_cache.bypass(not use_llm_cache):
+        final_state, schedule = scheduler.run(init_state, config=config)
+    record_schedule(schedule)
     combined_md, combined_json = combine_tutor_outputs(final_state)
     
     return {
         "final_state": final_state,
         "combined_markdown": combined_md,
         "combined_json": combined_json,
+        "schedule": schedule,
+    }
+
+
+def regeneration_plan(state: Dict[str, Any], sections: Union[None, str, Iterable[str]]) -> List[str]:
+    """
+    Nodes to re-run for `sections` on a stored final_state, in run order:
+    the sections' own nodes, the nodes built on them that had produced
+    output, and any input node that never ran (e.g. practice requested for
+    a recording generated with sections="notes").
+    """
+    selected = parse_sections(sections)
+    targets = [SECTIONS[name] for name in (selected or SECTIONS)]
+    done = {
+        name for name, fields in SCHEDULER.writes.items()
+        if all(state.get(field) for field in fields)
+    }
+    rerun = set(targets) | (SCHEDULER.dependents(targets) & done)
+    rerun |= set(SCHEDULER.subset(rerun).nodes) - done
+    return [name for name in SCHEDULER.order if name in rerun]
+
+
+def regenerate_sections(
+    state: Dict[str, Any],
+    sections: Union[None, str, Iterable[str]],
+    use_llm_cache: bool = False,
+):
+    """
+    Re-run `sections` of a finished pipeline from its stored final_state
+    (transcript, settings and node outputs) without transcribing again or
+    re-running the nodes they do not affect; see regeneration_plan.
+    Returns the same dict as run_tutor_pipeline plus "regenerated" (the
+    nodes that ran).
+
+    The cache is bypassed by default: an identical prompt would otherwise
+    return the answer the client asked to replace.
+    """
+    plan = regeneration_plan(state, sections)
+    scheduler = SCHEDULER.only(plan)
+    config = {
+        "run_name": "Class Tutor Regeneration",
+        "metadata": {
+            "student_level": state.get("student_level"),
+            "student_goal": state.get("student_goal"),
+            "transcript_length": len(state.get("transcript") or ""),
+            "regenerated": plan,
+            "models_used": {node: NODE_MODELS[node][0] for node in plan},
+        },
+        "tags": ["class-tutor", "regenerate"],
+    }
+
+    with llm_cache.bypass(not use_llm_cache):
+        final_state, schedule = scheduler.run(state, config=config)
+    record_schedule(schedule)
+    combined_md, combined_json = combine_tutor_outputs(final_state)
+
+    return {
+        "final_state": final_state,
+        "combined_markdown": combined_md,
+        "combined_json": combined_json,
+        "schedule": schedule,
+        "regenerated": plan,
+    }
+
+# ---------------------------------------------------------------------
+# Pre-flight Cost / Latency Estimate
+# ---------------------------------------------------------------------
+NODE_MODELS = {
+    "node_1a_notes": MODEL_NODE_1A,
+    "node_1b_misconceptions": MODEL_NODE_1B,
+    "node_2_practice": MODEL_NODE_2,
+    "node_3_resources": MODEL_NODE_3,
+    "node_4_actions": MODEL_NODE_4,
+}
+
+
+def _estimate_transcript_node(model: str, transcript_tokens: int, out: int) -> Tuple[int, int, int, float]:
+    """(calls, input tokens, output tokens, latency) of a 1A/1B node, map-reduce included."""
+    limit = _chunk_limit()
+    if transcript_tokens <= limit:
+        return 1, transcript_tokens + PROMPT_OVERHEAD_TOKENS, out, call_latency(model, out)
+
+    n = math.ceil(transcript_tokens / limit)
+    calls, tokens_in, tokens_out = n, transcript_tokens + n * PROMPT_OVERHEAD_TOKENS, n * out
+    latency = math.ceil(n / LONG_TRANSCRIPT_MAX_PARALLEL) * call_latency(model, out)
+    parts = n
+    while parts > 1:
+        groups = math.ceil(parts / max(2, limit // out))
+        calls += groups
+        tokens_in += parts * out + groups * PROMPT_OVERHEAD_TOKENS
+        tokens_out += groups * out
+        latency += math.ceil(groups / LONG_TRANSCRIPT_MAX_PARALLEL) * call_latency(model, out)
+        parts = groups
+    return calls, tokens_in, tokens_out, latency
+
+
+def estimate_pipeline(
+    duration_seconds: Optional[float] = None,
+    transcript_tokens: Optional[int] = None,
+    deferred: bool = False,
+    sections: Union[None, str, Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Estimate tokens, cost and wall-clock latency of a job before it runs,
+    from the audio duration (transcription included) or a known transcript
+    size. Latency follows the graph's critical path. With deferred=True
+    OpenAI calls are priced at the Batch API rate; the latency is then only
+    the model time, batches may take up to their completion window.
+    Only the nodes needed for `sections` are counted.
+    """
+    scheduler = scheduler_for(parse_sections(sections))
+    transcription = estimate_transcription(duration_seconds or 0.0)
+    if transcript_tokens is None:
+        transcript_tokens = transcription["transcript_tokens"]
+    field_tokens = {"transcript": transcript_tokens}
+
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for node in scheduler.order:
+        reads = scheduler.reads[node]
+        model = NODE_MODELS[node][0]
+        out = EXPECTED_OUTPUT_TOKENS[node]
+        if "transcript" in reads:
+            calls, tokens_in, tokens_out, latency = _estimate_transcript_node(model, transcript_tokens, out)
+        else:
+            calls, tokens_out, latency = 1, out, call_latency(model, out)
+            tokens_in = PROMPT_OVERHEAD_TOKENS + sum(field_tokens.get(f, 0) for f in reads)
+        for field in scheduler.writes[node]:
+            field_tokens[field] = DIGEST_TOKENS.get(field, out)
+        nodes[node] = {
+            "model": model,
+            "calls": calls,
+            "input_tokens": tokens_in,
+            "output_tokens": tokens_out,
+            "cost_usd": round(
+                call_cost(model, tokens_in, tokens_out)
+                * (llm_batch.BATCH_PRICE_FACTOR if deferred and NODE_MODELS[node][1] == "openai" else 1.0),
+                4,
+            ),
+            "latency_seconds": round(latency, 1),
+        }
+
+    # Critical path over the scheduler's dependencies
+    finish: Dict[str, float] = {}
+    for node in scheduler.order:
+        start = max((finish[d] for d in scheduler.deps[node]), default=0.0)
+        finish[node] = start + nodes[node]["latency_seconds"]
+    llm_latency = max(finish.values())
+    llm_cost = sum(n["cost_usd"] for n in nodes.values())
+    total_tokens = sum(n["input_tokens"] + n["output_tokens"] for n in nodes.values())
+
+    return {
+        "audio_seconds": duration_seconds,
+        "transcript_tokens": transcript_tokens,
+        "llm_calls": sum(n["calls"] for n in nodes.values()),
+        "llm_tokens": total_tokens,
+        "cost_usd": {
+            "transcription": round(transcription["cost_usd"], 4),
+            "llm": round(llm_cost, 4),
+            "total": round(transcription["cost_usd"] + llm_cost, 4),
+        },
+        "latency_seconds": {
+            "transcription": round(transcription["latency_seconds"], 1),
+            "llm": round(llm_latency, 1),
+            "total": round(transcription["latency_seconds"] + llm_latency, 1),
+        },
+        "within_budget": (
+            (not JOB_TOKEN_BUDGET or total_tokens <= JOB_TOKEN_BUDGET)
+            and (not JOB_COST_BUDGET_USD or llm_cost <= JOB_COST_BUDGET_USD)
+        ),
+        "nodes": nodes,
     }
 
 # ---------------------------------------------------------------------
@@ -20,14 +20,19 @@ You must have:
 """
 
 import os
+import sys
 from typing import TypedDict, Optional
 
-from langgraph.graph import StateGraph, END
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from dag_scheduler import DagScheduler, to_state_graph
+import rate_limiter
+import simulation
+from llm_clients import get_chat_model
+from token_utils import count_tokens
+
 load_dotenv()
 
 # ---------------------------------------------------------------------
@@ -37,8 +42,10 @@ load_dotenv()
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
-if not OPENAI_API_KEY and not GEMINI_API_KEY:
-    raise RuntimeError("Please set either OPENAI_API_KEY or GEMINI_API_KEY in your environment.")
+# Not fatal: simulation mode (SIMULATION_MODE=1, see simulation.py) needs no key
+if not OPENAI_API_KEY and not GEMINI_API_KEY and not simulation.ENABLED:
+    print("WARNING: neither OPENAI_API_KEY nor GEMINI_API_KEY is set; LLM calls will fail "
+          "(set SIMULATION_MODE=1 to run with simulated providers)", file=sys.stderr)
 
 # Model names (adjust to whatever your account exposes)
 MODEL_NODE_1A = "gpt-4o"
@@ -68,9 +75,11 @@ def call_openai(model: str, system_prompt: str, user_prompt: str) -> str:
     
     # Configure temperature only for non-GPT-5 models
     if "gpt-5" in model.lower():
-        llm = ChatOpenAI(model=model, api_key=OPENAI_API_KEY)
+        llm = get_chat_model("openai", model)
     else:
-        llm = ChatOpenAI(model=model, temperature=0.3, api_key=OPENAI_API_KEY)
+        llm = get_chat_model("openai", model, temperature=0.3)
+
+    rate_limiter.acquire("openai", model, count_tokens(system_prompt + user_prompt, model) + 1500)
     
     # LangChain automatically tracks token usage in LangSmith
     response = llm.invoke(messages)
@@ -82,6 +91,8 @@ def call_openai(model: str, system_prompt: str, user_prompt: str) -> str:
 # ---------------------------------------------------------------------
 
 
+# Nodes return only the fields they write, and every field has a single
+# writer, so parallel nodes never update the same key (no reducers needed)
 class TutorState(TypedDict, total=False):
     # Input
     transcript: str
@@ -152,7 +163,7 @@ Produce the full detailed notes in this structure:
 """
 
     notes = call_openai(MODEL_NODE_1A, system_prompt, user_prompt)
-    return {**state, "notes_1a": notes}
+    return {"notes_1a": notes}
 
 
 # ---------------------------------------------------------------------
@@ -162,7 +173,6 @@ Produce the full detailed notes in this structure:
 
 def node_1b_misconceptions(state: TutorState) -> TutorState:
     transcript = state["transcript"]
-    notes = state.get("notes_1a", "")
     level = state.get("student_level", "college")
 
     system_prompt = """You are Node 1B – Misconception Detector.
@@ -198,7 +208,7 @@ Output format:
 """
 
     misconceptions = call_openai(MODEL_NODE_1B, system_prompt, user_prompt)
-    return {**state, "misconceptions_1b": misconceptions}
+    return {"misconceptions_1b": misconceptions}
 
 # ---------------------------------------------------------------------
 # Node 2 – Practice & Challenges (GPT-4o)
@@ -262,7 +272,7 @@ Solution / reasoning:
 """
 
     practice = call_openai(MODEL_NODE_2, system_prompt, user_prompt)
-    return {**state, "practice_2": practice}
+    return {"practice_2": practice}
 
 
 # ---------------------------------------------------------------------
@@ -272,7 +282,6 @@ Solution / reasoning:
 
 def node_3_resources(state: TutorState) -> TutorState:
     notes = state.get("notes_1a", "")
-    practice = state.get("practice_2", "")
     level = state.get("student_level", "college")
     goal = state.get("student_goal", "exam preparation")
 
@@ -321,7 +330,7 @@ Short explanation (2–4 lines).
 """
 
     resources = call_openai(MODEL_NODE_3, system_prompt, user_prompt)
-    return {**state, "resources_3": resources}
+    return {"resources_3": resources}
 
 
 # ---------------------------------------------------------------------
@@ -332,8 +341,6 @@ Short explanation (2–4 lines).
 def node_4_actions(state: TutorState) -> TutorState:
     notes = state.get("notes_1a", "")
     misconceptions = state.get("misconceptions_1b", "")
-    practice = state.get("practice_2", "")
-    resources = state.get("resources_3", "")
     level = state.get("student_level", "college")
     goal = state.get("student_goal", "exam preparation")
 
@@ -379,7 +386,7 @@ Day 2: ...
 """
 
     actions = call_openai(MODEL_NODE_4, system_prompt, user_prompt)
-    return {**state, "actions_4": actions}
+    return {"actions_4": actions}
 
 
 # ---------------------------------------------------------------------
@@ -387,23 +394,19 @@ Day 2: ...
 # ---------------------------------------------------------------------
 
 
-def build_tutor_graph():
-    graph = StateGraph(TutorState)
-
-    graph.add_node("node_1a_notes", node_1a_notes)
-    graph.add_node("node_1b_misconceptions", node_1b_misconceptions)
-    graph.add_node("node_2_practice", node_2_practice)
-    graph.add_node("node_3_resources", node_3_resources)
-    graph.add_node("node_4_actions", node_4_actions)
+# Dependencies come from the fields each node reads: 1A and 1B start
+# together, 2 waits for both, 3 needs only 1A, 4 needs 1A and 1B
+SCHEDULER = DagScheduler({
+    "node_1a_notes": node_1a_notes,
+    "node_1b_misconceptions": node_1b_misconceptions,
+    "node_2_practice": node_2_practice,
+    "node_3_resources": node_3_resources,
+    "node_4_actions": node_4_actions,
+})
 
-    graph.set_entry_point("node_1a_notes")
-    graph.add_edge("node_1a_notes", "node_1b_misconceptions")
-    graph.add_edge("node_1b_misconceptions", "node_2_practice")
-    graph.add_edge("node_2_practice", "node_3_resources")
-    graph.add_edge("node_3_resources", "node_4_actions")
-    graph.add_edge("node_4_actions", END)
 
-    return graph.compile()
+def build_tutor_graph():
+    return to_state_graph(TutorState, SCHEDULER)
 
 
 # ---------------------------------------------------------------------
@@ -457,19 +460,20 @@ def run_tutor_pipeline(
     {
       'final_state': <TutorState>,
       'combined_markdown': <str>,
-      'combined_json': <dict>
+      'combined_json': <dict>,
+      'schedule': <node timings + critical path>
     }
     """
-    app = build_tutor_graph()
     init_state: TutorState = {
         "transcript": transcript,
         "student_level": student_level,
         "student_goal": student_goal,
     }
-    final_state = app.invoke(init_state)
+    final_state, schedule = SCHEDULER.run(init_state)
     combined_md, combined_json = combine_tutor_outputs(final_state)
     return {
         "final_state": final_state,
         "combined_markdown": combined_md,
         "combined_json": combined_json,
+        "schedule": schedule,
     }
@@ -111,11 +111,26 @@
 import os
 import sys
 import json
+import glob
+import time
+import wave
 import argparse
+import threading
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from dotenv import load_dotenv
-from deepgram import DeepgramClient, PrerecordedOptions
+from typing import Optional
+
+from audio_to_transcribe_whisper import _transcribe_whisper
+
+# File types picked up when the input is a directory
+MEDIA_EXTENSIONS = {
+    ".mp3", ".wav", ".m4a", ".aac", ".flac", ".ogg", ".opus", ".wma", ".webm",
+    ".mp4", ".mkv", ".mov", ".avi",
+}
+# Files this script writes itself (see batch_outputs); never inputs
+OUTPUT_SUFFIXES = (".converted.wav",)
 
 def run(cmd: list[str]) -> None:
     try:
@@ -127,13 +142,15 @@ def run(cmd: list[str]) -> None:
         print(f"ERROR: Command failed: {' '.join(cmd)}", file=sys.stderr)
         raise
 
-def convert_to_wav(src: Path, dst: Path, sr: int = 16000) -> Path:
+def convert_to_wav(src: Path, dst: Path, sr: int = 16000, quiet: bool = False) -> Path:
     """Convert any audio/video to 16 kHz mono WAV (PCM s16le). Requires ffmpeg."""
     if dst.suffix.lower() != ".wav":
         dst = dst.with_suffix(".wav")
     dst.parent.mkdir(parents=True, exist_ok=True)
-    cmd = [
-        "ffmpeg", "-y",
+    cmd = ["ffmpeg", "-y"]
+    if quiet:
+        cmd += ["-nostdin", "-loglevel", "error"]
+    cmd += [
         "-i", str(src),
         "-ac", "1",
         "-ar", str(sr),
@@ -152,35 +169,11 @@ def transcribe_whisper(wav_path: Path, language: str = "auto", diarize: bool = F
       - explicit code like "en", "hi", "de" ... to lock language
     diarize:
       - False by default; set True to get speaker labels
+
+    Uses the process-wide pooled Deepgram client of audio_to_transcribe_whisper,
+    so concurrent batch transcriptions share its connections.
     """
-    load_dotenv()
-    key = os.getenv("DEEPGRAM_API_KEY", "").strip()
-    if not key:
-        raise SystemExit("Set DEEPGRAM_API_KEY in .env")
-
-    dg = DeepgramClient(key)
-
-    with open(wav_path, "rb") as f:
-        buf = f.read()
-
-    params = dict(
-        model="whisper-large",
-        utterances=True,      # sentence-like chunks
-        smart_format=True,    # nicer numbers, dates, casing, punctuation
-        diarize=diarize,
-    )
-    if language and language.lower() != "auto":
-        params["language"] = language  # lock language if provided
-
-    opts = PrerecordedOptions(**params)
-
-    print(f"Transcribing {wav_path.name} with model=whisper-large "
-          f"(language={language}, diarize={diarize}) …")
-    res = dg.listen.prerecorded.v("1").transcribe_file(
-        {"buffer": buf, "mimetype": "audio/wav"},
-        opts
-    )
-    return res.to_dict()
+    return _transcribe_whisper(wav_path, language=language, diarize=diarize)
 
 def print_sentence_view(dg_json: dict) -> None:
     utterances = dg_json.get("results", {}).get("utterances", [])
@@ -202,16 +195,156 @@ def print_sentence_view(dg_json: dict) -> None:
         else:
             print(f"[{start}–{end}] {text}")
 
+def wav_seconds(wav_path: Path) -> float:
+    with wave.open(str(wav_path), "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+def save_json_atomic(dg_json: dict, path: Path) -> None:
+    """Write via a temp file so an interrupted run never leaves a half-written (skippable) transcript."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dg_json, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+# ---------------------------------------------------------------------
+# Batch mode: directory or glob of recordings
+# ---------------------------------------------------------------------
+def is_batch_input(arg: str) -> bool:
+    return Path(arg).is_dir() or any(ch in arg for ch in "*?[")
+
+def is_output_file(path: Path) -> bool:
+    """True for intermediate files of an earlier run (e.g. kept with --keep-wav)."""
+    return path.name.lower().endswith(OUTPUT_SUFFIXES)
+
+def find_inputs(arg: str) -> tuple[list[Path], Path]:
+    """
+    Return (media files, root the per-file output paths are made relative to).
+    Files this script wrote itself are skipped, so a rerun does not pick up
+    the *.converted.wav files of an earlier --keep-wav run as recordings.
+    """
+    if Path(arg).is_dir():
+        root = Path(arg)
+        files = [p for p in root.rglob("*")
+                 if p.is_file() and p.suffix.lower() in MEDIA_EXTENSIONS and not is_output_file(p)]
+    else:
+        files = [Path(p) for p in glob.glob(arg, recursive=True)
+                 if Path(p).is_file() and not is_output_file(Path(p))]
+        root = Path(os.path.commonpath([str(p.parent.resolve()) for p in files])) if files else Path(".")
+    return sorted(files), root
+
+def batch_outputs(src: Path, root: Path, out_dir: Optional[Path]) -> tuple[Path, Path]:
+    """Per-file output paths: <out_dir>/<relative path>.wav/.json, or next to the input."""
+    if out_dir is None:
+        base = src.with_suffix("")
+    else:
+        base = out_dir / src.resolve().relative_to(root.resolve()).with_suffix("")
+    return base.with_name(base.name + ".converted.wav"), base.with_name(base.name + ".transcript.json")
+
+class BatchProgress:
+    """Thread-safe counters plus a one-line aggregate progress report."""
+
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def finish(self, name: str, audio_seconds: float = 0.0, error: Optional[BaseException] = None) -> None:
+        with self.lock:
+            if error is None:
+                self.done += 1
+                self.audio_seconds += audio_seconds
+            else:
+                self.failed += 1
+                print(f"FAILED {name}: {error}", file=sys.stderr)
+            wall = time.perf_counter() - self.started
+            rate = (self.audio_seconds / wall) if wall > 0 else 0.0
+            print(f"[{self.done + self.failed}/{self.total}] {name} | done={self.done} "
+                  f"failed={self.failed} skipped={self.skipped} | "
+                  f"{self.audio_seconds / 3600:.2f} h audio in {wall / 3600:.3f} h wall "
+                  f"= {rate:.1f} audio-h/wall-h", flush=True)
+
+def run_batch(args) -> int:
+    files, root = find_inputs(args.input)
+    if not files:
+        raise SystemExit(f"No media files match: {args.input}")
+
+    pending = []
+    skipped = 0
+    for src in files:
+        wav_path, json_path = batch_outputs(src, root, args.out_dir)
+        if not args.overwrite and json_path.exists() and json_path.stat().st_size > 0:
+            skipped += 1
+            continue
+        pending.append((src, wav_path, json_path))
+
+    print(f"Batch: {len(files)} file(s), {skipped} already transcribed, {len(pending)} to do "
+          f"({args.jobs} ffmpeg process(es), {args.concurrency} concurrent transcription(s))")
+    progress = BatchProgress(len(pending), skipped)
+
+    # Conversions may run ahead of transcriptions only by this many files, which
+    # bounds the number of intermediate WAVs on disk at any time
+    slots = threading.BoundedSemaphore(args.jobs + args.concurrency)
+
+    def transcribe(src: Path, wav_path: Path, json_path: Path) -> None:
+        try:
+            seconds = wav_seconds(wav_path)
+            dg_json = transcribe_whisper(wav_path, language=args.language, diarize=args.diarize)
+            save_json_atomic(dg_json, json_path)
+            progress.finish(src.name, seconds)
+        except (Exception, SystemExit) as e:  # SystemExit: missing API key
+            progress.finish(src.name, error=e)
+        finally:
+            if not args.keep_wav:
+                wav_path.unlink(missing_ok=True)
+            slots.release()
+
+    def on_converted(src: Path, wav_path: Path, json_path: Path, fut) -> None:
+        if fut.exception() is not None:
+            progress.finish(src.name, error=fut.exception())
+            slots.release()
+            return
+        tpool.submit(transcribe, src, wav_path, json_path)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as cpool, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as tpool:
+        for src, wav_path, json_path in pending:
+            slots.acquire()
+            fut = cpool.submit(convert_to_wav, src, wav_path, 16000, True)
+            fut.add_done_callback(partial(on_converted, src, wav_path, json_path))
+        # Every slot back means every file finished (or failed)
+        for _ in range(args.jobs + args.concurrency):
+            slots.acquire()
+
+    print(f"\nDone: {progress.done} transcribed, {progress.failed} failed, {skipped} skipped.")
+    return 1 if progress.failed else 0
+
 def main():
     ap = argparse.ArgumentParser(description="Convert to WAV and transcribe with Deepgram Whisper Large (utterances, optional diarization).")
-    ap.add_argument("input", type=Path, help="Path to input media (any format ffmpeg can read)")
+    ap.add_argument("input", help="Path to input media (any format ffmpeg can read), "
+                                   "or a directory / quoted glob like 'archive/**/*.mp3' for batch mode")
     ap.add_argument("--out-wav", type=Path, default=Path("converted.wav"), help="Output WAV path")
     ap.add_argument("--save-json", type=Path, default=Path("transcript_full.json"), help="Where to save full JSON")
     ap.add_argument("--language", default="auto",
                     help="Language: 'auto' (default) or ISO code like 'en','hi','de' to lock it")
     ap.add_argument("--diarize", action="store_true", help="Enable speaker diarization")
+    batch = ap.add_argument_group("batch mode (directory or glob input)")
+    batch.add_argument("--out-dir", type=Path, default=None,
+                       help="Write <name>.transcript.json here (mirroring subfolders) instead of next to each input")
+    batch.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel ffmpeg conversions (processes)")
+    batch.add_argument("--concurrency", type=int, default=4, help="Concurrent transcription requests")
+    batch.add_argument("--overwrite", action="store_true", help="Re-transcribe files that already have a transcript")
+    batch.add_argument("--keep-wav", action="store_true", help="Keep the intermediate WAV files")
     args = ap.parse_args()
 
+    if is_batch_input(args.input):
+        sys.exit(run_batch(args))
+
+    args.input = Path(args.input)
     if not args.input.exists():
         raise SystemExit(f"Input not found: {args.input.resolve()}")
 
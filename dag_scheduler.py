@@ -0,0 +1,312 @@
+"""
+Dependency-driven scheduler for the tutor pipelines.
+
+Node dependencies are derived from the state fields each node reads and
+writes, found by parsing the node function's source (`state["x"]`,
+`state.get("x")`, and the keys of the dict literal(s) it returns). Node B
+depends on node A iff B reads a field A writes; fields nobody writes are
+inputs. Every constant-key read counts, used or not: a stray
+`state.get("x")` left in a node makes it wait for x's writer. A node whose
+reads cannot be found this way (keys built at run time, reads in helpers)
+declares them with `@reads("x", "y")`, which replaces the analysis.
+
+Every node starts as soon as its own dependencies are done, with no
+superstep barrier (LangGraph waits for a whole step before starting the
+next one, so a node that needs only 1A would still wait for 1B). Each node
+runs in a copy of the caller's context, so job metrics, stream buffers and
+LangSmith parent runs carry over. The measured schedule, including the
+critical path (the chain of nodes that determined the wall time), is
+returned alongside the final state.
+
+Usage:
+    scheduler = DagScheduler({"node_1a_notes": node_1a_notes, ...})
+    final_state, report = scheduler.run(init_state, config={"run_name": ...})
+    report["critical_path"]   # ["node_1a_notes", "node_3_resources"]
+
+    scheduler.subset(["node_2_practice"])   # only 2 and what it depends on
+    scheduler.dependents(["node_1b_misconceptions"])   # 1B and what depends on it
+"""
+import ast
+import sys
+import time
+import inspect
+import textwrap
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableLambda
+
+
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("dag_node", default=None)
+
+
+def current_node() -> Optional[str]:
+    """Name of the scheduler node the caller runs in (None outside a node)."""
+    return _current_node.get()
+
+
+# ---------------------------------------------------------------------
+# Static read/write analysis
+# ---------------------------------------------------------------------
+def _function_ast(fn: Callable) -> ast.FunctionDef:
+    tree = ast.parse(textwrap.dedent(inspect.getsource(fn)))
+    return tree.body[0]
+
+
+def reads(*fields: str) -> Callable[[Callable], Callable]:
+    """Decorator: the node reads exactly `fields` (skips the source analysis)."""
+    def decorate(fn: Callable) -> Callable:
+        fn.state_reads = frozenset(fields)
+        return fn
+    return decorate
+
+
+def state_fields_read(fn: Callable) -> Set[str]:
+    """
+    Fields declared with @reads, otherwise the constant keys read from the
+    function's first argument via [..] or .get(..).
+    """
+    declared = getattr(fn, "state_reads", None)
+    if declared is not None:
+        return set(declared)
+    func = _function_ast(fn)
+    state = func.args.args[0].arg
+    reads = set()
+    for node in ast.walk(func):
+        if (
+            isinstance(node, ast.Subscript)
+            and isinstance(node.value, ast.Name) and node.value.id == state
+            and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str)
+        ):
+            reads.add(node.slice.value)
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute) and node.func.attr == "get"
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == state
+            and node.args and isinstance(node.args[0], ast.Constant)
+        ):
+            reads.add(node.args[0].value)
+    return reads
+
+
+def state_fields_written(fn: Callable) -> Set[str]:
+    """Constant keys of the dict literal(s) returned by the function itself."""
+    func = _function_ast(fn)
+    writes = set()
+    for node in ast.walk(func):
+        if isinstance(node, ast.Return) and isinstance(node.value, ast.Dict):
+            for key in node.value.keys:
+                if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                    writes.add(key.value)
+    return writes
+
+
+# ---------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------
+class _TrackingState(dict):
+    """State copy that records which keys a node reads (catches reads the static pass missed)."""
+
+    def __init__(self, data: Dict[str, Any]):
+        super().__init__(data)
+        self.read_keys: Set[str] = set()
+
+    def __getitem__(self, key):
+        self.read_keys.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.read_keys.add(key)
+        return super().get(key, default)
+
+
+class DagScheduler:
+    def __init__(
+        self,
+        nodes: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]],
+        max_workers: Optional[int] = None,
+        reads: Optional[Dict[str, Set[str]]] = None,
+        writes: Optional[Dict[str, Set[str]]] = None,
+    ):
+        self.nodes = dict(nodes)
+        self.max_workers = max_workers or len(self.nodes)
+        # `reads` / `writes` skip the source analysis (subset() passes its parent's)
+        self.reads = reads or {name: state_fields_read(fn) for name, fn in self.nodes.items()}
+        self.writes = writes or {name: state_fields_written(fn) for name, fn in self.nodes.items()}
+
+        writer: Dict[str, str] = {}
+        for name, fields in self.writes.items():
+            for field in fields:
+                if field in writer:
+                    raise ValueError(f"State field {field!r} is written by both {writer[field]} and {name}")
+                writer[field] = name
+        self._writer = writer
+        self.deps = {
+            name: sorted({writer[f] for f in self.reads[name] if f in writer and writer[f] != name})
+            for name in self.nodes
+        }
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, done, visiting = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through {name}")
+            visiting.add(name)
+            for dep in self.deps[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    def dependencies(self) -> Dict[str, List[str]]:
+        return {name: list(deps) for name, deps in self.deps.items()}
+
+    def only(self, names: Iterable[str]) -> "DagScheduler":
+        """
+        Scheduler for just `names`; the fields the other nodes write become
+        inputs, so they must already be in the state it runs on.
+        """
+        keep = set(names)
+        unknown = keep - self.nodes.keys()
+        if unknown:
+            raise ValueError(f"Unknown node(s) {sorted(unknown)}")
+        return DagScheduler(
+            {name: self.nodes[name] for name in self.order if name in keep},
+            reads={name: self.reads[name] for name in keep},
+            writes={name: self.writes[name] for name in keep},
+        )
+
+    def subset(self, targets: Iterable[str]) -> "DagScheduler":
+        """Scheduler for `targets` and every node they depend on, directly or not."""
+        return self.only(self._closure(targets, self.deps))
+
+    def dependents(self, targets: Iterable[str]) -> Set[str]:
+        """`targets` and every node that depends on them, directly or not."""
+        users: Dict[str, List[str]] = {name: [] for name in self.nodes}
+        for name, deps in self.deps.items():
+            for dep in deps:
+                users[dep].append(name)
+        return self._closure(targets, users)
+
+    def _closure(self, targets: Iterable[str], edges: Dict[str, List[str]]) -> Set[str]:
+        keep: Set[str] = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise ValueError(f"Unknown node {name!r}")
+            if name not in keep:
+                keep.add(name)
+                stack.extend(edges[name])
+        return keep
+
+    def _run_node(self, name: str, state: Dict[str, Any]) -> Tuple[Dict[str, Any], float, float]:
+        token = _current_node.set(name)
+        try:
+            tracked = _TrackingState(state)
+            start = time.perf_counter()
+            # RunnableLambda gives every node its own (child) LangSmith run
+            output = RunnableLambda(self.nodes[name], name=name).invoke(tracked)
+            end = time.perf_counter()
+        finally:
+            _current_node.reset(token)
+
+        hidden = {f for f in tracked.read_keys if f in self._writer and self._writer[f] not in self.deps[name]
+                  and self._writer[f] != name}
+        if hidden:
+            print(f"WARNING: {name} read {sorted(hidden)} without depending on the node that writes them",
+                  file=sys.stderr)
+        return {k: v for k, v in (output or {}).items() if k in self.writes[name]}, start, end
+
+    def run(self, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Run every node once, each as soon as its dependencies finished, and
+        return (final_state, schedule report). `config` (run_name, metadata,
+        tags) names the parent run the node runs are traced under.
+        """
+        return RunnableLambda(self._run, name="DagScheduler").invoke(state, config=config)
+
+    def _run(self, state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        state = dict(state)
+        timings: Dict[str, Tuple[float, float]] = {}
+        remaining = {name: set(deps) for name, deps in self.deps.items()}
+        t0 = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            def launch_ready():
+                for name in self.order:
+                    if name in remaining and not remaining[name]:
+                        del remaining[name]
+                        snapshot = dict(state)
+                        ctx = contextvars.copy_context()
+                        running[pool.submit(ctx.run, self._run_node, name, snapshot)] = name
+
+            launch_ready()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    output, start, end = future.result()
+                    state.update(output)
+                    timings[name] = (start - t0, end - t0)
+                    for deps in remaining.values():
+                        deps.discard(name)
+                launch_ready()
+
+        return state, self._report(timings, time.perf_counter() - t0)
+
+    def _report(self, timings: Dict[str, Tuple[float, float]], wall: float) -> Dict[str, Any]:
+        # Walk back from the last node to finish, always through the dependency
+        # that finished last: that chain is what the wall time waited on
+        path = []
+        node = max(timings, key=lambda n: timings[n][1]) if timings else None
+        while node is not None:
+            path.append(node)
+            deps = self.deps[node]
+            node = max(deps, key=lambda n: timings[n][1]) if deps else None
+        path.reverse()
+
+        return {
+            "wall_seconds": round(wall, 3),
+            "critical_path": path,
+            "critical_path_seconds": round(timings[path[-1]][1], 3) if path else 0.0,
+            "nodes": {
+                name: {
+                    "depends_on": self.deps[name],
+                    "start": round(start, 3),
+                    "end": round(end, 3),
+                    "seconds": round(end - start, 3),
+                }
+                for name, (start, end) in sorted(timings.items(), key=lambda kv: kv[1][0])
+            },
+        }
+
+
+def to_state_graph(state_schema, scheduler: DagScheduler):
+    """
+    Equivalent LangGraph graph (for visualisation / LangGraph Studio):
+    nodes with several dependencies get one join edge, so they run once
+    after all of them instead of once per incoming edge.
+    """
+    from langgraph.graph import StateGraph, START, END
+
+    graph = StateGraph(state_schema)
+    for name, fn in scheduler.nodes.items():
+        graph.add_node(name, fn)
+    needed = {dep for deps in scheduler.deps.values() for dep in deps}
+    for name, deps in scheduler.deps.items():
+        graph.add_edge(deps if len(deps) > 1 else (deps[0] if deps else START), name)
+        if name not in needed:
+            graph.add_edge(name, END)
+    return graph.compile()
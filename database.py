@@ -1,6 +1,7 @@
 """
 SQLite Database operations for class recording management
 """
+import json
 import sqlite3
 from datetime import datetime
 from typing import Optional, List, Dict, Any
@@ -9,6 +10,18 @@ from pathlib import Path
 
 DB_PATH = Path(__file__).parent / "recordings.db"
 
+# Job states in which a recording must not be regenerated
+RUNNING_STATUSES = ("live", "pending", "processing", "deferred")
+
+
+def _add_missing_columns(cursor: sqlite3.Cursor, columns: Dict[str, str]):
+    """ALTER TABLE recordings ADD COLUMN for every column it does not have yet."""
+    cursor.execute("PRAGMA table_info(recordings)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE recordings ADD COLUMN {name} {decl}")
+
 
 def init_database():
     """Initialize the database with the recordings table."""
@@ -25,10 +38,26 @@ def init_database():
             audio_filename TEXT NOT NULL,
             combined_md TEXT,
             job_id TEXT UNIQUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            transcript TEXT,
+            duration_seconds REAL,
+            final_state TEXT,
+            status TEXT
         )
     """)
     
+    # Columns added after the first release; older databases get them here
+    _add_missing_columns(cursor, {
+        "transcript": "TEXT",
+        "duration_seconds": "REAL",
+        "final_state": "TEXT",
+        "status": "TEXT",
+    })
+    
+    # Jobs do not survive a restart, so a regeneration claimed before it never finishes
+    placeholders = ", ".join("?" * len(RUNNING_STATUSES))
+    cursor.execute(f"UPDATE recordings SET status = 'failed' WHERE status IN ({placeholders})", RUNNING_STATUSES)
+    
     conn.commit()
     conn.close()
 
@@ -38,7 +67,8 @@ def insert_recording(
     subject: str,
     audio_filename: str,
     job_id: str,
-    section: Optional[str] = None
+    section: Optional[str] = None,
+    duration_seconds: Optional[float] = None
 ) -> int:
     """
     Insert a new recording entry into the database.
@@ -52,9 +82,9 @@ def insert_recording(
     current_date = datetime.now().strftime("%Y-%m-%d")
     
     cursor.execute("""
-        INSERT INTO recordings (date, class, section, subject, audio_filename, job_id)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (current_date, class_name, section, subject, audio_filename, job_id))
+        INSERT INTO recordings (date, class, section, subject, audio_filename, job_id, duration_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (current_date, class_name, section, subject, audio_filename, job_id, duration_seconds))
     
     record_id = cursor.lastrowid
     conn.commit()
@@ -78,6 +108,110 @@ def update_combined_md(job_id: str, combined_md: str):
     conn.close()
 
 
+def update_transcript(job_id: str, transcript: str):
+    """Update the transcript field for a specific job (e.g. as a live stream grows)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE recordings
+        SET transcript = ?
+        WHERE job_id = ?
+    """, (transcript, job_id))
+    
+    conn.commit()
+    conn.close()
+
+
+def append_transcript(job_id: str, text: str):
+    """Append text (space-separated) to the transcript field, e.g. a live stream's new utterances."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE recordings
+        SET transcript = CASE WHEN transcript IS NULL OR transcript = '' THEN ? ELSE transcript || ' ' || ? END
+        WHERE job_id = ?
+    """, (text, text, job_id))
+    
+    conn.commit()
+    conn.close()
+
+
+def update_final_state(job_id: str, final_state: Dict[str, Any]):
+    """
+    Store the tutor pipeline's final state (inputs and per-node outputs, as
+    JSON) so single sections can be regenerated later.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE recordings
+        SET final_state = ?
+        WHERE job_id = ?
+    """, (json.dumps(final_state, ensure_ascii=False), job_id))
+    
+    conn.commit()
+    conn.close()
+
+
+def claim_for_regeneration(job_id: str) -> bool:
+    """
+    Move a recording to "processing" unless a job is already running on it,
+    in one conditional UPDATE. Returns False if another request got there first.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    placeholders = ", ".join("?" * len(RUNNING_STATUSES))
+    cursor.execute(f"""
+        UPDATE recordings
+        SET status = 'processing'
+        WHERE job_id = ? AND (status IS NULL OR status NOT IN ({placeholders}))
+    """, (job_id, *RUNNING_STATUSES))
+    
+    claimed = cursor.rowcount == 1
+    conn.commit()
+    conn.close()
+    
+    return claimed
+
+
+def update_status(job_id: str, status: str):
+    """Update the status field for a specific job (see claim_for_regeneration)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        UPDATE recordings
+        SET status = ?
+        WHERE job_id = ?
+    """, (status, job_id))
+    
+    conn.commit()
+    conn.close()
+
+
+def get_final_state(job_id: str) -> Optional[Dict[str, Any]]:
+    """Get the stored tutor pipeline state of a job (None if there is none)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT final_state
+        FROM recordings
+        WHERE job_id = ?
+    """, (job_id,))
+    
+    row = cursor.fetchone()
+    conn.close()
+    
+    if row and row[0]:
+        return json.loads(row[0])
+    return None
+
+
 def get_recording_by_job_id(job_id: str) -> Optional[Dict[str, Any]]:
     """Get a recording by job_id."""
     conn = sqlite3.connect(DB_PATH)
@@ -85,7 +219,7 @@ def get_recording_by_job_id(job_id: str) -> Optional[Dict[str, Any]]:
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT id, date, class, section, subject, audio_filename, combined_md, job_id, created_at
+        SELECT id, date, class, section, subject, audio_filename, combined_md, transcript, duration_seconds, job_id, created_at
         FROM recordings
         WHERE job_id = ?
     """, (job_id,))
@@ -105,7 +239,7 @@ def get_all_recordings(limit: int = 100, offset: int = 0) -> List[Dict[str, Any]
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT id, date, class, section, subject, audio_filename, job_id, created_at
+        SELECT id, date, class, section, subject, audio_filename, duration_seconds, job_id, created_at
         FROM recordings
         ORDER BY created_at DESC
         LIMIT ? OFFSET ?
@@ -124,7 +258,7 @@ def get_recording_by_id(record_id: int) -> Optional[Dict[str, Any]]:
     cursor = conn.cursor()
     
     cursor.execute("""
-        SELECT id, date, class, section, subject, audio_filename, combined_md, job_id, created_at
+        SELECT id, date, class, section, subject, audio_filename, combined_md, transcript, duration_seconds, job_id, created_at
         FROM recordings
         WHERE id = ?
     """, (record_id,))
@@ -0,0 +1,253 @@
+"""
+Deferred processing class: tutor pipelines answered through the Batch API.
+
+Bulk imports do not need results within minutes. Deferred jobs are
+collected here instead of running on their own worker thread. Every
+BATCH_POLL_SECONDS the coordinator:
+
+  1. polls the batches in flight; answers of a finished batch go back to
+     the jobs that asked for them, and those jobs become ready again;
+  2. advances every ready job through its tutor DAG (class_test_graph.SCHEDULER,
+     pruned to the job's sections),
+     running each node whose dependencies are done inside a
+     llm_batch.collect_batch scope. A node either completes from the
+     answers collected so far or stops with DeferredCall, leaving its
+     OpenAI requests in the job's collector;
+  3. writes the requests of all ready jobs into one batch file (deduplicated
+     by prompt, so identical prompts from different jobs are paid once) and
+     submits it.
+
+So a job takes one batch round per DAG stage (1A/1B, then 2/3/4; map-reduce
+adds a round per merge level), and many jobs share each round. If a batch
+fails, expires, or drops requests, the jobs involved finish their remaining
+nodes with ordinary synchronous calls.
+
+Like the worker's job table, the queue is in memory: deferred jobs do not
+survive a restart.
+
+Env:
+  BATCH_POLL_SECONDS = collection / polling interval (default: 60)
+  BATCH_MAX_REQUESTS = max requests per batch file (default: 50000, the API limit)
+"""
+import os
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import llm_batch
+from llm_batch import BatchClient, BatchCollector, DeferredCall
+from class_test_graph import parse_sections, scheduler_for
+from job_metrics import collect_metrics, record_batch_round
+
+
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
+
+# Batch states that will still change
+_RUNNING = {"validating", "in_progress", "finalizing", "cancelling"}
+
+
+class DeferredJob:
+    def __init__(
+        self,
+        job_id: str,
+        state: Dict[str, Any],
+        metrics: Dict[str, Any],
+        on_complete: Callable[[Dict[str, Any]], None],
+        on_error: Callable[[Exception], None],
+        on_progress: Optional[Callable[[str], None]] = None,
+        sections: Union[None, str, Iterable[str]] = None,
+    ):
+        self.job_id = job_id
+        self.scheduler = scheduler_for(parse_sections(sections))
+        self.state = dict(state)
+        self.metrics = metrics
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.on_progress = on_progress or (lambda message: None)
+        self.answers: Dict[str, Dict[str, Any]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.done: Set[str] = set()
+        self.rounds = 0
+        self.synchronous = False
+
+
+_ready: List[DeferredJob] = []
+_in_flight: Dict[str, List[DeferredJob]] = {}
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_client: Optional[BatchClient] = None
+
+
+def _batch_client() -> BatchClient:
+    global _client
+    if _client is None:
+        _client = BatchClient()
+    return _client
+
+
+def enqueue(
+    job_id: str,
+    state: Dict[str, Any],
+    metrics: Dict[str, Any],
+    on_complete: Callable[[Dict[str, Any]], None],
+    on_error: Callable[[Exception], None],
+    on_progress: Optional[Callable[[str], None]] = None,
+    start_thread: bool = True,
+    sections: Union[None, str, Iterable[str]] = None,
+) -> None:
+    """Queue a tutor pipeline (initial `state`, optionally limited to `sections`) for the next batch round."""
+    job = DeferredJob(job_id, state, metrics, on_complete, on_error, on_progress, sections)
+    with _lock:
+        _ready.append(job)
+    if start_thread:
+        _ensure_thread()
+
+
+def pending_jobs() -> int:
+    with _lock:
+        return len(_ready) + sum(len(jobs) for jobs in _in_flight.values())
+
+
+# ---------------------------------------------------------------------
+# One coordinator round
+# ---------------------------------------------------------------------
+def _advance(job: DeferredJob) -> Dict[str, Dict[str, Any]]:
+    """Run every node that can run now; return the batch requests still needed ({} = finished)."""
+    collector = BatchCollector(job.answers, synchronous=job.synchronous)
+    scheduler = job.scheduler
+    progressed = True
+    while progressed:
+        progressed = False
+        for node in scheduler.order:
+            if node in job.done or not set(scheduler.deps[node]) <= job.done:
+                continue
+            with collect_metrics(job.metrics), llm_batch.collect_batch(collector):
+                try:
+                    output = scheduler.nodes[node](dict(job.state))
+                except DeferredCall:
+                    continue
+            job.state.update({k: v for k, v in (output or {}).items() if k in scheduler.writes[node]})
+            job.done.add(node)
+            progressed = True
+    return collector.requests
+
+
+def _advance_or_fail(job: DeferredJob) -> Optional[DeferredJob]:
+    """Advance one job; finished and failed jobs are reported and dropped (None)."""
+    try:
+        job.pending = _advance(job)
+    except Exception as e:
+        job.on_error(e)
+        return None
+    if not job.pending:
+        try:
+            job.on_complete(job.state)
+        except Exception as e:
+            job.on_error(e)
+        return None
+    return job
+
+
+def _collect_results(client: BatchClient) -> None:
+    for batch_id, jobs in list(_in_flight.items()):
+        batch = client.status(batch_id)
+        if batch.status in _RUNNING:
+            continue
+        # Expired / cancelled batches still return the requests that finished
+        results = client.results(batch) if batch.output_file_id or getattr(batch, "error_file_id", None) else {}
+        print(f"Batch {batch_id}: {batch.status}, {len(results)} result(s)")
+        for job in jobs:
+            # Own copy per job: answers are marked once the job has recorded them
+            answered = {k: dict(results[k]) for k in job.pending if k in results and "error" not in results[k]}
+            job.answers.update(answered)
+            if len(answered) < len(job.pending):
+                print(f"Deferred job {job.job_id}: {len(job.pending) - len(answered)} request(s) "
+                      f"not answered by batch {batch_id}; finishing synchronously")
+                job.synchronous = True
+            job.pending = {}
+        with _lock:
+            del _in_flight[batch_id]
+            _ready.extend(jobs)
+
+
+def _submit(client: BatchClient, jobs: List[DeferredJob]) -> None:
+    """Submit the requests of `jobs` in as few batch files as BATCH_MAX_REQUESTS allows."""
+    groups: List[List[DeferredJob]] = []
+    group_keys: Set[str] = set()
+    for job in jobs:
+        new_keys = set(job.pending) - group_keys
+        if not groups or (group_keys and len(group_keys) + len(new_keys) > BATCH_MAX_REQUESTS):
+            groups.append([])
+            group_keys = set()
+        groups[-1].append(job)
+        group_keys |= set(job.pending)
+
+    for group in groups:
+        requests = {key: body for job in group for key, body in job.pending.items()}
+        name = f"tutor-{time.strftime('%Y%m%d-%H%M%S')}-{len(requests)}"
+        try:
+            batch_id = client.submit(requests, name)
+        except Exception as e:
+            print(f"Batch submission failed ({e!r}); {len(group)} job(s) continue synchronously")
+            for job in group:
+                job.synchronous = True
+            with _lock:
+                _ready.extend(group)
+            continue
+
+        print(f"Batch {batch_id}: {len(requests)} request(s) from {len(group)} job(s)")
+        for job in group:
+            job.rounds += 1
+            with collect_metrics(job.metrics):
+                record_batch_round(batch_id, len(job.pending))
+            job.on_progress(
+                f"Waiting for batch {batch_id} (round {job.rounds}, {len(job.pending)} request(s))"
+            )
+        with _lock:
+            _in_flight[batch_id] = group
+
+
+def tick(client: Optional[BatchClient] = None) -> None:
+    """One coordinator round: poll, advance ready jobs, submit their requests."""
+    client = client or _batch_client()
+    _collect_results(client)
+
+    with _lock:
+        ready = list(_ready)
+        _ready.clear()
+    if not ready:
+        return
+    # Non-OpenAI nodes (and synchronous fallbacks) make real calls here
+    with ThreadPoolExecutor(max_workers=min(8, len(ready))) as pool:
+        waiting = [job for job in pool.map(_advance_or_fail, ready) if job is not None]
+    if waiting:
+        _submit(client, waiting)
+
+
+def drain(client: Optional[BatchClient] = None, poll_seconds: Optional[float] = None) -> None:
+    """Run rounds until every queued job is finished (scripts / local testing)."""
+    while pending_jobs():
+        tick(client)
+        if pending_jobs():
+            time.sleep(BATCH_POLL_SECONDS if poll_seconds is None else poll_seconds)
+
+
+def _loop() -> None:
+    while True:
+        try:
+            tick()
+        except Exception:
+            print("Deferred job coordinator error:")
+            print(traceback.format_exc())
+        time.sleep(BATCH_POLL_SECONDS)
+
+
+def _ensure_thread() -> None:
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop, name="deferred-jobs", daemon=True)
+            _thread.start()
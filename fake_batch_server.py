@@ -0,0 +1,210 @@
+"""
+Local stand-in for the OpenAI Files + Batch API, for testing deferred jobs
+without an account or a 24h wait.
+
+Implements the endpoints BatchClient uses:
+  POST /v1/files                    (multipart upload, purpose=batch)
+  GET  /v1/files/{id}/content
+  POST /v1/batches
+  GET  /v1/batches/{id}
+
+A batch is "in_progress" for --delay seconds, then "completed" with an
+output file containing one chat completion per input line. The reply is
+a short canned markdown note that names the model and echoes the start of
+the user prompt; requests with a json_schema response_format get a minimal
+JSON object matching the schema instead. Lines whose user prompt contains --fail-marker get an
+error result, which exercises the synchronous fallback.
+
+Run:
+  python fake_batch_server.py [--port 8765] [--delay 2]
+  OPENAI_BATCH_BASE_URL=http://127.0.0.1:8765/v1 uvicorn api:app
+"""
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, Optional
+
+
+_files: Dict[str, Dict[str, Any]] = {}
+_batches: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+DELAY_SECONDS = 2.0
+FAIL_MARKER = "__fail_batch__"
+
+
+def _file_object(file_id: str) -> Dict[str, Any]:
+    f = _files[file_id]
+    return {"id": file_id, "object": "file", "bytes": len(f["content"]), "created_at": f["created_at"],
+            "filename": f["filename"], "purpose": f["purpose"], "status": "processed"}
+
+
+def _store_file(content: bytes, filename: str, purpose: str) -> str:
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    _files[file_id] = {"content": content, "filename": filename, "purpose": purpose, "created_at": int(time.time())}
+    return file_id
+
+
+def sample_json(schema: Dict[str, Any], text: str, defs: Optional[Dict[str, Any]] = None) -> Any:
+    """Smallest value matching a JSON schema: one item per array, `text` in every string."""
+    defs = schema.get("$defs", defs or {})
+    if "$ref" in schema:
+        return sample_json(defs[schema["$ref"].split("/")[-1]], text, defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: sample_json(prop, text, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [sample_json(schema.get("items", {}), text, defs)]
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return text
+
+
+def _complete(batch: Dict[str, Any]) -> None:
+    """Produce the output / error files of a batch whose delay has passed."""
+    output, errors = [], []
+    for line in _files[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        body = request["body"]
+        user = next((m["content"] for m in body["messages"] if m["role"] == "user"), "")
+        if isinstance(user, list):
+            user = "\n".join(part.get("text", "") for part in user)
+        if FAIL_MARKER in user:
+            errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"],
+                           "response": None, "error": {"code": "server_error", "message": "fake failure"}})
+            continue
+        content = f"## Notes ({body['model']}, batch)\n- {' '.join(user.split())[:80]}"
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            content = json.dumps(sample_json(response_format["json_schema"]["schema"], content))
+        output.append({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": len(user) // 4 + 20, "completion_tokens": len(content) // 4,
+                              "total_tokens": len(user) // 4 + 20 + len(content) // 4},
+                },
+            },
+            "error": None,
+        })
+
+    def jsonl(items):
+        return "".join(json.dumps(item) + "\n" for item in items).encode("utf-8")
+
+    batch["output_file_id"] = _store_file(jsonl(output), "batch_output.jsonl", "batch_output") if output else None
+    batch["error_file_id"] = _store_file(jsonl(errors), "batch_errors.jsonl", "batch_output") if errors else None
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+    batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, payload: Any, raw: bool = False):
+        data = payload if raw else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        body = self._body()
+        with _lock:
+            if self.path.rstrip("/").endswith("/v1/files"):
+                message = BytesParser(policy=email_policy).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+                )
+                fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+                upload = fields["file"]
+                purpose = fields["purpose"].get_content().strip() if "purpose" in fields else "batch"
+                file_id = _store_file(upload.get_payload(decode=True), upload.get_filename() or "input.jsonl", purpose)
+                return self._send(200, _file_object(file_id))
+
+            if self.path.rstrip("/").endswith("/v1/batches"):
+                request = json.loads(body or b"{}")
+                if request.get("input_file_id") not in _files:
+                    return self._send(404, {"error": {"message": "input file not found"}})
+                batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+                _batches[batch_id] = {
+                    "id": batch_id,
+                    "object": "batch",
+                    "endpoint": request.get("endpoint", "/v1/chat/completions"),
+                    "input_file_id": request["input_file_id"],
+                    "completion_window": request.get("completion_window", "24h"),
+                    "status": "in_progress",
+                    "output_file_id": None,
+                    "error_file_id": None,
+                    "created_at": int(time.time()),
+                    "metadata": request.get("metadata"),
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                }
+                return self._send(200, _batches[batch_id])
+        self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_GET(self):
+        with _lock:
+            match = re.search(r"/v1/batches/([\w-]+)$", self.path)
+            if match and match.group(1) in _batches:
+                batch = _batches[match.group(1)]
+                if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= DELAY_SECONDS:
+                    _complete(batch)
+                return self._send(200, batch)
+            match = re.search(r"/v1/files/([\w-]+)/content$", self.path)
+            if match and match.group(1) in _files:
+                return self._send(200, _files[match.group(1)]["content"], raw=True)
+        self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 8765, delay: float = 2.0) -> ThreadingHTTPServer:
+    """Start the server on a background thread (tests); returns it for .shutdown()."""
+    global DELAY_SECONDS
+    DELAY_SECONDS = delay
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    global FAIL_MARKER
+    parser = argparse.ArgumentParser(description="Fake OpenAI Batch API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds until a batch completes")
+    parser.add_argument("--fail-marker", default=FAIL_MARKER, help="user prompts containing this fail")
+    args = parser.parse_args()
+    FAIL_MARKER = args.fail_marker
+    server = serve(args.port, args.delay)
+    print(f"Fake batch API on http://127.0.0.1:{args.port}/v1 (batches complete after {args.delay}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Per-job metrics collected from inside the tutor graph.
+
+The worker opens a metrics scope around a job; code deep in the pipeline
+(e.g. `call_llm`) records into whatever scope is current without the job id
+being threaded through every node. The scope lives in a ContextVar, which
+the scheduler copies into the threads that run parallel nodes.
+
+Usage:
+    metrics = new_metrics()
+    with collect_metrics(metrics):
+        run_tutor_pipeline(...)
+    snapshot(metrics)   # JSON-safe copy for the status endpoint
+"""
+import copy
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Iterator
+
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("job_metrics", default=None)
+
+# Parallel nodes of one job record into the same dict (reentrant: budget
+# checks hold it across update_budget, see locked_metrics)
+_lock = threading.RLock()
+
+
+def new_metrics() -> Dict[str, Any]:
+    return {
+        "llm_calls": 0,
+        "llm_input_tokens": 0,
+        "llm_cached_input_tokens": 0,
+        "llm_output_tokens": 0,
+        "llm_cost_usd": 0.0,
+        "budget": {
+            "model_downgrades": [],
+            "reserved_tokens": 0,       # estimated tokens of calls in flight (token_budget.check_call)
+            "reserved_cost_usd": 0.0,
+        },
+        "llm_cache": {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "hit_rate": 0.0,
+            "tokens_saved": 0,
+        },
+        "models": {},
+        "nodes": {},
+        "rate_limit": {
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        },
+        "hedging": {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_rate": 0.0,
+            "fallback_wins": 0,
+        },
+        "batch": {
+            "rounds": 0,
+            "requests": 0,
+            "batch_ids": [],
+        },
+        "transcript_normalization": None,
+        "schedule": None,
+    }
+
+
+@contextmanager
+def collect_metrics(metrics: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def current_metrics() -> Optional[Dict[str, Any]]:
+    return _current.get()
+
+
+@contextmanager
+def locked_metrics() -> Iterator[Optional[Dict[str, Any]]]:
+    """The current job's metrics (or None), held under the metrics lock for a check-and-update."""
+    with _lock:
+        yield _current.get()
+
+
+def record_llm_call(
+    model: str,
+    usage: Optional[Dict[str, Any]],
+    cache: str,
+    cost_usd: float = 0.0,
+    node: Optional[str] = None,
+) -> None:
+    """
+    Record one call_llm invocation in the current job's metrics (no-op
+    outside a metrics scope).
+
+    cache: "hit", "miss" or "bypassed". On a hit no tokens are spent; the
+    usage of the original call is counted as saved instead, and `cost_usd`
+    (the cost of `usage` on `model`) is only added for calls actually made.
+
+    Input tokens the provider served from its prompt cache
+    (usage["input_token_details"]["cache_read"]) are counted per job and per
+    `node`.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return
+    usage = usage or {}
+    tokens_in = int(usage.get("input_tokens") or 0)
+    tokens_out = int(usage.get("output_tokens") or 0)
+    tokens_cached = int((usage.get("input_token_details") or {}).get("cache_read") or 0)
+
+    with _lock:
+        llm_cache = metrics["llm_cache"]
+        key = {"hit": "hits", "miss": "misses", "bypassed": "bypassed"}[cache]
+        llm_cache[key] += 1
+        lookups = llm_cache["hits"] + llm_cache["misses"] + llm_cache["bypassed"]
+        llm_cache["hit_rate"] = round(llm_cache["hits"] / lookups, 3)
+
+        per_model = metrics["models"].setdefault(
+            model, {"calls": 0, "cache_hits": 0, "input_tokens": 0, "output_tokens": 0}
+        )
+        if cache == "hit":
+            llm_cache["tokens_saved"] += tokens_in + tokens_out
+            per_model["cache_hits"] += 1
+        else:
+            metrics["llm_calls"] += 1
+            metrics["llm_input_tokens"] += tokens_in
+            metrics["llm_cached_input_tokens"] += tokens_cached
+            metrics["llm_output_tokens"] += tokens_out
+            metrics["llm_cost_usd"] = round(metrics["llm_cost_usd"] + cost_usd, 6)
+            per_model["calls"] += 1
+            per_model["input_tokens"] += tokens_in
+            per_model["output_tokens"] += tokens_out
+            if node:
+                per_node = metrics["nodes"].setdefault(
+                    node, {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0}
+                )
+                per_node["calls"] += 1
+                per_node["input_tokens"] += tokens_in
+                per_node["cached_input_tokens"] += tokens_cached
+                per_node["output_tokens"] += tokens_out
+
+
+def update_budget(downgrade: Optional[str] = None) -> None:
+    """Note a budget decision (e.g. a model downgrade) in the current job's metrics."""
+    metrics = _current.get()
+    if metrics is None or downgrade is None:
+        return
+    with _lock:
+        metrics["budget"]["model_downgrades"].append(downgrade)
+
+
+def record_rate_limit_wait(seconds: float) -> None:
+    """Add one rate-limiter acquisition (and how long it queued) to the current job."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    with _lock:
+        rate_limit = metrics["rate_limit"]
+        if seconds > 0:
+            rate_limit["waits"] += 1
+            rate_limit["wait_seconds"] = round(rate_limit["wait_seconds"] + seconds, 3)
+            rate_limit["max_wait_seconds"] = round(max(rate_limit["max_wait_seconds"], seconds), 3)
+
+
+def record_hedge(hedged: bool, fallback_won: bool) -> None:
+    """Count one call that had fallback models (see llm_hedging)."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    with _lock:
+        hedging = metrics["hedging"]
+        hedging["calls"] += 1
+        hedging["hedged"] += int(hedged)
+        hedging["fallback_wins"] += int(fallback_won)
+        hedging["hedge_rate"] = round(hedging["hedged"] / hedging["calls"], 3)
+
+
+def record_batch_round(batch_id: str, requests: int) -> None:
+    """Note that a deferred job has `requests` prompts waiting in batch `batch_id`."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    with _lock:
+        batch = metrics["batch"]
+        batch["rounds"] += 1
+        batch["requests"] += requests
+        batch["batch_ids"].append(batch_id)
+
+
+def record_transcript_normalization(report: Dict[str, Any]) -> None:
+    """Store the token reduction of the job's transcript normalization (see transcript_normalizer)."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    with _lock:
+        metrics["transcript_normalization"] = report
+
+
+def record_schedule(report: Dict[str, Any]) -> None:
+    """Store the pipeline's measured node timings / critical path (see dag_scheduler)."""
+    metrics = _current.get()
+    if metrics is None:
+        return
+    with _lock:
+        metrics["schedule"] = report
+
+
+def snapshot(metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Consistent copy of a job's metrics while nodes may still be writing."""
+    if metrics is None:
+        return None
+    with _lock:
+        return copy.deepcopy(metrics)
@@ -0,0 +1,214 @@
+"""
+Live (streaming) transcription backends for classroom devices.
+
+A session accepts raw audio frames as they arrive over the WebSocket ingest
+endpoint, forwards them to a streaming speech-to-text backend and yields
+final utterances in the same shape as Deepgram's prerecorded `utterances`
+array ({"start", "end", "transcript"}), so the rest of the pipeline does not
+care whether a transcript came from an upload or a live stream.
+
+Backends:
+  deepgram – Deepgram live WebSocket API
+  fake     – deterministic local stand-in that emits one utterance per
+             N seconds of received audio (for tests and offline runs)
+
+Env:
+  LIVE_TRANSCRIPTION_BACKEND = "deepgram" or "fake" (default: "deepgram", "fake"
+                               with SIMULATION_MODE=1)
+  DEEPGRAM_API_KEY           = required for the deepgram backend
+"""
+import os
+import json
+import asyncio
+from typing import AsyncIterator, Optional
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+
+import simulation
+
+
+LIVE_MODEL = "nova-2"          # Deepgram streaming model (whisper is batch-only)
+LIVE_URL = "wss://api.deepgram.com/v1/listen"
+KEEPALIVE_SECONDS = 5.0        # Deepgram closes idle streams after ~10 s
+
+# Supported client encodings: raw 16-bit PCM or containerized Opus (Ogg/WebM)
+ENCODINGS = ("linear16", "opus")
+
+
+class LiveTranscriptionSession:
+    """
+    One live audio stream. Subclasses implement `_open`, `_send` and `_close`
+    and call `_emit` for every final utterance.
+
+    Usage:
+        session = get_live_session(encoding="linear16", sample_rate=16000)
+        await session.start()
+        await session.send(frame)         # repeatedly
+        await session.finish()            # flush, wait for last results
+        async for utt in session.results():
+            ...
+    """
+
+    def __init__(self, encoding: str = "linear16", sample_rate: int = 16000):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def start(self) -> None:
+        await self._open()
+
+    async def send(self, frame: bytes) -> None:
+        if frame:
+            await self._send(frame)
+
+    async def finish(self) -> None:
+        """Signal end of audio and wait until every pending result is emitted."""
+        try:
+            await self._close()
+        finally:
+            self._queue.put_nowait(None)
+
+    async def results(self) -> AsyncIterator[dict]:
+        """Yield final utterances until the session is finished."""
+        while True:
+            utt = await self._queue.get()
+            if utt is None:
+                return
+            yield utt
+
+    def _emit(self, start: float, end: float, transcript: str) -> None:
+        transcript = transcript.strip()
+        if transcript:
+            self._queue.put_nowait({"start": start, "end": end, "transcript": transcript})
+
+    async def _open(self) -> None:
+        raise NotImplementedError
+
+    async def _send(self, frame: bytes) -> None:
+        raise NotImplementedError
+
+    async def _close(self) -> None:
+        raise NotImplementedError
+
+
+class DeepgramLiveSession(LiveTranscriptionSession):
+    """Forward frames to Deepgram's live WebSocket API."""
+
+    def __init__(self, encoding: str = "linear16", sample_rate: int = 16000, language: str = "auto"):
+        super().__init__(encoding, sample_rate)
+        self.language = language
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._keepalive: Optional[asyncio.Task] = None
+        self._last_send = 0.0
+
+    async def _open(self) -> None:
+        from websockets.asyncio.client import connect
+
+        load_dotenv()
+        key = os.getenv("DEEPGRAM_API_KEY", "").strip()
+        if not key:
+            raise RuntimeError("Set DEEPGRAM_API_KEY in .env")
+
+        params = {"model": LIVE_MODEL, "smart_format": "true", "interim_results": "false"}
+        if self.encoding == "linear16":
+            # Raw PCM has no header, so Deepgram must be told its format
+            params.update(encoding="linear16", sample_rate=self.sample_rate, channels=1)
+        if self.language and self.language.lower() != "auto":
+            params["language"] = self.language
+
+        self._ws = await connect(
+            f"{LIVE_URL}?{urlencode(params)}",
+            additional_headers={"Authorization": f"Token {key}"},
+        )
+        loop = asyncio.get_running_loop()
+        self._last_send = loop.time()
+        self._reader = asyncio.create_task(self._read())
+        self._keepalive = asyncio.create_task(self._keep_alive())
+
+    async def _send(self, frame: bytes) -> None:
+        await self._ws.send(frame)
+        self._last_send = asyncio.get_running_loop().time()
+
+    async def _close(self) -> None:
+        if self._ws is None:
+            return
+        self._keepalive.cancel()
+        await self._ws.send(json.dumps({"type": "CloseStream"}))
+        # Deepgram sends the remaining results, then closes the socket
+        await self._reader
+
+    async def _keep_alive(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(KEEPALIVE_SECONDS)
+            if loop.time() - self._last_send >= KEEPALIVE_SECONDS:
+                await self._ws.send(json.dumps({"type": "KeepAlive"}))
+
+    async def _read(self) -> None:
+        async for message in self._ws:
+            if isinstance(message, bytes):
+                continue
+            data = json.loads(message)
+            if data.get("type") != "Results" or not data.get("is_final"):
+                continue
+            alts = data.get("channel", {}).get("alternatives", [])
+            if alts:
+                start = float(data.get("start", 0.0))
+                self._emit(start, start + float(data.get("duration", 0.0)), alts[0].get("transcript", ""))
+
+
+class FakeLiveSession(LiveTranscriptionSession):
+    """
+    Local stand-in: emits "Live utterance N." for every `seconds_per_utterance`
+    seconds of audio received. Opus frames carry no fixed byte rate, so they
+    are counted as 20 ms each.
+    """
+
+    def __init__(self, encoding: str = "linear16", sample_rate: int = 16000, seconds_per_utterance: float = 5.0):
+        super().__init__(encoding, sample_rate)
+        self.seconds_per_utterance = seconds_per_utterance
+        self._received = 0.0
+        self._emitted_until = 0.0
+        self._count = 0
+
+    async def _open(self) -> None:
+        pass
+
+    async def _send(self, frame: bytes) -> None:
+        if self.encoding == "linear16":
+            self._received += len(frame) / (2 * self.sample_rate)
+        else:
+            self._received += 0.02
+        while self._received - self._emitted_until >= self.seconds_per_utterance:
+            self._emit_next(self._emitted_until + self.seconds_per_utterance)
+
+    async def _close(self) -> None:
+        if self._received > self._emitted_until:
+            self._emit_next(self._received)
+
+    def _emit_next(self, end: float) -> None:
+        self._count += 1
+        self._emit(self._emitted_until, end, f"Live utterance {self._count}.")
+        self._emitted_until = end
+
+
+_BACKENDS = {
+    "deepgram": DeepgramLiveSession,
+    "fake": FakeLiveSession,
+}
+
+
+def get_live_session(
+    encoding: str = "linear16",
+    sample_rate: int = 16000,
+    backend: Optional[str] = None,
+) -> LiveTranscriptionSession:
+    """Create a session for the configured (or given) backend."""
+    name = (backend or os.getenv("LIVE_TRANSCRIPTION_BACKEND") or ("fake" if simulation.ENABLED else "deepgram")).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown live transcription backend: {name}")
+    return _BACKENDS[name](encoding=encoding, sample_rate=sample_rate)
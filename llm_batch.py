@@ -0,0 +1,195 @@
+"""
+OpenAI Batch API plumbing for deferred (non-urgent) jobs.
+
+Deferred jobs run the normal tutor nodes, but inside a `collect_batch`
+scope. There, `call_llm` does not call OpenAI itself. It returns the
+answer if a previous batch produced one for that prompt; otherwise it
+records the request and raises `DeferredCall`, which suspends the node
+until the next batch comes back (see deferred_jobs). Prompts are
+deterministic, so re-running a node after its batch finished replays the
+same calls and picks up the answers by cache key. Map-reduce nodes simply
+take one batch round per stage.
+
+Only OpenAI calls are batched; other providers are called synchronously as
+usual inside the same scope.
+
+`BatchClient` writes the collected requests as a JSONL file in the Batch
+API input format (one /v1/chat/completions request per line, custom_id =
+the llm_cache key), uploads it, creates the batch, and parses the output
+file back into {custom_id: {"response", "usage"}}.
+
+Env:
+  OPENAI_BATCH_BASE_URL = batch endpoint (default: OPENAI_BASE_URL, else OpenAI);
+                          point it at fake_batch_server.py for local runs. With
+                          SIMULATION_MODE=1 an in-process fake_batch_server is
+                          started when neither is set
+  BATCH_DIR             = where input/output JSONL files are kept (default: ./batches)
+"""
+import os
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+import simulation
+
+
+load_dotenv()
+
+BATCH_DIR = Path(os.getenv("BATCH_DIR", Path(__file__).parent / "batches"))
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+# Batch API list price relative to synchronous calls
+BATCH_PRICE_FACTOR = 0.5
+
+
+class DeferredCall(Exception):
+    """A node needs an LLM answer that the next batch will provide."""
+
+
+# ---------------------------------------------------------------------
+# Request collection
+# ---------------------------------------------------------------------
+class BatchCollector:
+    """
+    Answers known so far for one job, plus the requests its nodes are
+    waiting on. A synchronous collector only replays answers; unanswered
+    calls go to the API directly.
+    """
+
+    def __init__(self, answers: Optional[Dict[str, Dict[str, Any]]] = None, synchronous: bool = False):
+        self.answers: Dict[str, Dict[str, Any]] = answers if answers is not None else {}
+        self.synchronous = synchronous
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def answer(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.answers.get(key)
+
+    def request(self, key: str, body: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests[key] = body
+
+
+_collector: ContextVar[Optional[BatchCollector]] = ContextVar("batch_collector", default=None)
+
+
+@contextmanager
+def collect_batch(collector: BatchCollector) -> Iterator[BatchCollector]:
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+def current_collector() -> Optional[BatchCollector]:
+    return _collector.get()
+
+
+def chat_body(
+    model: str,
+    temperature: Optional[float],
+    system_prompt: str,
+    user_parts: List[str],
+    response_format: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Chat-completions request body; several user parts become one multi-part user message."""
+    user_content: Any = user_parts[0] if len(user_parts) == 1 else [
+        {"type": "text", "text": part} for part in user_parts
+    ]
+    body: Dict[str, Any] = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+    }
+    if temperature is not None:
+        body["temperature"] = temperature
+    if response_format is not None:
+        body["response_format"] = response_format
+    return body
+
+
+# ---------------------------------------------------------------------
+# Batch API client
+# ---------------------------------------------------------------------
+def _usage(raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Chat-completions usage -> the usage_metadata shape call_llm records."""
+    raw = raw or {}
+    tokens_in = int(raw.get("prompt_tokens") or 0)
+    tokens_out = int(raw.get("completion_tokens") or 0)
+    cached = int((raw.get("prompt_tokens_details") or {}).get("cached_tokens") or 0)
+    return {
+        "input_tokens": tokens_in,
+        "output_tokens": tokens_out,
+        "total_tokens": tokens_in + tokens_out,
+        "input_token_details": {"cache_read": cached},
+    }
+
+
+class BatchClient:
+    def __init__(self):
+        from openai import OpenAI
+
+        base_url = os.getenv("OPENAI_BATCH_BASE_URL") or os.getenv("OPENAI_BASE_URL") or None
+        api_key = os.getenv("OPENAI_API_KEY")
+        if simulation.ENABLED:
+            base_url = base_url or simulation.batch_base_url()
+            api_key = api_key or "simulation"
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        BATCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, requests: Dict[str, Dict[str, Any]], name: str) -> str:
+        """Write `requests` ({custom_id: chat body}) as a batch input file and start the batch."""
+        path = BATCH_DIR / f"{name}.input.jsonl"
+        with path.open("w", encoding="utf-8") as f:
+            for custom_id, body in requests.items():
+                line = {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+        with path.open("rb") as f:
+            uploaded = self.client.files.create(file=(path.name, f), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"source": "class_recording", "name": name},
+        )
+        return batch.id
+
+    def status(self, batch_id: str):
+        """The batch object; `.status` is validating/in_progress/finalizing/completed/failed/expired/cancelled."""
+        return self.client.batches.retrieve(batch_id)
+
+    def results(self, batch) -> Dict[str, Dict[str, Any]]:
+        """
+        {custom_id: {"response": text, "usage": {...}}} for every request that
+        succeeded; failed requests map to {"error": message}. Requests missing
+        from both files (e.g. an expired batch) are absent.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for file_id, kind in ((batch.output_file_id, "output"), (getattr(batch, "error_file_id", None), "errors")):
+            if not file_id:
+                continue
+            text = self.client.files.content(file_id).text
+            (BATCH_DIR / f"{batch.id}.{kind}.jsonl").write_text(text, encoding="utf-8")
+            for line in filter(None, (l.strip() for l in text.splitlines())):
+                item = json.loads(line)
+                response = item.get("response") or {}
+                body = response.get("body") or {}
+                if item.get("error") or response.get("status_code", 200) != 200 or not body.get("choices"):
+                    error = item.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+                    results[item["custom_id"]] = {"error": json.dumps(error)}
+                    continue
+                results[item["custom_id"]] = {
+                    "response": (body["choices"][0]["message"].get("content") or "").strip(),
+                    "usage": _usage(body.get("usage")),
+                }
+        return results
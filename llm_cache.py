@@ -0,0 +1,184 @@
+"""
+On-disk (SQLite) cache of LLM responses underneath `call_llm`.
+
+Entries are keyed by provider, model, temperature and SHA-256 hashes of the
+system and user prompts, so a retried job – or the same transcript processed
+again with the same level and goal – does not pay for the same prompts
+twice. The token usage of the original call is stored with each response,
+which is what a hit saves.
+
+Entries expire a fixed time after they were written (hits do not extend
+that, so a popular answer is still regenerated eventually); beyond that,
+the least-recently-used entries are evicted to keep the entry count and
+total response size under their caps. All limits are configurable via env. Reads can be bypassed per job (see `bypass`) or
+globally; a bypassed call still writes its fresh response, so bypassing also
+refreshes stale entries.
+
+Env:
+  LLM_CACHE_PATH         = SQLite file (default: ./llm_cache.db, ./llm_cache.sim.db
+                           with SIMULATION_MODE=1)
+  LLM_CACHE_MAX_ENTRIES  = max cached responses (default: 2000)
+  LLM_CACHE_MAX_MB       = max total response text in MB (default: 200)
+  LLM_CACHE_MAX_AGE_DAYS = drop entries written longer ago than this (default: 30)
+  LLM_CACHE_DISABLED     = "1" to never read from the cache
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator
+
+import simulation
+
+
+# Simulated answers get their own file so they never answer real calls
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH") or Path(__file__).parent / (
+    "llm_cache.sim.db" if simulation.ENABLED else "llm_cache.db"
+))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024)
+MAX_AGE_SECONDS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        usage TEXT,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_used ON llm_responses (last_used_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_created ON llm_responses (created_at)")
+                conn.commit()
+                _initialized = True
+    return conn
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    temperature: Optional[float],
+    system_prompt: str,
+    user_prompt: str,
+) -> str:
+    payload = json.dumps({
+        "provider": provider.lower(),
+        "model": model,
+        "temperature": temperature,
+        "system": _sha256(system_prompt),
+        "user": _sha256(user_prompt),
+    }, sort_keys=True)
+    return _sha256(payload)
+
+
+def is_bypassed() -> bool:
+    return _bypass.get() or os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def bypass(enabled: bool = True) -> Iterator[None]:
+    """Skip cache reads for every call_llm made inside this block (and its graph nodes)."""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Return {"response": str, "usage": dict} for `key`, or None on a miss or
+    when reads are bypassed. Counts a hit, miss or bypass.
+    """
+    if is_bypassed():
+        with _stats_lock:
+            _stats["bypassed"] += 1
+        return None
+
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT response, usage, created_at FROM llm_responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row and now - row[2] > MAX_AGE_SECONDS:
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            conn.commit()
+            row = None
+        if row:
+            conn.execute("UPDATE llm_responses SET last_used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+    finally:
+        conn.close()
+
+    with _stats_lock:
+        _stats["hits" if row else "misses"] += 1
+    if not row:
+        return None
+    return {"response": row[0], "usage": json.loads(row[1] or "{}")}
+
+
+def put(key: str, response: str, usage: Optional[Dict[str, Any]] = None) -> None:
+    """Store a response with the token usage it cost, then evict."""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO llm_responses (key, response, usage, size, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (key, response, json.dumps(usage or {}), len(response.encode("utf-8")), now, now))
+        _evict(conn, now)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _evict(conn: sqlite3.Connection, now: float) -> None:
+    conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - MAX_AGE_SECONDS,))
+
+    count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+    if count <= MAX_ENTRIES and total <= MAX_BYTES:
+        return
+    # Walk least-recently-used first until both caps hold
+    drop = []
+    for key, size in conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used_at"):
+        if count <= MAX_ENTRIES and total <= MAX_BYTES:
+            break
+        drop.append((key,))
+        count -= 1
+        total -= size
+    conn.executemany("DELETE FROM llm_responses WHERE key = ?", drop)
+
+
+def cache_stats() -> Dict[str, int]:
+    """Hit/miss/bypass counts since process start."""
+    with _stats_lock:
+        return dict(_stats)
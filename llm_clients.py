@@ -0,0 +1,101 @@
+"""
+Process-wide registry of LangChain chat model clients.
+
+Building a ChatOpenAI / ChatGoogleGenerativeAI object per node call means a
+new SDK client, a new connection pool and a fresh TCP + TLS handshake for
+every prompt. Instead, `get_chat_model` returns one long-lived instance per
+(provider, model, parameters), and every OpenAI instance shares a single
+httpx connection pool, so keep-alive connections are reused across nodes
+and jobs.
+
+Gemini instances keep their own transport channel (the SDK does not accept
+an external HTTP client); caching the instance is what keeps that channel
+open between calls.
+
+In simulation mode (SIMULATION_MODE=1) every model is a
+simulation.FakeChatModel and no provider is contacted.
+
+Env:
+  OPENAI_BASE_URL      = override the OpenAI endpoint (e.g. a local mock)
+  LLM_POOL_CONNECTIONS = max connections in the shared OpenAI pool (default: 32)
+"""
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+import simulation
+
+
+load_dotenv()
+
+LLM_POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_POOL_CONNECTIONS", "32")),
+    max_keepalive_connections=16,
+    keepalive_expiry=120.0,
+)
+# Generous read timeout: long-form generations stream for minutes
+LLM_TIMEOUT = httpx.Timeout(connect=10.0, read=600.0, write=60.0, pool=60.0)
+
+_models: Dict[Tuple, Any] = {}
+_pools: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def _openai_pool() -> httpx.Client:
+    """The single httpx client (connection pool) shared by every OpenAI model."""
+    if "openai" not in _pools:
+        _pools["openai"] = httpx.Client(limits=LLM_POOL_LIMITS, timeout=LLM_TIMEOUT)
+    return _pools["openai"]
+
+
+def _build(provider: str, model: str, params: Dict[str, Any]):
+    if provider not in ("openai", "gemini"):
+        raise ValueError("provider must be 'openai' or 'gemini'")
+    if simulation.ENABLED:
+        return simulation.FakeChatModel(provider, model, params)
+    if provider == "openai":
+        return ChatOpenAI(
+            model=model,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            http_client=_openai_pool(),
+            # Token usage on streamed responses (call_llm streams every call)
+            stream_usage=True,
+            **params,
+        )
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        **params,
+    )
+
+
+def get_chat_model(provider: str, model: str, **params):
+    """
+    Return the shared chat model for (provider, model, params), creating it
+    on first use. Instances are thread-safe and reused across graph nodes,
+    parallel branches and jobs.
+    """
+    provider = provider.lower()
+    key = (provider, model, tuple(sorted(params.items())))
+    llm = _models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _models.get(key)
+            if llm is None:
+                llm = _models[key] = _build(provider, model, params)
+    return llm
+
+
+def reset_clients() -> None:
+    """Drop every cached model and close the shared pools (e.g. after a key change)."""
+    with _lock:
+        _models.clear()
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,187 @@
+"""
+Hedged LLM requests with ordered model fallbacks.
+
+A node may list fallback models after its primary. `run_hedged` starts the
+primary and, if it has not answered once it passes HEDGE_PERCENTILE of its
+own observed latency (per node and model), starts the next model alongside
+it. The first successful response wins and the other attempts are
+cancelled. A failed attempt starts the next model immediately, so the list
+is also a plain error fallback.
+
+Cancellation is cooperative: each attempt gets a threading.Event and
+`call_llm` checks it between streamed chunks, closing the stream (and its
+HTTP response) once it is set. An attempt still waiting for its first
+token stops as soon as that token arrives; its result is discarded.
+
+Latencies of successful attempts feed the per-(node, model) history the
+hedge delay is taken from. Cancelled losers are left out: their elapsed
+time was cut short by the winner, and counting it would lower the
+percentile so that every hedge makes the next one fire earlier. Failed
+attempts are left out too. Until a model has HEDGE_MIN_SAMPLES
+observations the delay is `default_delay`, usually twice the call's
+estimated latency.
+
+Env:
+  HEDGE_PERCENTILE        = latency percentile after which to hedge (default: 95)
+  HEDGE_MIN_SAMPLES       = observations needed before using the percentile (default: 20)
+  HEDGE_MIN_DELAY_SECONDS = never hedge earlier than this (default: 2)
+  HEDGE_DISABLED          = "1" to only fall back on errors, never hedge
+"""
+import os
+import time
+import queue
+import threading
+import contextvars
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "2"))
+HEDGE_DISABLED = os.getenv("HEDGE_DISABLED", "0") == "1"
+
+HISTORY_SIZE = 200
+
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt whose request lost the race."""
+
+
+# ---------------------------------------------------------------------
+# Latency history
+# ---------------------------------------------------------------------
+_history: Dict[Tuple[str, str], Deque[float]] = {}
+_end_to_end: Dict[str, Deque[float]] = {}
+_history_lock = threading.Lock()
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def observe(node: str, model: str, seconds: float) -> None:
+    with _history_lock:
+        _history.setdefault((node, model), deque(maxlen=HISTORY_SIZE)).append(seconds)
+
+
+def hedge_delay(node: str, model: str, default_delay: float) -> float:
+    """Seconds to wait for (node, model) before starting the next model."""
+    with _history_lock:
+        samples = list(_history.get((node, model), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return max(HEDGE_MIN_DELAY_SECONDS, default_delay)
+    return max(HEDGE_MIN_DELAY_SECONDS, _percentile(samples, HEDGE_PERCENTILE))
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Per node: p50/p95/p99 of the hedged calls (what the job waited) next to
+    the same percentiles of each model's attempts (what it would have
+    waited without hedging, from its successful attempts only).
+    """
+    def summary(values: List[float]) -> Dict[str, Any]:
+        return {
+            "count": len(values),
+            "p50": round(_percentile(values, 50), 3),
+            "p95": round(_percentile(values, 95), 3),
+            "p99": round(_percentile(values, 99), 3),
+        }
+
+    with _history_lock:
+        stats = {node: {"calls": summary(list(v)), "models": {}} for node, v in _end_to_end.items() if v}
+        for (node, model), values in _history.items():
+            if values:
+                stats.setdefault(node, {"models": {}})["models"][model] = summary(list(values))
+    return stats
+
+
+def reset_history() -> None:
+    with _history_lock:
+        _history.clear()
+        _end_to_end.clear()
+
+
+# ---------------------------------------------------------------------
+# Hedged execution
+# ---------------------------------------------------------------------
+Attempt = Callable[[threading.Event], Any]
+
+
+def run_hedged(
+    node: str,
+    models: List[str],
+    attempts: List[Attempt],
+    default_delays: List[float],
+) -> Tuple[int, Any, bool]:
+    """
+    Run `attempts[0]`, hedging with the following ones as described above.
+    Each attempt is called with its cancel event and runs in a copy of the
+    caller's context. Returns (index of the winning attempt, its result,
+    whether a hedge was started); raises the first error if all fail.
+    """
+    results: "queue.Queue[Tuple[int, bool, Any, float]]" = queue.Queue()
+    cancels = [threading.Event() for _ in attempts]
+    started: Dict[int, float] = {}
+    errors: List[BaseException] = []
+    hedged = False
+    t0 = time.perf_counter()
+
+    def start(i: int) -> None:
+        ctx = contextvars.copy_context()
+        started[i] = time.perf_counter()
+
+        def target():
+            try:
+                value = ctx.run(attempts[i], cancels[i])
+                results.put((i, True, value, time.perf_counter()))
+            except BaseException as e:
+                results.put((i, False, e, time.perf_counter()))
+
+        threading.Thread(target=target, name=f"hedge-{node}-{i}", daemon=True).start()
+
+    def hedge_deadline(i: int) -> Optional[float]:
+        if HEDGE_DISABLED or i + 1 >= len(attempts):
+            return None
+        return started[i] + hedge_delay(node, models[i], default_delays[i])
+
+    start(0)
+    next_index = 1
+    deadline = hedge_deadline(0)
+    pending = 1
+
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            i, ok, value, finished = results.get(timeout=timeout)
+        except queue.Empty:
+            # Slowest-percentile territory: race the next model
+            print(f"Hedging {node}: {models[next_index - 1]} is slow, also trying {models[next_index]}")
+            hedged = True
+            start(next_index)
+            pending += 1
+            deadline = hedge_deadline(next_index)
+            next_index += 1
+            continue
+
+        pending -= 1
+        if ok:
+            observe(node, models[i], finished - started[i])
+            for j, event in enumerate(cancels):
+                if j != i and j in started:
+                    event.set()
+            with _history_lock:
+                _end_to_end.setdefault(node, deque(maxlen=HISTORY_SIZE)).append(finished - t0)
+            return i, value, hedged
+
+        errors.append(value)
+        if next_index < len(attempts):
+            print(f"{node}: {models[i]} failed ({value!r}), falling back to {models[next_index]}")
+            start(next_index)
+            pending += 1
+            deadline = hedge_deadline(next_index)
+            next_index += 1
+        elif pending == 0:
+            raise errors[0]
@@ -8,6 +8,7 @@ from pathlib import Path
 from audio_to_transcribe_whisper import transcribe_audio_to_text
 # the graph file you posted
 from class_test_graph import run_tutor_pipeline
+from transcript_normalizer import normalize_transcript
 
 def main() -> int:
     if len(sys.argv) != 2:
@@ -20,7 +21,6 @@ def main() -> int:
         return 2
 
     # Keep the same Deepgram-saving behavior next to the input
-    out_wav   = in_path.with_suffix(".converted.wav")
     print(1)
     save_json = in_path.with_suffix(".deepgram.json")
     print(2)
@@ -29,15 +29,18 @@ def main() -> int:
         # 1) Transcribe to a single text string (JSON auto-saved as above)
         transcript = transcribe_audio_to_text(
             str(in_path),
-            out_wav=str(out_wav),
+            out_wav=None,
             save_json=str(save_json),
             language="auto",
             diarize=False,
+            stream=True,
         )
 
-        # 2) Run the tutor pipeline on the transcript
+        # 2) Strip filler / repetitions, then run the tutor pipeline on the transcript
+        normalized = normalize_transcript(transcript)
+        print(f"Normalized transcript ({normalized.level}): {len(transcript)} -> {len(normalized.text)} chars")
         result = run_tutor_pipeline(
-            transcript=transcript,
+            transcript=normalized.text,
             student_level="college",
             student_goal="score well in final exam and actually understand the concepts",
         )
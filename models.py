@@ -2,7 +2,7 @@
 Pydantic models for FastAPI request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict, Any
 from datetime import datetime
 
 
@@ -21,6 +21,7 @@ class JobResponse(BaseModel):
     job_id: str
     status: str
     message: str
+    estimate: Optional[Dict[str, Any]] = None
 
 
 class JobStatusResponse(BaseModel):
@@ -29,6 +30,7 @@ class JobStatusResponse(BaseModel):
     status: str
     progress: Optional[str] = None
     error: Optional[str] = None
+    metrics: Optional[Dict[str, Any]] = None
 
 
 class JobResultResponse(BaseModel):
@@ -37,6 +39,7 @@ class JobResultResponse(BaseModel):
     status: str
     combined_md: Optional[str] = None
     error: Optional[str] = None
+    node_outputs: Optional[Dict[str, str]] = None
 
 
 class RecordingResponse(BaseModel):
@@ -47,6 +50,7 @@ class RecordingResponse(BaseModel):
     section: Optional[str]
     subject: str
     audio_filename: str
+    duration_seconds: Optional[float] = None
     job_id: str
     created_at: str
 
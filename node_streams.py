@@ -0,0 +1,95 @@
+"""
+Live per-node output buffers for running jobs.
+
+`call_llm` streams completions token by token and appends every chunk to
+the buffer of the graph node that made the call. The worker opens one
+buffer per job; the API reads a snapshot of it, so partial notes show up in
+/result while the node is still generating.
+
+Appends are cheap (list append under a lock); the joined text that readers
+see is republished at most every FLUSH_INTERVAL seconds, and immediately
+when a call finishes. A key can have a renderer (`set_renderer`) that turns
+the joined text into what readers see, e.g. a markdown preview of a JSON
+answer that is still streaming; it runs at flush time only.
+
+Usage:
+    buffer = NodeStreamBuffer()
+    with stream_to(buffer):
+        run_tutor_pipeline(...)
+    buffer.snapshot()   # {"node_1a_notes": "# Summary ...", ...}
+"""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Iterator
+
+
+FLUSH_INTERVAL = 0.25  # seconds
+
+
+class NodeStreamBuffer:
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._chunks: Dict[str, List[str]] = {}
+        self._published: Dict[str, str] = {}
+        self._renderers: Dict[str, Callable[[str], Optional[str]]] = {}
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def append(self, key: str, text: str) -> None:
+        if not text:
+            return
+        with self._lock:
+            self._chunks.setdefault(key, []).append(text)
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._flush_locked(now)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked(time.monotonic())
+
+    def reset(self, key: str) -> None:
+        """Drop a key's text and renderer (e.g. before a retried call streams it again)."""
+        with self._lock:
+            self._chunks.pop(key, None)
+            self._published.pop(key, None)
+            self._renderers.pop(key, None)
+
+    def set_renderer(self, key: str, render: Callable[[str], Optional[str]]) -> None:
+        """Publish render(text) for `key` instead of its raw text; None keeps the previous view."""
+        with self._lock:
+            self._renderers[key] = render
+
+    def _flush_locked(self, now: float) -> None:
+        for key, chunks in self._chunks.items():
+            text = "".join(chunks)
+            render = self._renderers.get(key)
+            if render is not None:
+                text = render(text)
+                if text is None:
+                    continue
+            self._published[key] = text
+        self._last_flush = now
+
+    def snapshot(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._published)
+
+
+_sink: ContextVar[Optional[NodeStreamBuffer]] = ContextVar("node_stream_sink", default=None)
+
+
+@contextmanager
+def stream_to(buffer: NodeStreamBuffer) -> Iterator[NodeStreamBuffer]:
+    token = _sink.set(buffer)
+    try:
+        yield buffer
+    finally:
+        buffer.flush()
+        _sink.reset(token)
+
+
+def current_buffer() -> Optional[NodeStreamBuffer]:
+    return _sink.get()
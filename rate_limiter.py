@@ -0,0 +1,206 @@
+"""
+Token-bucket rate limiting for LLM calls, shared by every job and node.
+
+Each (provider, model) has two buckets, one for requests and one for tokens,
+refilled continuously at the per-minute limit and holding at most
+LLM_RATE_BURST_SECONDS worth of refill. `acquire` charges one request and
+the call's estimated tokens (prompt + expected output) before the call is
+sent. A caller that finds a bucket short reserves its share anyway, which
+drives the level negative, and sleeps until it would have refilled. Later
+callers queue behind that reservation, so a burst of parallel nodes is
+smoothed into a steady flow at the limit instead of a 429 storm.
+
+Limits are opt-in: with LLM_RATE_LIMITS unset no call waits. "tier1"
+applies the usage-tier-1 limits below (TIER1_LIMITS); check them against
+your account's limits before relying on them. Explicit "model=RPM/TPM"
+entries set or override single models. Simulation mode
+(SIMULATION_MODE=1) is therefore unthrottled unless limits are configured,
+so load tests measure the stack instead of the limiter's sleeps.
+
+By default the buckets live in this process. Set LLM_RATE_LIMIT_DB to
+share them between processes (several API workers, batch runs) through a
+SQLite file.
+
+Time spent waiting is recorded in the current job's metrics
+(metrics.rate_limit).
+
+Env:
+  LLM_RATE_LIMITS        = "tier1" and/or "model=RPM/TPM,..." (e.g. "tier1,gpt-4o=800/450000");
+                           a provider name sets that provider's default; 0 = unlimited
+                           (default: unset, no limits)
+  LLM_RATE_BURST_SECONDS = bucket size in seconds of refill (default: 10)
+  LLM_RATE_LIMIT_DB      = SQLite file for cross-process buckets (default: in-process)
+"""
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Tuple, Optional
+
+from job_metrics import record_rate_limit_wait
+
+
+# (requests per minute, tokens per minute); 0 = unlimited
+TIER1_LIMITS: Dict[str, Tuple[int, int]] = {
+    "openai": (500, 200_000),
+    "gemini": (1000, 1_000_000),
+    "gpt-4o": (500, 30_000),
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-5": (500, 30_000),
+    "gpt-5-mini": (500, 200_000),
+    "gemini-2.5-pro": (150, 2_000_000),
+    "gemini-2.5-flash": (1000, 1_000_000),
+}
+
+BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", "10"))
+RATE_LIMIT_DB = os.getenv("LLM_RATE_LIMIT_DB", "")
+
+
+def _parse_overrides(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        if item.lower() == "tier1":
+            limits.update(TIER1_LIMITS)
+            continue
+        name, _, values = item.partition("=")
+        rpm, _, tpm = values.partition("/")
+        limits[name.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+# Limits in force (empty unless LLM_RATE_LIMITS is set)
+RATE_LIMITS: Dict[str, Tuple[int, int]] = _parse_overrides(os.getenv("LLM_RATE_LIMITS", ""))
+
+
+def limits_for(provider: str, model: str) -> Tuple[int, int]:
+    return RATE_LIMITS.get(model) or RATE_LIMITS.get(provider, (0, 0))
+
+
+def _take(
+    level: float,
+    updated: float,
+    now: float,
+    per_minute: int,
+    cost: float,
+) -> Tuple[float, float]:
+    """Refill a bucket to `now`, reserve `cost`; return (new level, seconds to wait)."""
+    rate = per_minute / 60.0
+    capacity = max(1.0, rate * BURST_SECONDS)
+    level = min(capacity, level + (now - updated) * rate)
+    # A call bigger than the whole bucket goes once the bucket is full
+    wait = max(0.0, (min(cost, capacity) - level) / rate)
+    return level - cost, wait
+
+
+# ---------------------------------------------------------------------
+# Bucket storage
+# ---------------------------------------------------------------------
+class _MemoryBuckets:
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, limits: Tuple[int, int], tokens: int) -> float:
+        with self._lock:
+            now = time.time()
+            wait = 0.0
+            for suffix, per_minute, cost in (("req", limits[0], 1), ("tok", limits[1], tokens)):
+                if not per_minute:
+                    continue
+                bucket = f"{key}:{suffix}"
+                level, updated = self._state.get(bucket, (float("inf"), now))
+                level, bucket_wait = _take(level, updated, now, per_minute, cost)
+                self._state[bucket] = (level, now)
+                wait = max(wait, bucket_wait)
+            return wait
+
+
+class _SqliteBuckets:
+    """Same buckets in a SQLite table, updated in one write transaction per call."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    bucket TEXT PRIMARY KEY,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def reserve(self, key: str, limits: Tuple[int, int], tokens: int) -> float:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            wait = 0.0
+            for suffix, per_minute, cost in (("req", limits[0], 1), ("tok", limits[1], tokens)):
+                if not per_minute:
+                    continue
+                bucket = f"{key}:{suffix}"
+                row = conn.execute(
+                    "SELECT level, updated_at FROM rate_buckets WHERE bucket = ?", (bucket,)
+                ).fetchone()
+                level, updated = row if row else (float("inf"), now)
+                level, bucket_wait = _take(level, updated, now, per_minute, cost)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (bucket, level, updated_at) VALUES (?, ?, ?)",
+                    (bucket, level, now),
+                )
+                wait = max(wait, bucket_wait)
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def _storage():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = _SqliteBuckets(RATE_LIMIT_DB) if RATE_LIMIT_DB else _MemoryBuckets()
+    return _buckets
+
+
+# ---------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------
+def acquire(provider: str, model: str, tokens: int) -> float:
+    """
+    Block until one request of `tokens` estimated tokens may be sent to
+    (provider, model); return the seconds waited.
+    """
+    limits = limits_for(provider, model)
+    if not any(limits):
+        return 0.0
+    wait = _storage().reserve(f"{provider}:{model}", limits, tokens)
+    if wait > 0:
+        if wait >= 1.0:
+            print(f"Rate limit: waiting {wait:.1f}s for {provider}/{model}")
+        time.sleep(wait)
+    record_rate_limit_wait(wait)
+    return wait
+
+
+def reset(path: Optional[str] = None) -> None:
+    """Forget all bucket state (and switch storage, e.g. in benchmarks)."""
+    global _buckets, RATE_LIMIT_DB
+    with _buckets_lock:
+        if path is not None:
+            RATE_LIMIT_DB = path
+        _buckets = None
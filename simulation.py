@@ -0,0 +1,415 @@
+"""
+Simulation mode: fake LLM and transcription providers for offline runs,
+load tests and profiling.
+
+With SIMULATION_MODE=1 nothing talks to a provider and no API key is needed:
+  - llm_clients.get_chat_model returns a FakeChatModel for every provider
+    and model. It streams seeded text (or JSON matching the requested
+    response schema) with simulated time to first token, generation speed,
+    errors and token usage, prompt-cache reads included.
+    call_openai (class_tutor_graph) and the class_test_graph nodes get
+    their models from get_chat_model, so they reach the fake as well.
+  - transcription_backends and live_transcription default to their "fake"
+    backends, and audio_to_transcribe_whisper._transcribe_whisper
+    delegates to the fake backend. Each one produces a seeded lecture
+    transcript sized to the audio it receives.
+  - llm_batch sends deferred jobs to fake_batch_server.py, started
+    in-process on a free port.
+  - llm_cache defaults to its own file (llm_cache.sim.db), so simulated
+    answers never answer real calls.
+The API, worker, scheduler, budgets, rate limiter, hedging and metrics all
+run as usual, so their overhead can be measured (see
+bench_simulated_load.py).
+
+Responses are seeded by SIMULATION_SEED, the model and the prompt. The n-th
+call with a given prompt gets the same text, latency, token count and
+failure on every run, however the threads interleave.
+
+Distributions (delays in seconds, lengths in tokens):
+  fixed:X | uniform:A:B | normal:MEAN:SD | lognormal:MEDIAN:SIGMA
+"model" uses token_budget.MODEL_SPEED for the model being simulated, with
+lognormal jitter.
+
+Env:
+  SIMULATION_MODE             = "1" to use the fake providers (default: off)
+  SIMULATION_SEED             = seed of every simulated response (default: 0)
+  SIM_TIME_SCALE              = multiplier for every simulated delay; 0 skips
+                                the waiting entirely (default: 1)
+  SIM_LLM_FIRST_TOKEN         = time to first token (default: model)
+  SIM_LLM_TOKENS_PER_SECOND   = generation speed (default: model)
+  SIM_LLM_OUTPUT_TOKENS       = completion length (default: lognormal:900:0.4)
+  SIM_LLM_ERROR_RATE          = share of LLM calls that fail (default: 0)
+  SIM_TRANSCRIBE_REALTIME     = transcription seconds per audio second
+                                (default: lognormal:0.033:0.3)
+  SIM_TRANSCRIBE_ERROR_RATE   = share of transcriptions that fail (default: 0)
+  SIM_BATCH_DELAY             = seconds until a simulated batch completes (default: 2)
+"""
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from token_budget import DEFAULT_SPEED, MODEL_SPEED, TRANSCRIPTION_SECONDS_PER_AUDIO_MINUTE
+from token_utils import count_tokens
+
+
+load_dotenv()
+
+ENABLED = os.getenv("SIMULATION_MODE", "").lower() in ("1", "true", "yes")
+SEED = os.getenv("SIMULATION_SEED", "0")
+TIME_SCALE = float(os.getenv("SIM_TIME_SCALE", "1"))
+
+LLM_ERROR_RATE = float(os.getenv("SIM_LLM_ERROR_RATE", "0"))
+TRANSCRIBE_ERROR_RATE = float(os.getenv("SIM_TRANSCRIBE_ERROR_RATE", "0"))
+BATCH_DELAY_SECONDS = float(os.getenv("SIM_BATCH_DELAY", "2"))
+
+# Spread of the "model" distributions around the MODEL_SPEED figures
+MODEL_JITTER_SIGMA = 0.3
+# OpenAI caches prompt prefixes of at least this many tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+# Tokens per streamed chunk
+STREAM_CHUNK_TOKENS = 16
+WORDS_PER_TOKEN = 0.75
+WORDS_PER_MINUTE = 150
+SECONDS_PER_UTTERANCE = 8.0
+
+
+class SimulatedProviderError(RuntimeError):
+    """A simulated provider failure (SIM_LLM_ERROR_RATE / SIM_TRANSCRIBE_ERROR_RATE)."""
+
+
+# ---------------------------------------------------------------------
+# Distributions and seeding
+# ---------------------------------------------------------------------
+@dataclass(frozen=True)
+class Distribution:
+    kind: str
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        kind, *args = spec.strip().lower().split(":")
+        arity = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in arity or len(args) != arity[kind]:
+            raise ValueError(
+                f"Bad distribution {spec!r}; use fixed:X, uniform:A:B, normal:MEAN:SD or lognormal:MEDIAN:SIGMA"
+            )
+        return cls(kind, *(float(x) for x in args))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.a
+        elif self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        else:
+            value = self.a * math.exp(rng.gauss(0.0, self.b))
+        return max(0.0, value)
+
+
+def _distribution(env: str, default: str) -> Optional[Distribution]:
+    """The distribution configured in `env`; None means "model"."""
+    spec = os.getenv(env, default)
+    return None if spec.strip().lower() == "model" else Distribution.parse(spec)
+
+
+LLM_FIRST_TOKEN = _distribution("SIM_LLM_FIRST_TOKEN", "model")
+LLM_TOKENS_PER_SECOND = _distribution("SIM_LLM_TOKENS_PER_SECOND", "model")
+LLM_OUTPUT_TOKENS = _distribution("SIM_LLM_OUTPUT_TOKENS", "lognormal:900:0.4")
+TRANSCRIBE_REALTIME = _distribution(
+    "SIM_TRANSCRIBE_REALTIME", f"lognormal:{TRANSCRIPTION_SECONDS_PER_AUDIO_MINUTE / 60:.4f}:0.3"
+)
+
+_occurrences: Counter = Counter()
+_occurrences_lock = threading.Lock()
+
+
+def seeded_rng(*parts: Any) -> random.Random:
+    """
+    RNG for one simulated call, seeded by SIMULATION_SEED, `parts` and how
+    often the same parts were seen before (so retries can differ).
+    """
+    digest = hashlib.sha256(json.dumps([SEED, *parts], default=str).encode("utf-8")).hexdigest()
+    with _occurrences_lock:
+        n = _occurrences[digest]
+        _occurrences[digest] += 1
+    return random.Random(f"{digest}:{n}")
+
+
+def wait(seconds: float) -> None:
+    """Sleep for a simulated delay (scaled by SIM_TIME_SCALE)."""
+    if seconds * TIME_SCALE > 0:
+        time.sleep(seconds * TIME_SCALE)
+
+
+# ---------------------------------------------------------------------
+# Canned content
+# ---------------------------------------------------------------------
+_SUBJECTS = ["the derivative", "the chain rule", "a limit", "the tangent line", "the second derivative",
+             "an integral", "the area under a curve", "a local maximum", "the slope", "a continuous function"]
+_VERBS = ["measures", "depends on", "is related to", "tells us about", "can be computed from",
+          "explains", "approximates", "is bounded by"]
+_OBJECTS = ["the rate of change", "the shape of the graph", "small changes in the input", "the exam questions",
+            "the worked example on the board", "the units of the output", "a physical quantity",
+            "the difference quotient"]
+
+
+def lecture_sentence(rng: random.Random) -> str:
+    return f"{rng.choice(_SUBJECTS).capitalize()} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}."
+
+
+def _words(rng: random.Random, n: int) -> str:
+    """About `n` words of lecture-like sentences."""
+    out: List[str] = []
+    while len(out) < n:
+        out.extend(lecture_sentence(rng).split())
+    return " ".join(out[:max(1, n)]).rstrip(".") + "."
+
+
+def _markdown(rng: random.Random, model: str, tokens: int) -> str:
+    words = max(8, int(tokens * WORDS_PER_TOKEN))
+    lines = [f"## Simulated answer ({model})"]
+    while words > 0:
+        n = min(words, rng.randint(8, 16))
+        lines.append(f"- {_words(rng, n)}")
+        words -= n
+    return "\n".join(lines)
+
+
+class _Text:
+    """Placeholder for a string in a sampled JSON value; filled once the string count is known."""
+
+
+def _json_shape(schema: Dict[str, Any], rng: random.Random, defs: Dict[str, Any]) -> Any:
+    defs = schema.get("$defs", defs)
+    if "$ref" in schema:
+        return _json_shape(defs[schema["$ref"].split("/")[-1]], rng, defs)
+    if "anyOf" in schema:
+        return _json_shape(schema["anyOf"][0], rng, defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _json_shape(prop, rng, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_json_shape(schema.get("items", {}), rng, defs) for _ in range(rng.randint(2, 5))]
+    if kind in ("integer", "number"):
+        return rng.randint(1, 100)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    return _Text()
+
+
+def _fill(value: Any, rng: random.Random, words: int) -> Any:
+    if isinstance(value, _Text):
+        return _words(rng, words)
+    if isinstance(value, dict):
+        return {k: _fill(v, rng, words) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, rng, words) for v in value]
+    return value
+
+
+def _count_texts(value: Any) -> int:
+    if isinstance(value, _Text):
+        return 1
+    if isinstance(value, dict):
+        return sum(_count_texts(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(_count_texts(v) for v in value)
+    return 0
+
+
+def sample_json(schema: Dict[str, Any], rng: random.Random, tokens: int) -> Any:
+    """A value matching a JSON schema, with its strings sized to total about `tokens`."""
+    shape = _json_shape(schema, rng, {})
+    per_string = max(3, int(tokens * WORDS_PER_TOKEN / max(1, _count_texts(shape))))
+    return _fill(shape, rng, per_string)
+
+
+def _response_schema(kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """JSON schema requested through response_format_kwargs (OpenAI or Gemini style)."""
+    response_format = kwargs.get("response_format") or {}
+    return (response_format.get("json_schema") or {}).get("schema") or kwargs.get("response_json_schema")
+
+
+# ---------------------------------------------------------------------
+# Fake chat model
+# ---------------------------------------------------------------------
+def _message_parts(messages: List[Any]) -> List[str]:
+    """Text of every message, multi-part messages (see _prompt_layout) part by part."""
+    parts: List[str] = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, list):
+            parts.extend(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+        else:
+            parts.append(str(content))
+    return parts
+
+
+class FakeChatModel:
+    """
+    Stand-in for ChatOpenAI / ChatGoogleGenerativeAI with the interface the
+    pipeline uses: `stream(messages, **kwargs)` and `invoke(messages, **kwargs)`.
+    Chunks are AIMessageChunks; the last one carries usage_metadata.
+
+    A prompt prefix (system prompt plus first user part) of at least
+    PROMPT_CACHE_MIN_TOKENS that this model has seen before is reported as
+    cache_read input tokens, like provider-side prompt caching.
+    """
+
+    def __init__(self, provider: str, model: str, params: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.model = model
+        self.params = dict(params or {})
+        tokens_per_second, first_token = MODEL_SPEED.get(model, DEFAULT_SPEED)
+        self._speed = (tokens_per_second, first_token)
+        self._prefixes: set = set()
+        self._lock = threading.Lock()
+
+    def _sample(self, dist: Optional[Distribution], model_value: float, rng: random.Random) -> float:
+        if dist is None:
+            return model_value * math.exp(rng.gauss(0.0, MODEL_JITTER_SIGMA))
+        return dist.sample(rng)
+
+    def _cached_tokens(self, texts: List[str]) -> int:
+        if len(texts) < 2:
+            return 0
+        prefix_tokens = count_tokens(texts[0], self.model) + count_tokens(texts[1], self.model)
+        if prefix_tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha256(f"{texts[0]}\x00{texts[1]}".encode("utf-8")).hexdigest()
+        with self._lock:
+            seen = key in self._prefixes
+            self._prefixes.add(key)
+        return prefix_tokens if seen else 0
+
+    def stream(self, messages: List[Any], **kwargs) -> Iterator[Any]:
+        from langchain_core.messages import AIMessageChunk
+
+        texts = _message_parts(messages)
+        rng = seeded_rng(self.provider, self.model, texts)
+
+        input_tokens = sum(count_tokens(t, self.model) for t in texts)
+        output_tokens = max(1, int(LLM_OUTPUT_TOKENS.sample(rng)))
+        tokens_per_second = max(1.0, self._sample(LLM_TOKENS_PER_SECOND, self._speed[0], rng))
+        first_token = self._sample(LLM_FIRST_TOKEN, self._speed[1], rng)
+        fails = rng.random() < LLM_ERROR_RATE
+
+        schema = _response_schema(kwargs)
+        if schema is not None:
+            text = json.dumps(sample_json(schema, rng, output_tokens), ensure_ascii=False)
+        else:
+            text = _markdown(rng, self.model, output_tokens)
+        output_tokens = count_tokens(text, self.model)
+        cached = self._cached_tokens(texts)
+
+        wait(first_token)
+        if fails:
+            raise SimulatedProviderError(f"Simulated {self.provider} error ({self.model})")
+
+        # Split on word boundaries into ~STREAM_CHUNK_TOKENS pieces
+        words = text.split(" ")
+        step = max(1, int(STREAM_CHUNK_TOKENS * WORDS_PER_TOKEN))
+        pieces = [" ".join(words[i:i + step]) + (" " if i + step < len(words) else "")
+                  for i in range(0, len(words), step)]
+        for i, piece in enumerate(pieces):
+            wait(count_tokens(piece, self.model) / tokens_per_second)
+            usage = None
+            if i == len(pieces) - 1:
+                usage = {
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                    "input_token_details": {"cache_read": cached},
+                }
+            yield AIMessageChunk(content=piece, usage_metadata=usage)
+
+    def invoke(self, messages: List[Any], **kwargs):
+        response = None
+        for chunk in self.stream(messages, **kwargs):
+            response = chunk if response is None else response + chunk
+        return response
+
+
+# ---------------------------------------------------------------------
+# Fake transcription
+# ---------------------------------------------------------------------
+def simulated_transcription(duration_seconds: float, seed: Any = None) -> Dict[str, Any]:
+    """
+    Deepgram-shaped response for `duration_seconds` of audio: one utterance
+    every SECONDS_PER_UTTERANCE seconds at WORDS_PER_MINUTE, after a
+    simulated SIM_TRANSCRIBE_REALTIME delay. Raises SimulatedProviderError
+    at SIM_TRANSCRIBE_ERROR_RATE.
+    """
+    rng = seeded_rng("transcribe", round(duration_seconds, 3), seed)
+    wait(duration_seconds * TRANSCRIBE_REALTIME.sample(rng))
+    if rng.random() < TRANSCRIBE_ERROR_RATE:
+        raise SimulatedProviderError("Simulated transcription error")
+
+    words_per_utterance = max(1, int(WORDS_PER_MINUTE * SECONDS_PER_UTTERANCE / 60))
+    utterances = []
+    start = 0.0
+    while start < duration_seconds:
+        end = min(duration_seconds, start + SECONDS_PER_UTTERANCE)
+        n = max(1, int(words_per_utterance * (end - start) / SECONDS_PER_UTTERANCE))
+        utterances.append({
+            "id": str(len(utterances)),
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "confidence": round(rng.uniform(0.85, 0.99), 3),
+            "channel": 0,
+            "transcript": _words(rng, n),
+            "words": [],
+        })
+        start = end
+
+    return {
+        "metadata": {
+            "duration": duration_seconds,
+            "channels": 1,
+            "backend": "fake",
+            "model": "simulated",
+        },
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": " ".join(u["transcript"] for u in utterances),
+                    "confidence": sum(u["confidence"] for u in utterances) / len(utterances) if utterances else 0.0,
+                    "words": [],
+                }],
+            }],
+            "utterances": utterances,
+        },
+    }
+
+
+# ---------------------------------------------------------------------
+# Batch API
+# ---------------------------------------------------------------------
+_batch_url: Optional[str] = None
+_batch_lock = threading.Lock()
+
+
+def batch_base_url() -> str:
+    """Base URL of an in-process fake_batch_server (started on first use)."""
+    global _batch_url
+    with _batch_lock:
+        if _batch_url is None:
+            import fake_batch_server
+
+            server = fake_batch_server.serve(port=0, delay=BATCH_DELAY_SECONDS * TIME_SCALE)
+            _batch_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+            print(f"Simulation: fake Batch API on {_batch_url}")
+        return _batch_url
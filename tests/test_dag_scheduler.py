@@ -0,0 +1,110 @@
+"""Dependency analysis and scheduling (dag_scheduler)."""
+import time
+
+import pytest
+
+from dag_scheduler import DagScheduler, current_node, reads, state_fields_read, state_fields_written
+
+
+def notes(state):
+    return {"notes": f"notes of {state['transcript']}"}
+
+
+def misconceptions(state):
+    return {"misconceptions": f"misconceptions of {state.get('transcript')}"}
+
+
+def practice(state):
+    return {"practice": state["notes"] + " + " + state["misconceptions"]}
+
+
+def resources(state):
+    time.sleep(0.05)
+    return {"resources": f"resources for {state['notes']}", "ran_in": current_node()}
+
+
+@reads("notes")
+def summary(state):
+    field = "no" + "tes"
+    return {"summary": state[field][:5]}
+
+
+NODES = {
+    "notes": notes,
+    "misconceptions": misconceptions,
+    "practice": practice,
+    "resources": resources,
+}
+
+
+def test_reads_and_writes_come_from_the_source():
+    assert state_fields_read(practice) == {"notes", "misconceptions"}
+    assert state_fields_read(misconceptions) == {"transcript"}
+    assert state_fields_written(resources) == {"resources", "ran_in"}
+
+
+def test_declared_reads_replace_the_analysis():
+    assert state_fields_read(summary) == {"notes"}
+    assert DagScheduler({**NODES, "summary": summary}).deps["summary"] == ["notes"]
+
+
+def test_dependencies_and_order():
+    scheduler = DagScheduler(NODES)
+    assert scheduler.dependencies() == {
+        "notes": [],
+        "misconceptions": [],
+        "practice": ["misconceptions", "notes"],
+        "resources": ["notes"],
+    }
+    order = scheduler.order
+    assert order.index("practice") > max(order.index("notes"), order.index("misconceptions"))
+
+
+def test_two_writers_of_a_field_are_rejected():
+    def other_notes(state):
+        return {"notes": "again"}
+
+    with pytest.raises(ValueError, match="written by both"):
+        DagScheduler({"notes": notes, "other": other_notes})
+
+
+def test_cycles_are_rejected():
+    def a(state):
+        return {"x": state["y"]}
+
+    def b(state):
+        return {"y": state["x"]}
+
+    with pytest.raises(ValueError, match="cycle"):
+        DagScheduler({"a": a, "b": b})
+
+
+def test_subset_keeps_what_the_targets_need():
+    scheduler = DagScheduler(NODES)
+    assert set(scheduler.subset(["resources"]).nodes) == {"notes", "resources"}
+    assert set(scheduler.subset(["practice"]).nodes) == {"notes", "misconceptions", "practice"}
+    with pytest.raises(ValueError):
+        scheduler.subset(["unknown"])
+
+
+def test_dependents():
+    scheduler = DagScheduler(NODES)
+    assert scheduler.dependents(["misconceptions"]) == {"misconceptions", "practice"}
+    assert scheduler.dependents(["notes"]) == {"notes", "practice", "resources"}
+
+
+def test_only_treats_other_outputs_as_inputs():
+    partial = DagScheduler(NODES).only(["practice"])
+    assert partial.deps == {"practice": []}
+    state, _ = partial.run({"notes": "N", "misconceptions": "M"})
+    assert state["practice"] == "N + M"
+
+
+def test_run_produces_every_output_and_a_report():
+    state, report = DagScheduler(NODES).run({"transcript": "T"})
+    assert state["practice"] == "notes of T + misconceptions of T"
+    assert state["resources"] == "resources for notes of T"
+    assert state["ran_in"] == "resources"
+    assert set(report["nodes"]) == set(NODES)
+    assert report["critical_path"] == ["notes", "resources"]
+    assert report["nodes"]["resources"]["start"] >= report["nodes"]["notes"]["end"]
@@ -0,0 +1,78 @@
+"""SQLite LLM response cache (llm_cache)."""
+import time
+
+import pytest
+
+import llm_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_PATH", tmp_path / "llm_cache.db")
+    monkeypatch.setattr(llm_cache, "_initialized", False)
+    monkeypatch.delenv("LLM_CACHE_DISABLED", raising=False)
+    return llm_cache
+
+
+def _age(cache, key, created_days, used_days):
+    now = time.time()
+    conn = cache._connect()
+    conn.execute(
+        "UPDATE llm_responses SET created_at = ?, last_used_at = ? WHERE key = ?",
+        (now - created_days * 86400, now - used_days * 86400, key),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_key_depends_on_every_part():
+    base = ("openai", "gpt-4o", 0.2, "system", "user")
+    key = llm_cache.cache_key(*base)
+    assert key == llm_cache.cache_key("OpenAI", "gpt-4o", 0.2, "system", "user")
+    for i, other in enumerate(["gemini", "gpt-4o-mini", None, "system2", "user2"]):
+        changed = list(base)
+        changed[i] = other
+        assert llm_cache.cache_key(*changed) != key
+
+
+def test_put_then_get(cache):
+    assert cache.get("k") is None
+    cache.put("k", "answer", {"input_tokens": 10, "output_tokens": 5})
+    assert cache.get("k") == {"response": "answer", "usage": {"input_tokens": 10, "output_tokens": 5}}
+
+
+def test_bypass_skips_reads(cache):
+    cache.put("k", "answer")
+    with cache.bypass():
+        assert cache.is_bypassed()
+        assert cache.get("k") is None
+    assert cache.get("k") is not None
+
+
+def test_entries_expire_by_age_even_when_used(cache, monkeypatch):
+    monkeypatch.setattr(cache, "MAX_AGE_SECONDS", 30 * 86400)
+    cache.put("old", "a")
+    cache.put("recent", "b")
+    _age(cache, "old", created_days=31, used_days=0)
+    _age(cache, "recent", created_days=29, used_days=20)
+    assert cache.get("old") is None
+    assert cache.get("recent") is not None
+
+
+def test_eviction_drops_least_recently_used(cache, monkeypatch):
+    monkeypatch.setattr(cache, "MAX_ENTRIES", 2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    _age(cache, "a", created_days=0, used_days=0)
+    _age(cache, "b", created_days=0, used_days=1)
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_eviction_keeps_total_size_under_the_cap(cache, monkeypatch):
+    monkeypatch.setattr(cache, "MAX_BYTES", 10)
+    cache.put("a", "x" * 6)
+    cache.put("b", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.get("b") == {"response": "y" * 6, "usage": {}}
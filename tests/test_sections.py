@@ -0,0 +1,51 @@
+"""Section selection and regeneration planning (class_test_graph)."""
+import pytest
+
+from class_test_graph import SECTIONS, parse_sections, regeneration_plan, scheduler_for
+
+
+DONE = {
+    "transcript": "T",
+    "notes_1a": {"summary": "S"},
+    "misconceptions_1b": {"misconceptions": []},
+    "practice_2": "P",
+    "resources_3": "R",
+    "actions_4": "A",
+}
+
+
+@pytest.mark.parametrize("value", [None, "", "all", " ALL ", ",", list(SECTIONS), "actions,notes,practice,misconceptions,resources"])
+def test_everything_means_no_selection(value):
+    assert parse_sections(value) is None
+
+
+def test_selection_is_normalized_to_section_order():
+    assert parse_sections("practice, Notes") == ("notes", "practice")
+    assert parse_sections(["resources", "notes", "notes"]) == ("notes", "resources")
+
+
+def test_unknown_sections_are_rejected():
+    with pytest.raises(ValueError, match="quiz"):
+        parse_sections("notes,quiz")
+
+
+def test_scheduler_for_runs_what_a_section_is_built_from():
+    assert set(scheduler_for(("practice",)).nodes) == {"node_1a_notes", "node_1b_misconceptions", "node_2_practice"}
+    assert set(scheduler_for(("resources",)).nodes) == {"node_1a_notes", "node_3_resources"}
+    assert len(scheduler_for(None).nodes) == len(SECTIONS)
+
+
+def test_regenerating_a_section_redoes_what_is_built_on_it():
+    assert regeneration_plan(DONE, "misconceptions") == [
+        "node_1b_misconceptions", "node_2_practice", "node_4_actions",
+    ]
+    assert regeneration_plan(DONE, "resources") == ["node_3_resources"]
+    assert regeneration_plan(DONE, None) == list(scheduler_for(None).order)
+
+
+def test_regeneration_runs_missing_inputs_but_not_unused_sections():
+    notes_only = {"transcript": "T", "notes_1a": {"summary": "S"}}
+    # practice needs misconceptions, which never ran; notes are reused
+    assert regeneration_plan(notes_only, "practice") == ["node_1b_misconceptions", "node_2_practice"]
+    # actions had no output, so regenerating notes does not start it
+    assert regeneration_plan(notes_only, "notes") == ["node_1a_notes"]
@@ -0,0 +1,75 @@
+"""Segment planning and stitching for segmented transcription (audio_to_transcribe_whisper)."""
+import pytest
+
+from audio_to_transcribe_whisper import _merge_segment_results, _plan_segments
+
+
+def test_short_input_is_one_segment():
+    assert _plan_segments([], 100.0, 600.0) == [(0.0, 100.0)]
+
+
+@pytest.mark.parametrize("duration", [0.0, -1.0])
+def test_non_positive_duration_is_rejected(duration):
+    with pytest.raises(ValueError):
+        _plan_segments([], duration, 600.0)
+
+
+def test_cuts_at_the_silence_closest_to_the_target():
+    silences = [(280.0, 282.0), (590.0, 596.0), (900.0, 901.0)]
+    bounds = _plan_segments(silences, 1500.0, 600.0)
+    assert bounds[0] == (0.0, 593.0)
+    assert bounds[-1][1] == 1500.0
+    # Contiguous, no gaps or overlaps
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+def test_hard_cut_without_a_nearby_silence():
+    assert _plan_segments([], 1000.0, 400.0) == [(0.0, 400.0), (400.0, 1000.0)]
+
+
+def _part(request_id, text, utterances, words):
+    return {
+        "metadata": {"request_id": request_id},
+        "results": {
+            "channels": [{"alternatives": [{"transcript": text, "confidence": 0.9, "words": words}]}],
+            "utterances": utterances,
+        },
+    }
+
+
+def test_merge_shifts_times_and_renumbers_speakers():
+    first = _part(
+        "a", "Hello. Hi.",
+        [{"start": 0.0, "end": 1.0, "speaker": 0, "transcript": "Hello."},
+         {"start": 1.0, "end": 2.0, "speaker": 1, "transcript": "Hi.",
+          "words": [{"start": 1.0, "end": 2.0, "speaker": 1, "word": "hi"}]}],
+        [{"start": 0.0, "end": 1.0, "speaker": 0, "word": "hello"}],
+    )
+    second = _part(
+        "b", "Next.",
+        [{"start": 0.5, "end": 1.5, "speaker": 0, "transcript": "Next."}],
+        [{"start": 0.5, "end": 1.5, "speaker": 0, "word": "next"}],
+    )
+    merged = _merge_segment_results([(0.0, first), (600.0, second)], 700.0)
+
+    utterances = merged["results"]["utterances"]
+    assert [u["speaker"] for u in utterances] == [0, 1, 2]
+    assert (utterances[2]["start"], utterances[2]["end"]) == (600.5, 601.5)
+    assert utterances[1]["words"][0]["speaker"] == 1
+    alt = merged["results"]["channels"][0]["alternatives"][0]
+    assert alt["transcript"] == "Hello. Hi. Next."
+    assert [w["speaker"] for w in alt["words"]] == [0, 2]
+    assert merged["metadata"]["duration"] == 700.0
+    assert merged["metadata"]["segments"] == [
+        {"start": 0.0, "request_id": "a", "first_speaker": 0},
+        {"start": 600.0, "request_id": "b", "first_speaker": 2},
+    ]
+    # The inputs are not modified
+    assert second["results"]["utterances"][0]["speaker"] == 0
+
+
+def test_merge_of_segments_without_diarization():
+    part = _part("a", "Text.", [{"start": 0.0, "end": 1.0, "transcript": "Text."}], [])
+    merged = _merge_segment_results([(0.0, part), (60.0, part)], 120.0)
+    assert all("speaker" not in u for u in merged["results"]["utterances"])
+    assert [s["first_speaker"] for s in merged["metadata"]["segments"]] == [0, 0]
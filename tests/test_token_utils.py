@@ -0,0 +1,53 @@
+"""Token-bounded chunking (token_utils)."""
+from token_utils import chunk_transcript, chunk_units, count_tokens, split_sentences, _hard_split
+
+
+def test_units_are_packed_without_splitting():
+    units = [f"Sentence number {i} is here." for i in range(40)]
+    chunks = chunk_units(units, 30)
+    assert len(chunks) > 1
+    assert " ".join(chunks) == " ".join(units)
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 30
+        assert chunk.endswith(".")
+
+
+def test_empty_units_are_skipped():
+    assert chunk_units(["", "  ", "a b"], 100) == ["a b"]
+
+
+def test_oversized_unit_is_split_on_words():
+    unit = " ".join(["word"] * 200)
+    chunks = chunk_units([unit], 20)
+    assert all(count_tokens(c) <= 20 for c in chunks)
+    assert " ".join(chunks).split() == unit.split()
+
+
+def test_text_without_spaces_is_split_on_characters():
+    text = "光合作用把光能转化为化学能" * 40   # unpunctuated CJK, no break points
+    chunks = chunk_units([text], 25)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(count_tokens(c) < 25 for c in chunks)
+
+
+def test_hard_split_of_short_text_is_one_piece():
+    assert _hard_split("abc", 10, "gpt-4o") == ["abc"]
+
+
+def test_cjk_full_stops_end_sentences_without_space():
+    assert split_sentences("第一句。第二句！第三句？") == ["第一句。", "第二句！", "第三句？"]
+    assert split_sentences("One. Two? Three") == ["One.", "Two?", "Three"]
+
+
+def test_transcript_that_fits_is_one_chunk():
+    assert chunk_transcript("Short class.", 100) == ["Short class."]
+
+
+def test_transcript_chunks_follow_utterances():
+    utterances = [f"Utterance {i} about limits." for i in range(30)]
+    transcript = " ".join(utterances)
+    chunks = chunk_transcript(transcript, 40, utterances=utterances)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith("Utterance ") and chunk.endswith("limits.")
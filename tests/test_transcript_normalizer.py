@@ -0,0 +1,68 @@
+"""Filler and repetition removal (transcript_normalizer)."""
+import pytest
+
+from transcript_normalizer import normalize_transcript, normalize_units, normalize_utterance
+
+
+def test_off_leaves_text_unchanged():
+    assert normalize_utterance("um the the the", "off") == "um the the the"
+
+
+def test_hesitations_and_their_commas_are_removed():
+    assert normalize_utterance("So, um, we start, uh, here.", "light") == "So we start here."
+    assert normalize_utterance("um", "standard") == ""
+
+
+@pytest.mark.parametrize("text", ["he had had enough", "that that is true", "bye bye"])
+def test_words_said_twice_are_kept_below_aggressive(text):
+    assert normalize_utterance(text, "light") == text
+    assert normalize_utterance(text, "standard") == text
+
+
+def test_words_said_three_times_are_stutters():
+    assert normalize_utterance("the the the value", "light") == "the value"
+    assert normalize_utterance("we will we will we will go", "standard") == "we will go"
+
+
+def test_three_word_phrase_said_twice_collapses_at_standard():
+    assert normalize_utterance("we can see we can see the curve", "standard") == "we can see the curve"
+
+
+def test_aggressive_collapses_any_double():
+    assert normalize_utterance("the the value", "aggressive") == "the value"
+    assert normalize_utterance("we will we will go", "aggressive") == "we will go"
+
+
+def test_numbers_are_not_repetitions():
+    assert normalize_utterance("it is 1 1 2", "aggressive") == "it is 1 1 2"
+
+
+def test_discourse_fillers_drop_both_commas():
+    assert normalize_utterance("the value is, you know, 5.", "standard") == "the value is 5."
+    assert normalize_utterance("You know, it works.", "standard") == "it works."
+    assert normalize_utterance("let me think, like,", "standard") == "let me think"
+
+
+def test_discourse_fillers_are_kept_at_light():
+    assert normalize_utterance("the value is, you know, 5.", "light") == "the value is, you know, 5."
+
+
+def test_duplicate_and_backchannel_utterances():
+    assert normalize_units(["A.", "A."], "light") == ["A."]
+    # light only looks at the previous utterance
+    assert normalize_units(["A.", "B.", "A."], "light") == ["A.", "B.", "A."]
+    assert normalize_units(["A.", "B.", "A."], "standard") == ["A.", "B."]
+    units = ["Okay.", "yeah okay", "Next topic.", "Next topic!", "mm-hmm right"]
+    assert normalize_units(units, "aggressive") == ["Next topic."]
+
+
+def test_transcript_keeps_utterance_boundaries():
+    result = normalize_transcript("", utterances=["um So.", "So.", "Next, uh, part."], level="standard")
+    assert result.utterances == ["So.", "Next part."]
+    assert result.text == "So. Next part."
+    assert (result.units_before, result.units_after) == (3, 2)
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(ValueError):
+        normalize_utterance("text", "extreme")
@@ -0,0 +1,68 @@
+"""Structured 1A/1B outputs and their rendering (tutor_schemas)."""
+import json
+
+from tutor_schemas import (
+    ClassNotes,
+    MisconceptionList,
+    concepts_digest,
+    misconceptions_digest,
+    render_misconceptions,
+    render_notes,
+    render_partial,
+)
+
+
+NOTES = {
+    "summary": "Limits describe where a function is heading.",
+    "key_concepts": ["limit", "continuity"],
+    "sections": [{"title": "Limits", "points": ["one-sided limits", "limit laws"]}],
+    "glossary": [{"term": "limit", "definition": "value approached"}],
+    "formulas": [],
+    "examples": [{"example": "1/x", "shows": "no limit at 0"}],
+}
+MISCONCEPTIONS = {"misconceptions": [{
+    "title": "A limit is the value at the point",
+    "why_students_think_this": "it often is",
+    "why_wrong": "the function may be undefined there",
+    "correction": "a limit is about nearby values",
+}]}
+
+
+def test_render_notes():
+    md = render_notes(NOTES)
+    assert md.startswith("# Summary\nLimits describe")
+    assert "## Section 1: Limits\n- one-sided limits\n- limit laws" in md
+    assert "# Formulas\n- (none)" in md
+
+
+def test_render_misconceptions():
+    md = render_misconceptions(MISCONCEPTIONS)
+    assert md.startswith("## Misconception 1: A limit is the value at the point")
+    assert "- Correct explanation: a limit is about nearby values" in md
+
+
+def test_digests():
+    assert concepts_digest(NOTES) == "Key concepts:\n- limit\n- continuity"
+    assert misconceptions_digest(MISCONCEPTIONS) == (
+        "- A limit is the value at the point -> a limit is about nearby values"
+    )
+
+
+def test_partial_preview_shows_only_received_fields():
+    text = json.dumps(NOTES)
+    cut = text.index('"sections"') + len('"sections": [{"title": "Lim')
+    preview = render_partial(ClassNotes, text[:cut])
+    assert preview.startswith("# Summary\nLimits describe")
+    assert preview.endswith("## Section 1: Lim\n- (none)")
+    assert "# Glossary" not in preview
+
+
+def test_partial_preview_of_a_complete_answer_is_the_full_render():
+    assert render_partial(ClassNotes, json.dumps(NOTES)) == render_notes(NOTES)
+    assert render_partial(MisconceptionList, json.dumps(MISCONCEPTIONS)) == render_misconceptions(MISCONCEPTIONS)
+
+
+def test_partial_preview_needs_some_json():
+    assert render_partial(ClassNotes, "") is None
+    assert render_partial(ClassNotes, '{"sum') is None
+    assert render_partial(ClassNotes, "not json") is None
@@ -0,0 +1,83 @@
+"""Array-backed utterance index (utterance_index)."""
+from utterance_index import UtteranceIndex, index_path_for
+from pathlib import Path
+
+
+UTTERANCES = [
+    {"start": 0.0, "end": 2.0, "transcript": "Hello class.", "speaker": 0},
+    {"start": 2.5, "end": 4.0, "transcript": "  ", "speaker": 1},     # empty: skipped
+    {"start": 4.0, "end": 7.0, "transcript": "Today: limits, ünïcode.", "speaker": 1},
+    {"start": 7.5, "end": 9.0, "transcript": "Any questions?"},
+]
+
+
+def _index() -> UtteranceIndex:
+    return UtteranceIndex.from_utterances(UTTERANCES)
+
+
+def test_texts_and_full_text():
+    index = _index()
+    assert len(index) == 3
+    assert index.texts() == ["Hello class.", "Today: limits, ünïcode.", "Any questions?"]
+    assert index.full_text() == "Hello class. Today: limits, ünïcode. Any questions?"
+
+
+def test_utterance_dicts_round_trip():
+    utterances = list(_index())
+    assert utterances[1] == {"start": 4.0, "end": 7.0, "transcript": "Today: limits, ünïcode.", "speaker": 1}
+    assert "speaker" not in utterances[2]
+
+
+def test_time_range_lookups():
+    index = _index()
+    assert index.range(0.0, 1.0) == (0, 1)
+    assert index.range(3.0, 8.0) == (1, 3)
+    assert index.range(9.5, 20.0) == (3, 3)
+    assert index.text_between(5.0, 7.6) == "Today: limits, ünïcode. Any questions?"
+    assert index.text_between(20.0, 30.0) == ""
+
+
+def test_at():
+    index = _index()
+    assert index.at(1.0) == 0
+    assert index.at(2.2) is None
+    assert index.at(8.0) == 2
+    assert index.at(10.0) is None
+
+
+def test_overlapping_utterances_are_found():
+    index = UtteranceIndex.from_utterances([
+        {"start": 0.0, "end": 10.0, "transcript": "long"},
+        {"start": 1.0, "end": 2.0, "transcript": "short"},
+        {"start": 11.0, "end": 12.0, "transcript": "late"},
+    ])
+    # "short" ends before 5 s, but the earlier "long" still plays
+    assert index.range(5.0, 6.0) == (0, 2)
+
+
+def test_slice_is_a_valid_index():
+    sub = _index().slice(3.0, 8.0)
+    assert sub.texts() == ["Today: limits, ünïcode.", "Any questions?"]
+    assert sub.full_text() == "Today: limits, ünïcode. Any questions?"
+    assert len(_index().slice(20.0, 30.0)) == 0
+
+
+def test_from_deepgram_falls_back_to_channel_transcript():
+    dg = {
+        "metadata": {"duration": 12.0},
+        "results": {"channels": [{"alternatives": [{"transcript": "Whole text."}]}], "utterances": []},
+    }
+    index = UtteranceIndex.from_deepgram(dg)
+    assert list(index) == [{"start": 0.0, "end": 12.0, "transcript": "Whole text."}]
+    assert len(UtteranceIndex.from_deepgram({})) == 0
+
+
+def test_save_and_load(tmp_path):
+    path = _index().save(tmp_path / "rec.utt.npz")
+    loaded = UtteranceIndex.load(path)
+    assert list(loaded) == list(_index())
+    assert loaded.full_text() == _index().full_text()
+
+
+def test_index_path_for():
+    assert index_path_for(Path("lecture.deepgram.json")) == Path("lecture.deepgram.utt.npz")
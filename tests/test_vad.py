@@ -0,0 +1,83 @@
+"""Silence trimming and timestamp mapping (vad)."""
+import wave
+
+import numpy as np
+import pytest
+
+from vad import _keep_spans, restore_timestamps, to_original_time, trim_silence
+
+
+# Two kept spans: 0-10 s of the original -> 0-10 s trimmed, 20-30 s -> 10-20 s
+OFFSET_MAP = [(0.0, 10.0, 0.0), (20.0, 30.0, 10.0)]
+
+
+def test_times_map_back_to_the_original():
+    assert to_original_time(5.0, OFFSET_MAP) == 5.0
+    assert to_original_time(10.0, OFFSET_MAP) == 20.0
+    assert to_original_time(12.5, OFFSET_MAP) == 22.5
+    # Past the last span: clamped to its end
+    assert to_original_time(25.0, OFFSET_MAP) == 30.0
+
+
+def test_empty_offset_map_is_identity():
+    assert to_original_time(7.0, []) == 7.0
+    dg = {"results": {"utterances": [{"start": 1.0, "end": 2.0}]}}
+    assert restore_timestamps(dg, []) == {"results": {"utterances": [{"start": 1.0, "end": 2.0}]}}
+
+
+def test_restore_timestamps_rewrites_utterances_and_words():
+    dg = {"results": {
+        "utterances": [{"start": 9.0, "end": 12.0, "words": [{"start": 11.0, "end": 12.0}]}],
+        "channels": [{"alternatives": [{"words": [{"start": 9.5, "end": 10.5}, {"start": None}]}]}],
+    }}
+    out = restore_timestamps(dg, OFFSET_MAP)
+    assert out is dg
+    utterance = dg["results"]["utterances"][0]
+    assert (utterance["start"], utterance["end"]) == (9.0, 22.0)
+    assert (utterance["words"][0]["start"], utterance["words"][0]["end"]) == (21.0, 22.0)
+    words = dg["results"]["channels"][0]["alternatives"][0]["words"]
+    assert (words[0]["start"], words[0]["end"]) == (9.5, 20.5)
+    assert words[1] == {"start": None}
+
+
+def test_keep_spans_cuts_only_long_silences():
+    frame_s = 0.5
+    # 2 s speech, 5 s silence, 1 s speech, 1 s silence, 2 s speech
+    speech = np.array([1] * 4 + [0] * 10 + [1] * 2 + [0] * 2 + [1] * 4, dtype=bool)
+    spans = _keep_spans(speech, frame_s, len(speech) * frame_s, min_silence=2.0, pad=0.25)
+    assert spans == [(0.0, 2.25), (6.75, 11.0)]
+
+
+def _write_wav(path, samples, sr=16000):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(samples.astype(np.int16).tobytes())
+
+
+def test_trim_silence_drops_dead_air(tmp_path):
+    sr = 16000
+    t = np.arange(2 * sr) / sr
+    tone = 8000 * np.sin(2 * np.pi * 220 * t)
+    quiet = np.zeros(6 * sr)
+    src = tmp_path / "class.wav"
+    _write_wav(src, np.concatenate([tone, quiet, tone]), sr)
+
+    result = trim_silence(src, tmp_path / "class.vad.wav")
+    assert result.original_seconds == pytest.approx(10.0)
+    assert 4.0 < result.kept_seconds < 6.0
+    assert len(result.offset_map) == 2
+    with wave.open(str(result.wav_path), "rb") as wf:
+        assert wf.getnframes() / wf.getframerate() == pytest.approx(result.kept_seconds)
+    # The start of the second tone maps back to about 8 s in the original
+    second_start = result.offset_map[1][2]
+    assert to_original_time(second_start + 0.5, result.offset_map) == pytest.approx(8.0, abs=0.5)
+
+
+def test_trim_silence_keeps_audio_without_speech(tmp_path):
+    src = tmp_path / "silent.wav"
+    _write_wav(src, np.zeros(3 * 16000))
+    result = trim_silence(src, tmp_path / "silent.vad.wav")
+    assert result.wav_path == src
+    assert result.kept_seconds == result.original_seconds
@@ -0,0 +1,172 @@
+"""
+Token budgets, model pricing and pre-flight cost/latency estimates.
+
+Budgets (env, 0 = unlimited):
+  NODE_TOKEN_BUDGET    = max prompt tokens in a single LLM call (default: 30000).
+                         Nodes 1A/1B chunk the transcript to stay under it;
+                         any other call over it fails before it is sent.
+  JOB_TOKEN_BUDGET     = max tokens (prompt + expected output) for all LLM
+                         calls of one job (default: 400000). A call that would
+                         exceed it fails before it is sent. Calls in flight
+                         count with their estimate (reserved by check_call,
+                         returned by release_call), so parallel map-reduce
+                         calls cannot overshoot it together.
+  JOB_COST_BUDGET_USD  = max estimated spend per job (default: 0 = unlimited).
+                         A call that would exceed it is moved to the model's
+                         cheaper sibling (CHEAPER_MODEL) if that fits, else fails.
+
+The price and speed tables are list prices / rough observed throughput and
+only drive estimates and the cost budget; adjust them when models change.
+"""
+import os
+from typing import Optional, Dict, Any, Tuple
+
+from job_metrics import locked_metrics, update_budget
+
+
+NODE_TOKEN_BUDGET = int(os.getenv("NODE_TOKEN_BUDGET", "30000"))
+JOB_TOKEN_BUDGET = int(os.getenv("JOB_TOKEN_BUDGET", "400000"))
+JOB_COST_BUDGET_USD = float(os.getenv("JOB_COST_BUDGET_USD", "0"))
+
+# USD per 1M tokens: (input, output)
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-5": (1.25, 10.00),
+    "gpt-5-mini": (0.25, 2.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+# Price of a prompt-cache hit relative to the normal input price
+CACHED_INPUT_FACTOR: Dict[str, float] = {
+    "gpt-4o": 0.5,
+    "gpt-4o-mini": 0.5,
+    "gpt-5": 0.1,
+    "gpt-5-mini": 0.1,
+    "gemini-2.5-pro": 0.25,
+    "gemini-2.5-flash": 0.25,
+    "gemini-2.5-flash-lite": 0.25,
+}
+
+# Output tokens per second and time to first token (s): latency estimates only
+MODEL_SPEED: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (80.0, 0.6),
+    "gpt-4o-mini": (100.0, 0.5),
+    "gpt-5": (50.0, 8.0),          # reasoning before the first visible token
+    "gpt-5-mini": (80.0, 4.0),
+    "gemini-2.5-pro": (80.0, 4.0),
+    "gemini-2.5-flash": (200.0, 1.0),
+    "gemini-2.5-flash-lite": (250.0, 0.5),
+}
+DEFAULT_SPEED = (60.0, 1.0)
+
+CHEAPER_MODEL: Dict[str, str] = {
+    "gpt-4o": "gpt-4o-mini",
+    "gpt-5": "gpt-5-mini",
+    "gemini-2.5-pro": "gemini-2.5-flash",
+    "gemini-2.5-flash": "gemini-2.5-flash-lite",
+}
+
+# Per-message framing overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Transcription estimates from the probed audio duration
+TOKENS_PER_AUDIO_MINUTE = float(os.getenv("TOKENS_PER_AUDIO_MINUTE", "200"))  # ~150 spoken words/min
+TRANSCRIPTION_SECONDS_PER_AUDIO_MINUTE = float(os.getenv("TRANSCRIPTION_SECONDS_PER_AUDIO_MINUTE", "2.0"))
+TRANSCRIPTION_USD_PER_AUDIO_MINUTE = 0.0048  # Deepgram Whisper Cloud (large)
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """An LLM call would exceed the per-node or per-job budget."""
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> float:
+    """USD for one call; `cached_input_tokens` (part of input_tokens) are billed at the cache rate."""
+    price_in, price_out = MODEL_PRICING.get(model, (0.0, 0.0))
+    cached = min(cached_input_tokens, input_tokens)
+    billed_in = input_tokens - cached + cached * CACHED_INPUT_FACTOR.get(model, 1.0)
+    return (billed_in * price_in + output_tokens * price_out) / 1_000_000
+
+
+def call_latency(model: str, output_tokens: int) -> float:
+    tokens_per_second, first_token = MODEL_SPEED.get(model, DEFAULT_SPEED)
+    return first_token + output_tokens / tokens_per_second
+
+
+def check_call(
+    provider: str,
+    model: str,
+    prompt_tokens: int,
+    expected_output_tokens: int,
+) -> str:
+    """
+    Enforce the budgets for one LLM call before it is sent and return the
+    model to use (the original or its cheaper sibling). Raises
+    TokenBudgetExceeded if no model fits. Outside a job (no metrics scope)
+    only the per-node budget applies.
+
+    Inside a job the call's estimated tokens and cost are reserved in the
+    same locked step as the check; the caller gives them back with
+    release_call(returned model, ...) once the call's usage is recorded.
+    """
+    if NODE_TOKEN_BUDGET and prompt_tokens > NODE_TOKEN_BUDGET:
+        raise TokenBudgetExceeded(
+            f"{model}: prompt of {prompt_tokens} tokens exceeds NODE_TOKEN_BUDGET={NODE_TOKEN_BUDGET}"
+        )
+
+    with locked_metrics() as metrics:
+        if metrics is None:
+            return model
+        budget = metrics["budget"]
+
+        committed_tokens = metrics["llm_input_tokens"] + metrics["llm_output_tokens"] + budget["reserved_tokens"]
+        if JOB_TOKEN_BUDGET and committed_tokens + prompt_tokens + expected_output_tokens > JOB_TOKEN_BUDGET:
+            raise TokenBudgetExceeded(
+                f"{model}: {prompt_tokens} + ~{expected_output_tokens} tokens would exceed "
+                f"JOB_TOKEN_BUDGET={JOB_TOKEN_BUDGET} ({committed_tokens} already used or reserved)"
+            )
+
+        candidate: Optional[str] = model
+        if JOB_COST_BUDGET_USD:
+            committed = metrics["llm_cost_usd"] + budget["reserved_cost_usd"]
+            while candidate and (
+                committed + call_cost(candidate, prompt_tokens, expected_output_tokens) > JOB_COST_BUDGET_USD
+            ):
+                candidate = CHEAPER_MODEL.get(candidate)
+            if candidate is None:
+                raise TokenBudgetExceeded(
+                    f"{model}: call would exceed JOB_COST_BUDGET_USD={JOB_COST_BUDGET_USD} "
+                    f"(${committed:.4f} already spent or reserved) even with the cheapest fallback"
+                )
+            if candidate != model:
+                print(f"Budget: {model} -> {candidate} to stay within JOB_COST_BUDGET_USD={JOB_COST_BUDGET_USD}")
+                update_budget(downgrade=f"{model}->{candidate}")
+
+        budget["reserved_tokens"] += prompt_tokens + expected_output_tokens
+        budget["reserved_cost_usd"] = round(
+            budget["reserved_cost_usd"] + call_cost(candidate, prompt_tokens, expected_output_tokens), 6
+        )
+    return candidate
+
+
+def release_call(model: str, prompt_tokens: int, expected_output_tokens: int) -> None:
+    """Give back the reservation check_call made for a call on `model` (no-op outside a job)."""
+    with locked_metrics() as metrics:
+        if metrics is None:
+            return
+        budget = metrics["budget"]
+        budget["reserved_tokens"] = max(0, budget["reserved_tokens"] - prompt_tokens - expected_output_tokens)
+        budget["reserved_cost_usd"] = max(
+            0.0, round(budget["reserved_cost_usd"] - call_cost(model, prompt_tokens, expected_output_tokens), 6)
+        )
+
+
+def estimate_transcription(duration_seconds: float) -> Dict[str, Any]:
+    minutes = duration_seconds / 60.0
+    return {
+        "transcript_tokens": int(minutes * TOKENS_PER_AUDIO_MINUTE),
+        "cost_usd": minutes * TRANSCRIPTION_USD_PER_AUDIO_MINUTE,
+        "latency_seconds": minutes * TRANSCRIPTION_SECONDS_PER_AUDIO_MINUTE,
+    }
@@ -0,0 +1,128 @@
+"""
+Token counting and token-bounded transcript chunking (tiktoken).
+
+Counts use the model's own encoding when tiktoken knows the model, and
+o200k_base otherwise (e.g. Gemini models, whose tokenizer is not public;
+the counts are close enough for sizing prompts). If the encoding files
+cannot be loaded (offline host without a tiktoken cache), counts fall back
+to an estimate of ~4 characters per token.
+"""
+import re
+import sys
+import math
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import tiktoken
+
+
+FALLBACK_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4.0
+
+# Sentence ends, used when no utterance boundaries are available (CJK
+# full stops are often not followed by a space)
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|(?<=[。！？])\s*")
+
+_warn_lock = threading.Lock()
+_warned = False
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        global _warned
+        with _warn_lock:
+            if not _warned:
+                print(f"WARNING: tiktoken encoding unavailable ({e.__class__.__name__}); "
+                      f"estimating {CHARS_PER_TOKEN:g} characters per token", file=sys.stderr)
+                _warned = True
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def chunk_units(units: Iterable[str], max_tokens: int, model: str = "gpt-4o") -> List[str]:
+    """
+    Greedily pack text units (utterances, sentences, partial outputs) into
+    chunks of at most `max_tokens`, never splitting a unit. A single unit
+    larger than the limit is split on sentence ends, then on words, and as
+    a last resort (no spaces, e.g. unpunctuated CJK text) on characters.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append(" ".join(current))
+        current, current_tokens = [], 0
+
+    for unit in units:
+        unit = unit.strip()
+        if not unit:
+            continue
+        tokens = count_tokens(unit, model) + 1  # joining space
+        if tokens > max_tokens:
+            flush()
+            pieces = split_sentences(unit)
+            if len(pieces) <= 1:
+                pieces = unit.split()
+            if len(pieces) <= 1:
+                chunks.extend(_hard_split(unit, max_tokens, model))
+            else:
+                chunks.extend(chunk_units(pieces, max_tokens, model))
+            continue
+        if current_tokens + tokens > max_tokens:
+            flush()
+        current.append(unit)
+        current_tokens += tokens
+    flush()
+    return chunks
+
+
+def _hard_split(text: str, max_tokens: int, model: str) -> List[str]:
+    """Cut text with no break points into pieces of fewer than `max_tokens` tokens."""
+    pieces = []
+    while text:
+        tokens = count_tokens(text, model)
+        if tokens < max_tokens:
+            pieces.append(text)
+            break
+        size = max(1, len(text) * (max_tokens - 1) // tokens)
+        while size > 1 and count_tokens(text[:size], model) >= max_tokens:
+            size = size * 9 // 10
+        pieces.append(text[:size])
+        text = text[size:]
+    return pieces
+
+
+def chunk_transcript(
+    transcript: str,
+    max_tokens: int,
+    model: str = "gpt-4o",
+    utterances: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Split a transcript into token-bounded chunks on utterance boundaries
+    (sentence ends if no utterances are given). Returns [transcript] when it
+    already fits.
+    """
+    if count_tokens(transcript, model) <= max_tokens:
+        return [transcript]
+    return chunk_units(utterances or split_sentences(transcript), max_tokens, model)
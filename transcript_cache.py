@@ -0,0 +1,112 @@
+"""
+On-disk cache of Deepgram transcription responses.
+
+Entries are keyed by a SHA-256 of the input media content plus every option
+that changes what comes back (model, language, diarize, VAD), so re-running
+the same file – or re-processing a job after an LLM failure – never pays for
+transcription twice. Eviction is by age and entry count (least recently used
+first), both configurable via env.
+
+Env:
+  TRANSCRIPT_CACHE_DIR          = cache directory (default: ./transcript_cache)
+  TRANSCRIPT_CACHE_MAX_ENTRIES  = max cached transcripts (default: 500)
+  TRANSCRIPT_CACHE_MAX_AGE_DAYS = drop entries older than this (default: 30)
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+
+CACHE_DIR = Path(os.getenv("TRANSCRIPT_CACHE_DIR", Path(__file__).parent / "transcript_cache"))
+MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "500"))
+MAX_AGE_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+_HASH_CHUNK = 1024 * 1024
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def fingerprint(path: Path) -> str:
+    """SHA-256 of the file content, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(audio_hash: str, **options: Any) -> str:
+    """Combine the audio fingerprint with the transcription options."""
+    payload = json.dumps({"audio": audio_hash, **options}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / f"{key}.json"
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Return the cached response for `key`, or None. Counts a hit or miss."""
+    path = _entry_path(key)
+    try:
+        age = time.time() - path.stat().st_mtime
+        if age > MAX_AGE_SECONDS:
+            path.unlink(missing_ok=True)
+            raise FileNotFoundError
+        with open(path, "r", encoding="utf-8") as f:
+            dg_json = json.load(f)
+        # Refresh mtime so eviction is least-recently-used
+        os.utime(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        with _stats_lock:
+            _stats["misses"] += 1
+        return None
+
+    with _stats_lock:
+        _stats["hits"] += 1
+    return dg_json
+
+
+def put(key: str, dg_json: Dict[str, Any]) -> None:
+    """Store a response and evict expired / excess entries."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _entry_path(key)
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dg_json, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    _evict()
+
+
+def _evict() -> None:
+    now = time.time()
+    entries = []
+    for path in CACHE_DIR.glob("*.json"):
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if now - mtime > MAX_AGE_SECONDS:
+            path.unlink(missing_ok=True)
+        else:
+            entries.append((mtime, path))
+
+    excess = len(entries) - MAX_ENTRIES
+    if excess > 0:
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+
+
+def cache_stats() -> Dict[str, int]:
+    """Hit/miss counts since process start."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,249 @@
+"""
+Local transcript normalization before prompting.
+
+Classroom transcripts carry a lot that costs prompt tokens and tells the
+tutor nodes nothing: hesitations ("um", "uh"), stutters ("the the the"),
+restarted phrases, crosstalk lines the recognizer emits twice, and
+"yeah" / "okay" back-channel replies. The transcript goes into both the 1A
+and the 1B prompt, so every token removed here is saved twice.
+
+`normalize_transcript` cleans the transcript one utterance at a time, or
+one sentence at a time when there are no utterance boundaries, using
+precompiled regexes only. It returns the cleaned text together with the
+cleaned utterances, so long-transcript chunking still splits at utterance
+ends.
+
+A word or two said twice is often correct English ("he had had enough",
+"that that is", "bye bye"), so below aggressive only phrases of 1-2 words
+said three times or more count as stutters.
+
+Levels (NORMALIZE_LEVEL, or per call):
+  off         transcript unchanged
+  light       hesitation sounds (um, uh, erm, hmm, ...), one-word stutters
+              ("the the the"), an utterance that repeats the one before it
+  standard    + comma-delimited discourse fillers ("you know,", "I mean,",
+              "like,"), two-word stutters, 3-word phrases said twice,
+              duplicates of any of the last 5 utterances (default)
+  aggressive  + any phrase of up to 6 words said twice ("the the",
+              "we will we will"), duplicates anywhere in the transcript,
+              utterances made only of back-channel words ("yeah okay",
+              "mm-hmm right")
+
+The filler lists are English. In other languages only repetitions and
+duplicate utterances are collapsed. Off-topic stretches are left alone:
+telling them apart from the lesson needs a model.
+
+Only the prompts see the normalized text; the transcript saved with the
+recording stays raw.
+
+Env:
+  NORMALIZE_LEVEL = off | light | standard | aggressive (default: standard)
+"""
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from token_utils import count_tokens, split_sentences
+
+
+NORMALIZE_LEVEL = os.getenv("NORMALIZE_LEVEL", "standard").strip().lower()
+
+
+@dataclass(frozen=True)
+class _Level:
+    discourse_fillers: bool
+    max_repeat_words: int    # longest phrase whose immediate repeats are collapsed
+    min_double_words: int    # shorter phrases are collapsed only when said 3+ times
+    dedupe_window: int       # earlier utterances a duplicate is looked for in (0 = all)
+    drop_backchannels: bool
+
+
+LEVELS: Dict[str, Optional[_Level]] = {
+    "off": None,
+    "light": _Level(discourse_fillers=False, max_repeat_words=1, min_double_words=3,
+                    dedupe_window=1, drop_backchannels=False),
+    "standard": _Level(discourse_fillers=True, max_repeat_words=3, min_double_words=3,
+                       dedupe_window=5, drop_backchannels=False),
+    "aggressive": _Level(discourse_fillers=True, max_repeat_words=6, min_double_words=1,
+                         dedupe_window=0, drop_backchannels=True),
+}
+
+# Back-channel utterances of at most this many words are dropped (aggressive)
+BACKCHANNEL_MAX_WORDS = 4
+BACKCHANNEL_WORDS = frozenset({
+    "yeah", "yes", "yep", "yup", "okay", "ok", "alright", "right", "sure", "so", "oh", "ah",
+    "cool", "fine", "good", "great", "mhm", "mm", "hmm", "huh", "um", "uh",   # mm-hmm, uh-huh
+})
+
+
+# ---------------------------------------------------------------------
+# Patterns
+# ---------------------------------------------------------------------
+# Standalone hesitation sounds (um, umm, uhm, uh, erm, er, hmm, mm, mhm, ah)
+# with the commas around them: "we will, uh, look" -> "we will look"
+_HESITATION = re.compile(
+    r"(?:,\s*)?(?<![\w'-])(?:u+h*m+|u+h+|e+r+m*|h+m+|m+h*m+|a+h+)(?![\w'-])[,…]*",
+    re.IGNORECASE,
+)
+# Discourse fillers set off by commas. Inside a sentence both commas go
+# ("the value is, you know, 5" -> "the value is 5"); at its start the
+# sentence punctuation stays
+_DISCOURSE = re.compile(
+    r"(?:(^|[.?!;])|,)\s*(?:you know|i mean|like|basically|kind of|sort of)\s*,",
+    re.IGNORECASE,
+)
+_TRAILING_TAG = re.compile(r",\s*(?:you know|i mean|right)\s*(?=[.?!]|$)", re.IGNORECASE)
+# A word starts with a letter, so repeated numbers ("1 1 2") are kept
+_WORD = r"[^\W\d_][\w'-]*"
+# Immediate repeats of an n-word phrase, applied for n = 1, 2, ... so that
+# "the the the" collapses to one word before longer phrases are tried.
+# _REPEATS[n - 1] collapses a phrase said twice or more, _STUTTERS[n - 1]
+# one said three times or more
+def _repeat_patterns(min_repeats: int) -> List[re.Pattern]:
+    return [
+        re.compile(
+            rf"(?<![\w'-])({_WORD}(?:[\s,]+{_WORD}){{{n - 1}}})"
+            rf"(?:[\s,]+\1(?![\w'-])){{{min_repeats - 1},}}",
+            re.IGNORECASE,
+        )
+        for n in range(1, max(level.max_repeat_words for level in LEVELS.values() if level) + 1)
+    ]
+
+
+_REPEATS = _repeat_patterns(2)
+_STUTTERS = _repeat_patterns(3)
+
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.?!;:])")
+_PUNCT_RUN = re.compile(r"[,;:](?:\s*[,;:])+")
+_COMMA_BEFORE_END = re.compile(r"[,;:]+\s*([.?!])")
+_LEADING_PUNCT = re.compile(r"^[\s,;:.…-]+")
+_TRAILING_COMMA = re.compile(r"[\s,;:]+$")
+_SPACES = re.compile(r"\s{2,}")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@dataclass
+class NormalizedTranscript:
+    """Outcome of `normalize_transcript`."""
+    text: str
+    utterances: Optional[List[str]]
+    level: str
+    units_before: int
+    units_after: int
+    seconds: float
+
+
+def _level(name: Optional[str]) -> str:
+    name = (name or NORMALIZE_LEVEL).strip().lower()
+    if name not in LEVELS:
+        raise ValueError(f"Unknown normalization level {name!r}; expected one of {', '.join(LEVELS)}")
+    return name
+
+
+# ---------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------
+def normalize_utterance(text: str, level: Optional[str] = None) -> str:
+    """Filler and repetition removal within one utterance."""
+    settings = LEVELS[_level(level)]
+    if settings is None:
+        return text
+    text = _HESITATION.sub("", text)
+    if settings.discourse_fillers:
+        text = _DISCOURSE.sub(lambda m: " " if m.group(1) is None else m.group(1), text)
+        text = _TRAILING_TAG.sub("", text)
+    for n in range(1, settings.max_repeat_words + 1):
+        patterns = _REPEATS if n >= settings.min_double_words else _STUTTERS
+        text = patterns[n - 1].sub(r"\1", text)
+
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _PUNCT_RUN.sub(lambda m: m.group(0)[0], text)
+    text = _COMMA_BEFORE_END.sub(r"\1", text)
+    text = _LEADING_PUNCT.sub("", text)
+    text = _TRAILING_COMMA.sub("", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _is_backchannel(key: str) -> bool:
+    words = key.split()
+    return len(words) <= BACKCHANNEL_MAX_WORDS and all(w in BACKCHANNEL_WORDS for w in words)
+
+
+def normalize_units(units: List[str], level: Optional[str] = None) -> List[str]:
+    """Normalize every utterance and drop empty, back-channel and duplicate ones."""
+    name = _level(level)
+    settings = LEVELS[name]
+    if settings is None:
+        return list(units)
+
+    kept: List[str] = []
+    recent: deque = deque(maxlen=settings.dedupe_window or None)
+    seen = set()
+    for unit in units:
+        text = normalize_utterance(unit, name)
+        # Punctuation, case and hyphens do not make an utterance different
+        key = _NON_WORD.sub(" ", text.lower()).strip()
+        if not key:
+            continue
+        if settings.drop_backchannels and _is_backchannel(key):
+            continue
+        if settings.dedupe_window:
+            if key in recent:
+                continue
+            recent.append(key)
+        else:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(text)
+    return kept
+
+
+def normalize_transcript(
+    transcript: str,
+    utterances: Optional[List[str]] = None,
+    level: Optional[str] = None,
+) -> NormalizedTranscript:
+    """
+    Normalize a transcript (see the module docstring for the levels).
+    `utterances` (the transcript's utterance texts) are cleaned one by one and
+    returned cleaned; without them the transcript is cleaned per sentence and
+    the returned `utterances` is None.
+    """
+    name = _level(level)
+    t0 = time.perf_counter()
+    units = utterances if utterances else split_sentences(transcript)
+    kept = normalize_units(units, name) if LEVELS[name] else list(units)
+    # Joined by a single space, like UtteranceIndex.full_text
+    text = " ".join(kept) if LEVELS[name] else transcript
+    return NormalizedTranscript(
+        text=text,
+        utterances=kept if utterances else None,
+        level=name,
+        units_before=len(units),
+        units_after=len(kept),
+        seconds=time.perf_counter() - t0,
+    )
+
+
+def normalization_report(
+    transcript: str,
+    result: NormalizedTranscript,
+    model: str = "gpt-4o",
+) -> Dict[str, object]:
+    """Token and utterance counts before / after normalization, for job metrics."""
+    tokens_before = count_tokens(transcript, model)
+    tokens_after = count_tokens(result.text, model) if result.text is not transcript else tokens_before
+    return {
+        "level": result.level,
+        "utterances_before": result.units_before,
+        "utterances_after": result.units_after,
+        "input_tokens_before": tokens_before,
+        "input_tokens_after": tokens_after,
+        "tokens_removed": tokens_before - tokens_after,
+        "reduction": round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+        "seconds": round(result.seconds, 3),
+    }
@@ -0,0 +1,211 @@
+"""
+Pluggable transcription backends for transcribe_audio_to_text.
+
+Every backend turns 16 kHz mono WAV audio (a file path, or an iterable of WAV
+byte chunks as produced by `_stream_wav`) into a dict shaped like Deepgram's
+prerecorded response:
+
+    {"metadata": {"duration": ..., ...},
+     "results": {"channels": [{"alternatives": [{"transcript", "confidence", "words"}]}],
+                 "utterances": [{"start", "end", "transcript", "confidence", ...}]}}
+
+so caching, stitching, VAD remapping and transcript extraction work the same
+regardless of where the audio was transcribed.
+
+Backends:
+  deepgram – Deepgram Whisper Cloud (default)
+  local    – offline CPU engine: faster-whisper (CTranslate2) running an int8
+             model; concurrent jobs share one model through its worker pool
+  fake     – simulated transcription (see simulation.py): a seeded lecture
+             transcript sized to the audio, after a simulated delay
+
+Env:
+  TRANSCRIPTION_BACKEND   = "deepgram", "local" or "fake" (default: "deepgram",
+                            "fake" with SIMULATION_MODE=1)
+  LOCAL_WHISPER_MODEL     = model size or path (default: "small")
+  LOCAL_WHISPER_COMPUTE   = CTranslate2 compute type (default: "int8")
+  LOCAL_WHISPER_THREADS   = CPU threads per transcription (default: 4)
+  LOCAL_WHISPER_WORKERS   = concurrent transcriptions per model (default: 2)
+"""
+import os
+import sys
+import math
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import simulation
+
+
+AudioSource = Union[Path, Iterable[bytes]]
+
+
+class TranscriptionBackend:
+    """Base class: transcribe WAV audio into a Deepgram-shaped dict."""
+
+    name = "base"
+    model = ""
+
+    def transcribe(self, source: AudioSource, language: str = "auto", diarize: bool = False) -> dict:
+        raise NotImplementedError
+
+
+class DeepgramBackend(TranscriptionBackend):
+    """Deepgram Whisper Cloud through the process-wide pooled client."""
+
+    name = "deepgram"
+
+    @property
+    def model(self) -> str:
+        from audio_to_transcribe_whisper import DEEPGRAM_MODEL
+        return DEEPGRAM_MODEL
+
+    def transcribe(self, source: AudioSource, language: str = "auto", diarize: bool = False) -> dict:
+        from audio_to_transcribe_whisper import _transcribe_whisper
+        return _transcribe_whisper(source, language=language, diarize=diarize)
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    Offline CPU transcription with faster-whisper (CTranslate2, int8).
+
+    The model is loaded once per process. `num_workers` lets that single
+    model serve several transcriptions concurrently from worker threads,
+    each using `cpu_threads` cores.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.model = os.getenv("LOCAL_WHISPER_MODEL", "small")
+        self.compute_type = os.getenv("LOCAL_WHISPER_COMPUTE", "int8")
+        self.cpu_threads = int(os.getenv("LOCAL_WHISPER_THREADS", "4"))
+        self.num_workers = int(os.getenv("LOCAL_WHISPER_WORKERS", "2"))
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def _get_engine(self):
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError as e:
+                    raise RuntimeError(
+                        "The local transcription backend needs faster-whisper: pip install faster-whisper"
+                    ) from e
+                self._engine = WhisperModel(
+                    self.model,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.num_workers,
+                )
+            return self._engine
+
+    def transcribe(self, source: AudioSource, language: str = "auto", diarize: bool = False) -> dict:
+        if diarize:
+            print("WARNING: local backend does not support diarization; speaker labels omitted",
+                  file=sys.stderr)
+        engine = self._get_engine()
+        lang = None if not language or language.lower() == "auto" else language
+
+        if isinstance(source, Path):
+            print(f"Transcribing {source.name} locally with model={self.model} ({self.compute_type}) …")
+            return self._run(engine, str(source), lang)
+
+        # The engine decodes from a file; spool the WAV stream to a temp file
+        with tempfile.NamedTemporaryFile(suffix=".wav") as tmp:
+            for chunk in source:
+                tmp.write(chunk)
+            tmp.flush()
+            print(f"Transcribing ffmpeg stream locally with model={self.model} ({self.compute_type}) …")
+            return self._run(engine, tmp.name, lang)
+
+    def _run(self, engine, path: str, language: Optional[str]) -> dict:
+        segments, info = engine.transcribe(path, language=language, vad_filter=False)
+        utterances = []
+        confidences = []
+        for i, seg in enumerate(segments):
+            text = seg.text.strip()
+            if not text:
+                continue
+            confidence = math.exp(seg.avg_logprob)
+            confidences.append(confidence)
+            utterances.append({
+                "id": str(i),
+                "start": seg.start,
+                "end": seg.end,
+                "confidence": confidence,
+                "channel": 0,
+                "transcript": text,
+                "words": [],
+            })
+
+        return {
+            "metadata": {
+                "duration": info.duration,
+                "channels": 1,
+                "backend": self.name,
+                "model": self.model,
+                "language": info.language,
+            },
+            "results": {
+                "channels": [{
+                    "alternatives": [{
+                        "transcript": " ".join(u["transcript"] for u in utterances),
+                        "confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+                        "words": [],
+                    }],
+                }],
+                "utterances": utterances,
+            },
+        }
+
+
+class FakeBackend(TranscriptionBackend):
+    """Simulated transcription for offline runs and load tests (simulation.py)."""
+
+    name = "fake"
+    model = "simulated"
+
+    # 16 kHz mono 16-bit PCM after a 44-byte WAV header
+    BYTES_PER_SECOND = 32000
+    WAV_HEADER_BYTES = 44
+
+    def transcribe(self, source: AudioSource, language: str = "auto", diarize: bool = False) -> dict:
+        if isinstance(source, Path):
+            size = source.stat().st_size
+            name = source.name
+        else:
+            # Drain the stream like a real upload would, so ffmpeg runs to the end
+            size = sum(len(chunk) for chunk in source)
+            name = "ffmpeg stream"
+        duration = max(0.0, size - self.WAV_HEADER_BYTES) / self.BYTES_PER_SECOND
+        print(f"Transcribing {name} with the simulated backend ({duration:.1f}s of audio) …")
+        return simulation.simulated_transcription(duration, seed=name)
+
+
+_BACKENDS = {
+    "deepgram": DeepgramBackend,
+    "local": LocalWhisperBackend,
+    "fake": FakeBackend,
+}
+_instances: dict = {}
+_instances_lock = threading.Lock()
+
+
+def register_backend(name: str, cls: type) -> None:
+    """Make another TranscriptionBackend subclass selectable by name."""
+    _BACKENDS[name] = cls
+
+
+def get_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """Return the process-wide instance of the named (or configured) backend."""
+    name = (name or os.getenv("TRANSCRIPTION_BACKEND") or ("fake" if simulation.ENABLED else "deepgram")).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name} (choose from {', '.join(_BACKENDS)})")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = _BACKENDS[name]()
+        return _instances[name]
@@ -0,0 +1,193 @@
+"""
+Structured outputs of the tutor nodes 1A (notes) and 1B (misconceptions).
+
+Both nodes answer with JSON validated against these Pydantic models. The
+provider enforces the schema: OpenAI through a strict json_schema
+response_format, Gemini through response_json_schema (see
+`response_format_kwargs`). Markdown for the combined output is rendered
+from the structured data (`render_notes`, `render_misconceptions`); while a
+node is still streaming its JSON, `render_partial` turns the part received
+so far into a markdown preview.
+
+Downstream nodes do not need the full notes. They get compact digests
+instead: the concept list and formulas (`concepts_digest`) and the
+misconception titles with their corrections (`misconceptions_digest`).
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional, Type, get_args, get_origin
+
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic_core import from_json
+
+
+# OpenAI strict mode needs every field required and no extra properties
+class _Strict(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+# ---------------------------------------------------------------------
+# Node 1A – notes
+# ---------------------------------------------------------------------
+class NotesSection(_Strict):
+    title: str = Field(description="Section title, in the order the topic was taught")
+    points: List[str] = Field(description="Information-dense bullet points")
+
+
+class GlossaryTerm(_Strict):
+    term: str
+    definition: str = Field(description="Short definition")
+
+
+class Formula(_Strict):
+    formula: str
+    explanation: str = Field(description="What it means and when to use it")
+
+
+class ClassExample(_Strict):
+    example: str = Field(description="Short description of the example")
+    shows: str = Field(description="Where it appears / what it shows")
+
+
+class ClassNotes(_Strict):
+    summary: str = Field(description="Summary of the session, 1-3 short paragraphs")
+    key_concepts: List[str] = Field(description="Main concepts taught, one short phrase each, in teaching order")
+    sections: List[NotesSection] = Field(description="Section-wise notes")
+    glossary: List[GlossaryTerm] = Field(description="Important terms")
+    formulas: List[Formula] = Field(description="Formulas used in class; empty if there are none")
+    examples: List[ClassExample] = Field(description="Examples discussed in class")
+
+
+# ---------------------------------------------------------------------
+# Node 1B – misconceptions
+# ---------------------------------------------------------------------
+class Misconception(_Strict):
+    title: str = Field(description="The misconception, stated as the student would believe it")
+    why_students_think_this: str
+    why_wrong: str
+    correction: str = Field(description="The correct explanation, stated clearly")
+
+
+class MisconceptionList(_Strict):
+    misconceptions: List[Misconception] = Field(description="Most important first")
+
+
+# ---------------------------------------------------------------------
+# Provider request parameters
+# ---------------------------------------------------------------------
+def response_format_kwargs(provider: str, schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Call kwargs that make `provider` answer with JSON matching `schema`."""
+    if provider == "openai":
+        return {"response_format": openai_response_format(schema)}
+    if provider == "gemini":
+        return {"response_mime_type": "application/json", "response_json_schema": schema.model_json_schema()}
+    raise ValueError("provider must be 'openai' or 'gemini'")
+
+
+def openai_response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Chat-completions response_format (also used in Batch API request bodies)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema(), "strict": True},
+    }
+
+
+def schema_fingerprint(schema: Optional[Type[BaseModel]]) -> str:
+    """Stable text of a schema, part of the llm_cache key of structured calls."""
+    if schema is None:
+        return ""
+    return json.dumps(schema.model_json_schema(), sort_keys=True)
+
+
+# ---------------------------------------------------------------------
+# Markdown rendering
+# ---------------------------------------------------------------------
+def _bullets(items: List[str]) -> str:
+    return "\n".join(f"- {item}" for item in items) or "- (none)"
+
+
+def render_notes(notes: Dict[str, Any], partial: bool = False) -> str:
+    """Markdown of the notes; with `partial`, only the fields present in `notes` (see render_partial)."""
+    n = ClassNotes.model_validate(_completed(ClassNotes, notes) if partial else notes)
+    sections = "\n\n".join(
+        f"## Section {i}: {s.title}\n{_bullets(s.points)}" for i, s in enumerate(n.sections, start=1)
+    )
+    blocks = [
+        ("summary", f"# Summary\n{n.summary}"),
+        ("key_concepts", f"# Key Concepts\n{_bullets(n.key_concepts)}"),
+        ("sections", f"# Section-wise Notes\n{sections}"),
+        ("glossary", f"# Glossary\n{_bullets([f'{t.term}: {t.definition}' for t in n.glossary])}"),
+        ("formulas", f"# Formulas\n{_bullets([f'{f.formula}: {f.explanation}' for f in n.formulas])}"),
+        ("examples", f"# Example Index\n{_bullets([f'{e.example}: {e.shows}' for e in n.examples])}"),
+    ]
+    return "\n\n".join(block for field, block in blocks if not partial or field in notes)
+
+
+def render_misconceptions(misconceptions: Dict[str, Any], partial: bool = False) -> str:
+    if partial:
+        misconceptions = _completed(MisconceptionList, misconceptions)
+    items = MisconceptionList.model_validate(misconceptions).misconceptions
+    return "\n\n".join(
+        f"## Misconception {i}: {m.title}\n"
+        f"- Why students think this: {m.why_students_think_this}\n"
+        f"- Why it’s wrong: {m.why_wrong}\n"
+        f"- Correct explanation: {m.correction}"
+        for i, m in enumerate(items, start=1)
+    )
+
+
+# Renderers by schema, for previews of streamed JSON
+RENDERERS: Dict[Type[BaseModel], Callable[..., str]] = {
+    ClassNotes: render_notes,
+    MisconceptionList: render_misconceptions,
+}
+
+
+def render_partial(schema: Type[BaseModel], text: str) -> Optional[str]:
+    """
+    Markdown preview of an incomplete JSON answer for `schema`: the fields
+    received so far, the last string cut where the stream is. None if there
+    is nothing to show yet (or the text is not JSON).
+    """
+    render = RENDERERS.get(schema)
+    if render is None:
+        return None
+    try:
+        data = from_json(text, allow_partial="trailing-strings")
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not data:
+        return None
+    return render(data, partial=True)
+
+
+def _completed(schema: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """`data` with the fields a partial answer has not reached yet filled with empty values."""
+    out: Dict[str, Any] = {}
+    for name, field in schema.model_fields.items():
+        value = data.get(name)
+        if get_origin(field.annotation) is list:
+            (item,) = get_args(field.annotation)
+            items = value if isinstance(value, list) else []
+            if isinstance(item, type) and issubclass(item, BaseModel):
+                out[name] = [_completed(item, v) for v in items if isinstance(v, dict)]
+            else:
+                out[name] = [v for v in items if isinstance(v, str)]
+        else:
+            out[name] = value if isinstance(value, str) else ""
+    return out
+
+
+# ---------------------------------------------------------------------
+# Compact inputs for downstream nodes
+# ---------------------------------------------------------------------
+def concepts_digest(notes: Dict[str, Any]) -> str:
+    n = ClassNotes.model_validate(notes)
+    digest = f"Key concepts:\n{_bullets(n.key_concepts)}"
+    if n.formulas:
+        digest += f"\n\nFormulas:\n{_bullets([f'{f.formula}: {f.explanation}' for f in n.formulas])}"
+    return digest
+
+
+def misconceptions_digest(misconceptions: Dict[str, Any]) -> str:
+    items = MisconceptionList.model_validate(misconceptions).misconceptions
+    return _bullets([f"{m.title} -> {m.correction}" for m in items])
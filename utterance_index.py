@@ -0,0 +1,204 @@
+"""
+Compact, array-backed utterance index for transcripts.
+
+Instead of keeping (and re-walking) the full nested Deepgram response, a
+recording's utterances are stored as parallel numpy arrays plus one
+concatenated text string:
+
+    starts, ends   float64 seconds per utterance
+    speakers       int32 speaker id per utterance (-1 when not diarized)
+    offsets        int64 character offsets into `text`; utterance i is
+                   text[offsets[i]:offsets[i + 1] - 1] (utterances are joined
+                   by a single space, so `text` is the full transcript)
+
+The index is saved next to the Deepgram JSON as `<name>.utt.npz` and loads in
+a fraction of the time it takes to parse the JSON. Time-range lookups use
+binary search.
+"""
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+INDEX_SUFFIX = ".utt.npz"
+
+
+class UtteranceIndex:
+    __slots__ = ("starts", "ends", "speakers", "offsets", "text", "_max_ends")
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        speakers: np.ndarray,
+        offsets: np.ndarray,
+        text: str,
+    ):
+        self.starts = starts
+        self.ends = ends
+        self.speakers = speakers
+        self.offsets = offsets
+        self.text = text
+        # Running max of end times: monotone even if utterances overlap,
+        # so the first utterance ending after t can be found by bisection
+        self._max_ends = np.maximum.accumulate(ends) if len(ends) else ends
+
+    # -----------------------------------------------------------------
+    # Builders / loaders
+    # -----------------------------------------------------------------
+    @classmethod
+    def from_utterances(cls, utterances: list[dict]) -> "UtteranceIndex":
+        """Build from Deepgram-style utterance dicts ({start, end, transcript[, speaker]})."""
+        texts, starts, ends, speakers = [], [], [], []
+        for u in utterances:
+            text = (u.get("transcript") or "").strip()
+            if not text:
+                continue
+            texts.append(text)
+            starts.append(float(u.get("start") or 0.0))
+            ends.append(float(u.get("end") or 0.0))
+            spk = u.get("speaker")
+            speakers.append(int(spk) if isinstance(spk, (int, float)) else -1)
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        if texts:
+            # +1 for the joining space after every utterance
+            np.cumsum([len(t) + 1 for t in texts], out=offsets[1:])
+        return cls(
+            np.asarray(starts, dtype=np.float64),
+            np.asarray(ends, dtype=np.float64),
+            np.asarray(speakers, dtype=np.int32),
+            offsets,
+            " ".join(texts),
+        )
+
+    @classmethod
+    def from_deepgram(cls, dg_json: dict) -> "UtteranceIndex":
+        """
+        Build from a Deepgram-shaped response. Prefers utterances; falls back
+        to the first channel/alternative transcript as a single utterance.
+        """
+        results = dg_json.get("results", {})
+        utterances = results.get("utterances", [])
+        if isinstance(utterances, list) and utterances:
+            index = cls.from_utterances(utterances)
+            if len(index):
+                return index
+
+        channels = results.get("channels", [])
+        if isinstance(channels, list) and channels:
+            alts = channels[0].get("alternatives", [])
+            if isinstance(alts, list) and alts:
+                duration = float(dg_json.get("metadata", {}).get("duration") or 0.0)
+                return cls.from_utterances([
+                    {"start": 0.0, "end": duration, "transcript": alts[0].get("transcript")}
+                ])
+        return cls.from_utterances([])
+
+    @classmethod
+    def load(cls, path: Path) -> "UtteranceIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["starts"],
+                data["ends"],
+                data["speakers"],
+                data["offsets"],
+                data["text"].tobytes().decode("utf-8"),
+            )
+
+    def save(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                starts=self.starts,
+                ends=self.ends,
+                speakers=self.speakers,
+                offsets=self.offsets,
+                text=np.frombuffer(self.text.encode("utf-8"), dtype=np.uint8),
+            )
+        return path
+
+    # -----------------------------------------------------------------
+    # Access
+    # -----------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def full_text(self) -> str:
+        return self.text
+
+    def utterance_text(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def utterance(self, i: int) -> dict:
+        out = {
+            "start": float(self.starts[i]),
+            "end": float(self.ends[i]),
+            "transcript": self.utterance_text(i),
+        }
+        if self.speakers[i] >= 0:
+            out["speaker"] = int(self.speakers[i])
+        return out
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self.utterance(i)
+
+    def texts(self) -> list[str]:
+        """Every utterance's text, in order."""
+        return [self.utterance_text(i) for i in range(len(self))]
+
+    def range(self, t0: float, t1: float) -> tuple[int, int]:
+        """Index bounds [i0, i1) of utterances overlapping the time range [t0, t1)."""
+        i0 = int(np.searchsorted(self._max_ends, t0, side="right"))
+        i1 = int(np.searchsorted(self.starts, t1, side="left"))
+        return i0, max(i0, i1)
+
+    def slice(self, t0: float, t1: float) -> "UtteranceIndex":
+        """Sub-index of utterances overlapping [t0, t1)."""
+        i0, i1 = self.range(t0, t1)
+        base = self.offsets[i0]
+        return UtteranceIndex(
+            self.starts[i0:i1],
+            self.ends[i0:i1],
+            self.speakers[i0:i1],
+            self.offsets[i0:i1 + 1] - base,
+            self.text[base:max(base, self.offsets[i1] - 1)],
+        )
+
+    def text_between(self, t0: float, t1: float) -> str:
+        """Transcript text of utterances overlapping [t0, t1)."""
+        i0, i1 = self.range(t0, t1)
+        if i0 == i1:
+            return ""
+        return self.text[self.offsets[i0]:self.offsets[i1] - 1]
+
+    def at(self, t: float) -> Optional[int]:
+        """Index of the utterance playing at time t, or None."""
+        i = int(np.searchsorted(self.starts, t, side="right")) - 1
+        if i >= 0 and self.ends[i] >= t:
+            return i
+        return None
+
+
+def index_path_for(json_path: Path) -> Path:
+    """`lecture.deepgram.json` -> `lecture.deepgram.utt.npz`"""
+    return json_path.with_suffix(INDEX_SUFFIX)
+
+
+def load_transcript_index(json_path: Path) -> UtteranceIndex:
+    """
+    Load the compact index saved next to a Deepgram JSON file, building (and
+    saving) it from the JSON once if it does not exist yet.
+    """
+    idx_path = index_path_for(json_path)
+    if idx_path.exists():
+        return UtteranceIndex.load(idx_path)
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        index = UtteranceIndex.from_deepgram(json.load(f))
+    index.save(idx_path)
+    return index
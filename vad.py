@@ -0,0 +1,202 @@
+"""
+Local voice-activity detection (VAD) for class recordings.
+
+Drops long stretches of dead air (group work, breaks, a recorder left running)
+from a 16 kHz mono PCM WAV before it is uploaded for transcription, and keeps
+an offset map so timestamps in the transcript of the trimmed audio can be
+mapped back to the original file.
+
+The detector is a vectorized short-time energy + zero-crossing-rate classifier
+computed with numpy over fixed-size frames. Audio is processed in blocks, so
+memory use does not grow with recording length.
+"""
+import wave
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+
+FRAME_MS = 30               # analysis frame length
+BLOCK_FRAMES = 2000         # frames read per block (~1 min at 30 ms)
+NOISE_PERCENTILE = 10       # frame-energy percentile used as the noise floor
+ENERGY_MARGIN_DB = 10.0     # voiced speech must be this far above the floor
+MIN_ENERGY_DBFS = -55.0     # never treat anything quieter than this as speech
+UNVOICED_ZCR = 0.25         # fricatives: high zero-crossing rate ...
+UNVOICED_MARGIN_DB = 5.0    # ... at a lower energy margin than voiced speech
+MIN_SILENCE_SECONDS = 2.0   # only cut non-speech spans longer than this
+PAD_SECONDS = 0.3           # audio kept on each side of a cut
+
+
+@dataclass
+class VadResult:
+    """Outcome of `trim_silence`."""
+    wav_path: Path
+    original_seconds: float
+    kept_seconds: float
+    # (original_start, original_end, trimmed_start) for every kept span
+    offset_map: list[tuple[float, float, float]] = field(default_factory=list)
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.original_seconds - self.kept_seconds
+
+
+def _frame_features(pcm: np.ndarray, frame_len: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return per-frame (energy in dBFS, zero-crossing rate) for int16 samples."""
+    n = len(pcm) // frame_len
+    frames = pcm[: n * frame_len].reshape(n, frame_len).astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+
+def detect_speech(wav_path: Path) -> tuple[np.ndarray, float, int]:
+    """
+    Classify every FRAME_MS frame of a mono s16le WAV as speech or not.
+
+    Returns (speech_mask, frame_seconds, total_samples).
+    """
+    with wave.open(str(wav_path), "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"VAD expects mono 16-bit PCM WAV: {wav_path}")
+        sr = wf.getframerate()
+        total = wf.getnframes()
+        frame_len = max(2, sr * FRAME_MS // 1000)
+
+        energies, zcrs = [], []
+        while True:
+            raw = wf.readframes(frame_len * BLOCK_FRAMES)
+            if not raw:
+                break
+            e, z = _frame_features(np.frombuffer(raw, dtype="<i2"), frame_len)
+            energies.append(e)
+            zcrs.append(z)
+
+    if not energies:
+        return np.zeros(0, dtype=bool), frame_len / sr, total
+
+    energy_db = np.concatenate(energies)
+    zcr = np.concatenate(zcrs)
+    floor = np.percentile(energy_db, NOISE_PERCENTILE)
+    voiced = energy_db > max(floor + ENERGY_MARGIN_DB, MIN_ENERGY_DBFS)
+    unvoiced = (zcr > UNVOICED_ZCR) & (energy_db > max(floor + UNVOICED_MARGIN_DB, MIN_ENERGY_DBFS))
+    return voiced | unvoiced, frame_len / sr, total
+
+
+def _keep_spans(
+    speech: np.ndarray,
+    frame_s: float,
+    duration: float,
+    min_silence: float,
+    pad: float,
+) -> list[tuple[float, float]]:
+    """Turn a frame mask into (start, end) seconds to keep, cutting long non-speech runs."""
+    # Boundaries of runs of identical values in the mask
+    change = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [len(speech)]))
+
+    cuts = []
+    for s, e in zip(starts, ends):
+        if speech[s]:
+            continue
+        t0, t1 = s * frame_s, e * frame_s
+        # Leading/trailing silence has nothing to pad against on one side
+        lo = t0 + pad if s > 0 else 0.0
+        hi = t1 - pad if e < len(speech) else duration
+        if t1 - t0 >= min_silence and hi > lo:
+            cuts.append((lo, hi))
+
+    keep = []
+    cursor = 0.0
+    for lo, hi in cuts:
+        if lo > cursor:
+            keep.append((cursor, lo))
+        cursor = hi
+    if cursor < duration:
+        keep.append((cursor, duration))
+    return keep
+
+
+def trim_silence(
+    wav_path: Path,
+    out_path: Path,
+    min_silence: float = MIN_SILENCE_SECONDS,
+    pad: float = PAD_SECONDS,
+) -> VadResult:
+    """
+    Write `out_path` containing only the speech parts of `wav_path`.
+
+    Non-speech spans longer than `min_silence` seconds are removed, keeping
+    `pad` seconds on either side. If no speech is detected at all the input
+    is returned untouched rather than producing an empty file.
+    """
+    speech, frame_s, total = detect_speech(wav_path)
+    with wave.open(str(wav_path), "rb") as wf:
+        sr = wf.getframerate()
+        duration = total / sr
+        if not speech.any():
+            return VadResult(wav_path, duration, duration, [(0.0, duration, 0.0)])
+
+        spans = _keep_spans(speech, frame_s, duration, min_silence, pad)
+        offset_map = []
+        kept = 0.0
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with wave.open(str(out_path), "wb") as out:
+            out.setparams(wf.getparams())
+            for start, end in spans:
+                first, last = int(start * sr), min(int(end * sr), total)
+                offset_map.append((first / sr, last / sr, kept))
+                wf.setpos(first)
+                remaining = last - first
+                while remaining > 0:
+                    n = min(remaining, sr * 60)
+                    out.writeframes(wf.readframes(n))
+                    remaining -= n
+                kept += (last - first) / sr
+
+    return VadResult(out_path, duration, kept, offset_map)
+
+
+def _map_time(t: float, offset_map: list[tuple[float, float, float]], trimmed_starts: list[float]) -> float:
+    i = max(0, bisect_right(trimmed_starts, t) - 1)
+    orig_start, orig_end, trimmed_start = offset_map[i]
+    return min(orig_start + (t - trimmed_start), orig_end)
+
+
+def to_original_time(t: float, offset_map: list[tuple[float, float, float]]) -> float:
+    """Map a timestamp in the trimmed audio back to the original file."""
+    if not offset_map:
+        return t
+    return _map_time(t, offset_map, [m[2] for m in offset_map])
+
+
+def restore_timestamps(dg_json: dict, offset_map: list[tuple[float, float, float]]) -> dict:
+    """
+    Rewrite start/end of every utterance and word in a Deepgram-shaped
+    response (in place) so they refer to the original, untrimmed audio.
+    """
+    if not offset_map:
+        return dg_json
+    trimmed_starts = [m[2] for m in offset_map]
+
+    def remap(item: dict) -> None:
+        for k in ("start", "end"):
+            t = item.get(k)
+            if isinstance(t, (int, float)):
+                item[k] = _map_time(t, offset_map, trimmed_starts)
+        for w in item.get("words") or []:
+            remap(w)
+
+    results = dg_json.get("results", {})
+    for u in results.get("utterances") or []:
+        remap(u)
+    for ch in results.get("channels") or []:
+        for alt in ch.get("alternatives") or []:
+            for w in alt.get("words") or []:
+                remap(w)
+    return dg_json
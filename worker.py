@@ -4,10 +4,15 @@ Background worker for processing audio files
 import threading
 import traceback
 from pathlib import Path
-from typing import Dict, Any
-from audio_to_transcribe_whisper import transcribe_audio_to_text
-from class_test_graph import run_tutor_pipeline
-from database import update_combined_md
+from typing import Dict, Any, List, Optional
+from audio_to_transcribe_whisper import MediaInfo, transcribe_audio_to_text
+import deferred_jobs
+from class_test_graph import run_tutor_pipeline, regenerate_sections, initial_state, combine_tutor_outputs
+from database import update_combined_md, update_final_state, update_status, update_transcript
+from job_metrics import new_metrics, collect_metrics, record_transcript_normalization, snapshot
+from node_streams import NodeStreamBuffer, stream_to
+from transcript_normalizer import normalize_transcript, normalization_report
+from utterance_index import load_transcript_index
 
 
 # In-memory job storage
@@ -18,21 +23,141 @@ job_lock = threading.Lock()
 def get_job_status(job_id: str) -> Dict[str, Any]:
     """Get the current status of a job."""
     with job_lock:
-        return jobs.get(job_id, {"status": "not_found"})
+        job = jobs.get(job_id)
+        if job is None:
+            return {"status": "not_found"}
+        # Nodes may still be recording into the live metrics dict / output buffer
+        buffer = job.get("node_outputs")
+        return {
+            **job,
+            "metrics": snapshot(job.get("metrics")),
+            "node_outputs": buffer.snapshot() if buffer is not None else None,
+        }
+
+
+def _fail_job(job_id: str, e: Exception):
+    """Record a job failure with its traceback."""
+    error_msg = f"Error processing job: {str(e)}"
+    error_trace = traceback.format_exc()
+    
+    with job_lock:
+        jobs[job_id]["status"] = "failed"
+        jobs[job_id]["error"] = error_msg
+        jobs[job_id]["error_trace"] = error_trace
+    
+    print(f"Job {job_id} failed:")
+    print(error_trace)
+
+
+def _normalize_transcript(transcript: str, utterances: Optional[List[str]]):
+    """
+    Strip filler and repetitions before prompting (transcript_normalizer) and
+    record the token reduction in the current job's metrics.
+    """
+    result = normalize_transcript(transcript, utterances)
+    report = normalization_report(transcript, result)
+    record_transcript_normalization(report)
+    print(f"Transcript normalized ({report['level']}): {report['input_tokens_before']} -> "
+          f"{report['input_tokens_after']} tokens ({report['reduction']:.1%} less) in {report['seconds']}s")
+    return result.text, result.utterances
+
+
+def _run_tutor_step(
+    job_id: str,
+    transcript: str,
+    student_level: str,
+    student_goal: str,
+    utterances: Optional[List[str]] = None,
+    sections: Optional[List[str]] = None
+):
+    """Run the tutor pipeline on a finished transcript and store the result."""
+    metrics, node_outputs = _track_outputs(job_id, "Generating study materials...")
+    
+    # LLM calls, tokens and cache hits inside the graph land in `metrics`;
+    # streamed completions land in `node_outputs` as they are generated
+    with collect_metrics(metrics), stream_to(node_outputs):
+        transcript, utterances = _normalize_transcript(transcript, utterances)
+        result = run_tutor_pipeline(
+            transcript=transcript,
+            student_level=student_level,
+            student_goal=student_goal,
+            utterances=utterances,
+            sections=sections,
+        )
+    
+    _save_result(job_id, result["combined_markdown"], result["final_state"])
+
+
+def _track_outputs(job_id: str, progress: str):
+    """Fresh metrics and node output buffer for a job about to run tutor nodes."""
+    metrics = new_metrics()
+    node_outputs = NodeStreamBuffer()
+    with job_lock:
+        jobs[job_id]["progress"] = progress
+        jobs[job_id]["metrics"] = metrics
+        jobs[job_id]["node_outputs"] = node_outputs
+    return metrics, node_outputs
+
+
+def _defer_tutor_step(
+    job_id: str,
+    transcript: str,
+    student_level: str,
+    student_goal: str,
+    utterances: Optional[List[str]] = None,
+    sections: Optional[List[str]] = None
+):
+    """Queue the tutor pipeline for the Batch API (see deferred_jobs); returns immediately."""
+    metrics = new_metrics()
+    with job_lock:
+        jobs[job_id]["status"] = "deferred"
+        jobs[job_id]["progress"] = "Queued for the next batch"
+        jobs[job_id]["metrics"] = metrics
+
+    with collect_metrics(metrics):
+        transcript, utterances = _normalize_transcript(transcript, utterances)
+    deferred_jobs.enqueue(
+        job_id,
+        initial_state(transcript, student_level, student_goal, utterances),
+        metrics,
+        on_complete=lambda state: _save_result(job_id, combine_tutor_outputs(state)[0], state),
+        on_error=lambda e: _fail_job(job_id, e),
+        on_progress=lambda progress: update_live_progress(job_id, progress),
+        sections=sections,
+    )
+
+
+def _save_result(job_id: str, combined_md: str, final_state: Optional[Dict[str, Any]] = None):
+    with job_lock:
+        jobs[job_id]["progress"] = "Saving results..."
+    
+    update_combined_md(job_id, combined_md)
+    # Inputs and node outputs, so sections can be regenerated without a re-run
+    if final_state is not None:
+        update_final_state(job_id, final_state)
+    
+    with job_lock:
+        jobs[job_id]["status"] = "completed"
+        jobs[job_id]["progress"] = "Processing complete"
+        jobs[job_id]["result"] = combined_md
 
 
 def process_audio_job(
     job_id: str,
     audio_path: str,
     student_level: str = "college",
-    student_goal: str = "score well in final exam and actually understand the concepts"
+    student_goal: str = "score well in final exam and actually understand the concepts",
+    media_info: Optional[MediaInfo] = None,
+    deferred: bool = False,
+    sections: Optional[List[str]] = None
 ):
     """
     Process an audio file through the complete pipeline.
     
     Steps:
     1. Transcribe audio using Whisper
-    2. Run tutor pipeline to generate notes
+    2. Run tutor pipeline to generate notes (deferred jobs: queue it for
+       the Batch API, which finishes steps 3-4 later)
     3. Update database with results
     4. Update job status
     """
@@ -49,60 +174,103 @@ def process_audio_job(
         with job_lock:
             jobs[job_id]["progress"] = "Transcribing audio..."
         
-        out_wav = audio_file.with_suffix(".converted.wav")
         save_json = audio_file.with_suffix(".deepgram.json")
         
+        # Stream ffmpeg output into the upload: no temp WAV, bounded memory
         transcript = transcribe_audio_to_text(
             str(audio_file),
-            out_wav=str(out_wav),
+            out_wav=None,
             save_json=str(save_json),
             language="auto",
             diarize=False,
+            stream=True,
+            media_info=media_info,
         )
         
-        # Step 2: Run tutor pipeline
-        with job_lock:
-            jobs[job_id]["progress"] = "Generating study materials..."
+        update_transcript(job_id, transcript)
         
-        result = run_tutor_pipeline(
-            transcript=transcript,
-            student_level=student_level,
-            student_goal=student_goal,
-        )
+        # Utterance boundaries let long transcripts be chunked cleanly
+        utterances = load_transcript_index(save_json).texts()
         
-        combined_md = result["combined_markdown"]
+        # Steps 2-4: Run tutor pipeline, save and mark completed
+        if deferred:
+            _defer_tutor_step(job_id, transcript, student_level, student_goal, utterances, sections)
+        else:
+            _run_tutor_step(job_id, transcript, student_level, student_goal, utterances, sections)
         
-        # Step 3: Update database
+    except Exception as e:
+        _fail_job(job_id, e)
+
+
+def process_transcript_job(
+    job_id: str,
+    transcript: str,
+    student_level: str = "college",
+    student_goal: str = "score well in final exam and actually understand the concepts",
+    utterances: Optional[List[str]] = None
+):
+    """
+    Run only the tutor pipeline for a job whose transcript already exists
+    (e.g. a finished live stream), skipping upload and batch transcription.
+    """
+    try:
         with job_lock:
-            jobs[job_id]["progress"] = "Saving results..."
+            jobs[job_id]["status"] = "processing"
         
-        update_combined_md(job_id, combined_md)
+        _run_tutor_step(job_id, transcript, student_level, student_goal, utterances)
         
-        # Step 4: Update job status to completed
+    except Exception as e:
+        _fail_job(job_id, e)
+
+
+def process_regenerate_job(job_id: str, state: Dict[str, Any], sections: List[str]):
+    """
+    Re-run `sections` (and the sections built on them) of a finished job
+    from its stored final state, then store the new combined output.
+    The recording was claimed with database.claim_for_regeneration; its
+    stored status is released when the job ends. A failed regeneration
+    leaves the previous result in place: the job goes back to "completed"
+    and the error is only reported through /status.
+    """
+    try:
         with job_lock:
-            jobs[job_id]["status"] = "completed"
-            jobs[job_id]["progress"] = "Processing complete"
-            jobs[job_id]["result"] = combined_md
+            jobs[job_id]["status"] = "processing"
         
-    except Exception as e:
-        # Handle errors
-        error_msg = f"Error processing job: {str(e)}"
-        error_trace = traceback.format_exc()
+        metrics, node_outputs = _track_outputs(job_id, f"Regenerating {', '.join(sections)}...")
+        with collect_metrics(metrics), stream_to(node_outputs):
+            result = regenerate_sections(state, sections)
         
-        with job_lock:
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = error_msg
-            jobs[job_id]["error_trace"] = error_trace
+        _save_result(job_id, result["combined_markdown"], result["final_state"])
+        update_status(job_id, "completed")
         
-        print(f"Job {job_id} failed:")
-        print(error_trace)
+    except Exception as e:
+        _fail_job(job_id, e)
+        with job_lock:
+            jobs[job_id]["status"] = "completed"
+            jobs[job_id]["progress"] = "Regeneration failed; previous result kept"
+        update_status(job_id, "completed")
+
+
+def _new_job(job_id: str, status: str = "pending", progress: str = "Job queued"):
+    with job_lock:
+        jobs[job_id] = {
+            "status": status,
+            "progress": progress,
+            "error": None,
+            "result": None,
+            "metrics": None,
+            "node_outputs": None
+        }
 
 
 def start_job(
     job_id: str,
     audio_path: str,
     student_level: str = "college",
-    student_goal: str = "score well in final exam and actually understand the concepts"
+    student_goal: str = "score well in final exam and actually understand the concepts",
+    media_info: Optional[MediaInfo] = None,
+    deferred: bool = False,
+    sections: Optional[List[str]] = None
 ):
     """
     Start a background job to process an audio file.
@@ -112,20 +280,90 @@ def start_job(
         audio_path: Path to the audio file
         student_level: Student level (default: "college")
         student_goal: Student's goal (default: exam preparation)
+        media_info: Probe result from upload time, so the worker does not re-probe
+        deferred: Generate study materials through the Batch API (cheaper, slower)
+        sections: Output sections to generate (class_test_graph.SECTIONS; None = all)
     """
     # Initialize job status
-    with job_lock:
-        jobs[job_id] = {
-            "status": "pending",
-            "progress": "Job queued",
-            "error": None,
-            "result": None
-        }
+    _new_job(job_id)
     
     # Start processing in a background thread
     thread = threading.Thread(
         target=process_audio_job,
-        args=(job_id, audio_path, student_level, student_goal),
+        args=(job_id, audio_path, student_level, student_goal, media_info, deferred, sections),
+        daemon=True
+    )
+    thread.start()
+
+
+def start_live_job(job_id: str):
+    """Register a job whose audio is still streaming in."""
+    _new_job(job_id, status="live", progress="Receiving live audio...")
+
+
+def fail_live_job(job_id: str, error: str):
+    """Record the failure of a live job that ended before the tutor pipeline could start."""
+    with job_lock:
+        if job_id in jobs:
+            jobs[job_id]["status"] = "failed"
+            jobs[job_id]["error"] = error
+    print(f"Live job {job_id} failed: {error}")
+
+
+def update_live_progress(job_id: str, progress: str):
+    with job_lock:
+        if job_id in jobs:
+            jobs[job_id]["progress"] = progress
+
+
+def start_transcript_job(
+    job_id: str,
+    transcript: str,
+    student_level: str = "college",
+    student_goal: str = "score well in final exam and actually understand the concepts",
+    utterances: Optional[List[str]] = None
+):
+    """
+    Start a background job that runs the tutor pipeline on an existing transcript.
+    
+    Args:
+        job_id: Unique identifier for the job (may already exist, e.g. a live job)
+        transcript: Complete transcript text
+        student_level: Student level (default: "college")
+        student_goal: Student's goal (default: exam preparation)
+        utterances: Utterance texts of the transcript (chunk boundaries for long transcripts)
+    """
+    with job_lock:
+        job = jobs.setdefault(job_id, {"error": None, "result": None})
+        job["status"] = "pending"
+        job["progress"] = "Job queued"
+    
+    thread = threading.Thread(
+        target=process_transcript_job,
+        args=(job_id, transcript, student_level, student_goal, utterances),
+        daemon=True
+    )
+    thread.start()
+
+
+def start_regenerate_job(job_id: str, state: Dict[str, Any], sections: List[str]):
+    """
+    Start a background job that regenerates sections of a finished recording.
+    
+    Args:
+        job_id: Job of the recording (the in-memory entry is recreated after a restart)
+        state: Stored final state of the job (database.get_final_state)
+        sections: Sections to regenerate (class_test_graph.SECTIONS)
+    """
+    with job_lock:
+        job = jobs.setdefault(job_id, {"error": None, "result": None})
+        job["status"] = "pending"
+        job["progress"] = "Job queued"
+        job["error"] = None
+    
+    thread = threading.Thread(
+        target=process_regenerate_job,
+        args=(job_id, state, sections),
         daemon=True
     )
     thread.start()